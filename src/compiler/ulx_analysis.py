@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+ULX Analysis - Análises sobre o CFG da ULX-IR
+Árvore de dominadores (Cooper–Harvey–Kennedy), fronteiras de dominância,
+floresta de laços naturais com pré-cabeçalhos e vivacidade de valores
+"""
+
+from typing import Dict, List, Optional, Set
+
+from ulx_ir import BasicBlock, Function, Instruction, Value, Constant, Opcode
+
+
+TERMINATORS = (Opcode.BR, Opcode.COND_BR, Opcode.RET)
+
+
+def reverse_postorder(func: Function) -> List[BasicBlock]:
+    """Blocos alcançáveis a partir da entrada, em pós-ordem reversa
+
+    DFS iterativa sobre BasicBlock.successors (funções geradas podem ter
+    dezenas de milhares de blocos encadeados).
+    """
+    entry = func.entry_block()
+    if entry is None:
+        return []
+    seen = {entry}
+    order = []
+    stack = [(entry, iter(entry.successors))]
+    while stack:
+        block, successors = stack[-1]
+        for succ in successors:
+            if succ not in seen:
+                seen.add(succ)
+                stack.append((succ, iter(succ.successors)))
+                break
+        else:
+            stack.pop()
+            order.append(block)
+    order.reverse()
+    return order
+
+
+class DominatorTree:
+    """Dominadores imediatos dos blocos alcançáveis de uma função
+
+    Algoritmo iterativo de Cooper, Harvey e Kennedy sobre a pós-ordem
+    reversa: os blocos viram índices e intersect sobe pelos idoms até os
+    dois lados se encontrarem. Blocos inalcançáveis ficam fora da árvore.
+    """
+
+    def __init__(self, func: Function):
+        self.function = func
+        self.order = reverse_postorder(func)
+        self.index: Dict[BasicBlock, int] = {block: i for i, block in enumerate(self.order)}
+        self.idom: Dict[BasicBlock, Optional[BasicBlock]] = {}
+        self.children: Dict[BasicBlock, List[BasicBlock]] = {block: [] for block in self.order}
+        # Intervalo [enter, exit] de cada bloco na DFS da árvore (por índice RPO)
+        self._enter: List[int] = []
+        self._exit: List[int] = []
+        self._frontiers: Optional[Dict[BasicBlock, List[BasicBlock]]] = None
+        if self.order:
+            self._compute()
+            self._number()
+
+    def _compute(self):
+        index = self.index
+        preds = [[index[p] for p in block.predecessors if p in index] for block in self.order]
+        idom: List[int] = [-1] * len(self.order)
+        idom[0] = 0
+
+        changed = True
+        while changed:
+            changed = False
+            for i in range(1, len(idom)):
+                new = -1
+                for p in preds[i]:
+                    if idom[p] < 0:
+                        continue
+                    if new < 0:
+                        new = p
+                        continue
+                    # intersect: sobe pelo lado de maior índice até coincidir
+                    a = p
+                    while a != new:
+                        while a > new:
+                            a = idom[a]
+                        while new > a:
+                            new = idom[new]
+                if idom[i] != new:
+                    idom[i] = new
+                    changed = True
+
+        order = self.order
+        self.idom[order[0]] = None
+        for i in range(1, len(order)):
+            parent = order[idom[i]]
+            self.idom[order[i]] = parent
+            self.children[parent].append(order[i])
+
+    def _number(self):
+        """Numera a árvore em DFS: a domina b sse o intervalo de a contém o de b"""
+        index = self.index
+        enter = [0] * len(self.order)
+        exit = [0] * len(self.order)
+        counter = 0
+        stack = [(self.order[0], False)]
+        while stack:
+            block, done = stack.pop()
+            if done:
+                exit[index[block]] = counter
+                counter += 1
+                continue
+            enter[index[block]] = counter
+            counter += 1
+            stack.append((block, True))
+            stack.extend((child, False) for child in reversed(self.children[block]))
+        self._enter = enter
+        self._exit = exit
+
+    def contains(self, block: BasicBlock) -> bool:
+        """block é alcançável a partir da entrada"""
+        return block in self.index
+
+    def dominates(self, a: BasicBlock, b: BasicBlock) -> bool:
+        """a domina b (todo bloco domina a si mesmo); O(1)"""
+        index = self.index
+        if a not in index or b not in index:
+            return False
+        i, j = index[a], index[b]
+        return self._enter[i] <= self._enter[j] and self._exit[j] <= self._exit[i]
+
+    def preorder(self) -> List[BasicBlock]:
+        """Blocos em pré-ordem da árvore de dominadores (pais antes dos filhos)"""
+        if not self.order:
+            return []
+        result = []
+        stack = [self.order[0]]
+        while stack:
+            block = stack.pop()
+            result.append(block)
+            stack.extend(reversed(self.children[block]))
+        return result
+
+    def frontiers(self) -> Dict[BasicBlock, List[BasicBlock]]:
+        """Fronteira de dominância de cada bloco alcançável
+
+        Para cada junção, sobe de cada predecessor até o idom da junção
+        marcando-a na fronteira (Cooper–Harvey–Kennedy, fig. 5). A ordem das
+        listas é determinística (ordem de descoberta).
+        """
+        if self._frontiers is None:
+            frontiers: Dict[BasicBlock, Dict[BasicBlock, None]] = {block: {} for block in self.order}
+            for block in self.order:
+                preds = [p for p in block.predecessors if p in self.index]
+                if len(preds) < 2:
+                    continue
+                stop = self.idom[block]
+                for runner in preds:
+                    while runner is not stop and runner is not None:
+                        frontiers[runner][block] = None
+                        runner = self.idom[runner]
+            self._frontiers = {block: list(df) for block, df in frontiers.items()}
+        return self._frontiers
+
+
+class Loop:
+    """Laço natural: cabeçalho, blocos (em pós-ordem reversa) e laços internos"""
+
+    __slots__ = ('header', 'blocks', 'latches', 'parent', 'children', 'depth', 'preheader')
+
+    def __init__(self, header: BasicBlock):
+        self.header = header
+        self.blocks: Dict[BasicBlock, None] = {}   # Inclui os laços internos
+        self.latches: List[BasicBlock] = []        # Origens das arestas de volta
+        self.parent: Optional['Loop'] = None
+        self.children: List['Loop'] = []
+        self.depth = 1
+        self.preheader: Optional[BasicBlock] = None
+
+    def contains(self, block: BasicBlock) -> bool:
+        return block in self.blocks
+
+    def exit_blocks(self) -> List[BasicBlock]:
+        """Blocos fora do laço alcançados por uma aresta que sai dele"""
+        exits: Dict[BasicBlock, None] = {}
+        for block in self.blocks:
+            for succ in block.successors:
+                if succ not in self.blocks:
+                    exits[succ] = None
+        return list(exits)
+
+    def __repr__(self):
+        return f"Loop({self.header.name}, {len(self.blocks)} blocks, depth {self.depth})"
+
+
+class LoopForest:
+    """Laços naturais de uma função, aninhados numa floresta
+
+    Cada aresta de volta (latch -> cabeçalho que o domina) define um laço; as
+    arestas com o mesmo cabeçalho formam um só laço. Os cabeçalhos são
+    visitados em pós-ordem da árvore de dominadores (laços internos antes),
+    e a busca para trás a partir dos latches pula um laço interno inteiro
+    pelo cabeçalho dele, então cada bloco é visitado uma vez por nível de
+    aninhamento. Ciclos irredutíveis (sem cabeçalho dominante) não viram laço.
+    """
+
+    def __init__(self, func: Function, domtree: Optional[DominatorTree] = None):
+        self.function = func
+        self.domtree = domtree or DominatorTree(func)
+        self.roots: List[Loop] = []
+        self.block_loop: Dict[BasicBlock, Loop] = {}   # Laço mais interno de cada bloco
+        self._compute()
+
+    def _compute(self):
+        domtree = self.domtree
+        block_loop = self.block_loop
+        loops: List[Loop] = []
+        for header in reversed(domtree.preorder()):
+            latches = [p for p in header.predecessors if domtree.dominates(header, p)]
+            if not latches:
+                continue
+            loop = Loop(header)
+            loop.latches = list(dict.fromkeys(latches))
+            loops.append(loop)
+            block_loop[header] = loop
+            worklist = [latch for latch in loop.latches if latch is not header]
+            while worklist:
+                block = worklist.pop()
+                inner = block_loop.get(block)
+                if inner is None:
+                    block_loop[block] = loop
+                    worklist.extend(p for p in block.predecessors if domtree.contains(p))
+                    continue
+                while inner.parent is not None:
+                    inner = inner.parent
+                if inner is loop:
+                    continue
+                inner.parent = loop
+                # Continua pelas entradas do laço interno
+                worklist.extend(p for p in inner.header.predecessors
+                                if domtree.contains(p) and not domtree.dominates(inner.header, p))
+
+        # Em pós-ordem reversa o cabeçalho pai vem antes dos filhos
+        loops.sort(key=lambda loop: domtree.index[loop.header])
+        for loop in loops:
+            if loop.parent is None:
+                self.roots.append(loop)
+            else:
+                loop.parent.children.append(loop)
+                loop.depth = loop.parent.depth + 1
+
+        for block in domtree.order:
+            loop = block_loop.get(block)
+            while loop is not None:
+                loop.blocks[block] = None
+                loop = loop.parent
+        for loop in loops:
+            loop.preheader = find_preheader(loop)
+
+    def loops(self) -> List[Loop]:
+        """Todos os laços, externos antes dos internos"""
+        result = []
+        stack = list(reversed(self.roots))
+        while stack:
+            loop = stack.pop()
+            result.append(loop)
+            stack.extend(reversed(loop.children))
+        return result
+
+    def loop_for(self, block: BasicBlock) -> Optional[Loop]:
+        """Laço mais interno que contém block, ou None"""
+        return self.block_loop.get(block)
+
+    def depth(self, block: BasicBlock) -> int:
+        loop = self.block_loop.get(block)
+        return loop.depth if loop is not None else 0
+
+    def insert_preheaders(self) -> int:
+        """Cria pré-cabeçalhos onde faltam; devolve quantos blocos foram criados
+
+        Muda o CFG: a árvore de dominadores usada aqui fica desatualizada,
+        mas a floresta continua válida (o novo bloco entra nos laços pais).
+        """
+        created = 0
+        for loop in self.loops():
+            if loop.preheader is not None:
+                continue
+            preheader = split_loop_entry(self.function, loop)
+            loop.preheader = preheader
+            created += 1
+            parent = loop.parent
+            if parent is not None:
+                self.block_loop[preheader] = parent
+            while parent is not None:
+                parent.blocks[preheader] = None
+                parent = parent.parent
+        return created
+
+
+def find_preheader(loop: Loop) -> Optional[BasicBlock]:
+    """Único predecessor de fora do laço, se o cabeçalho for seu único sucessor"""
+    outside = [p for p in loop.header.predecessors if p not in loop.blocks]
+    if not outside or any(p is not outside[0] for p in outside):
+        return None
+    candidate = outside[0]
+    if len(candidate.successors) != 1:
+        return None
+    return candidate
+
+
+def split_loop_entry(func: Function, loop: Loop) -> BasicBlock:
+    """Desvia as arestas que entram no laço para um novo pré-cabeçalho
+
+    PHIs do cabeçalho com vários valores de fora ganham um PHI no
+    pré-cabeçalho que os junta.
+    """
+    header = loop.header
+    names = {block.name for block in func.blocks}
+    name = f"{header.name}.preheader"
+    suffix = 1
+    while name in names:
+        name = f"{header.name}.preheader{suffix}"
+        suffix += 1
+    preheader = BasicBlock(name)
+    func.blocks.insert(func.blocks.index(header), preheader)
+
+    outside = [p for p in header.predecessors if p not in loop.blocks]
+    for pred in dict.fromkeys(outside):
+        retarget(pred, header, preheader)
+    header.predecessors = [p for p in header.predecessors if p in loop.blocks]
+    preheader.predecessors = outside
+
+    used: Set[str] = set()
+    for phi in header.instructions:
+        if phi.opcode is not Opcode.PHI:
+            break
+        if not used:
+            used = {inst.result.name for block in func.blocks
+                    for inst in block.instructions if inst.result is not None}
+            used.update(param.name for param in func.params)
+        inside = []
+        incoming = []
+        for k in range(0, len(phi.operands), 2):
+            value, pred = phi.operands[k], phi.operands[k + 1]
+            if pred in loop.blocks:
+                inside.extend((value, pred))
+            else:
+                incoming.extend((value, pred))
+        values = set(incoming[0::2])
+        if len(values) == 1:
+            value = incoming[0]
+        else:
+            base = f"{phi.result.name}.ph"
+            name, suffix = base, 1
+            while name in used:
+                name = f"{base}{suffix}"
+                suffix += 1
+            used.add(name)
+            value = Value(name, phi.result.type)
+            preheader.instructions.append(Instruction(Opcode.PHI, value, incoming))
+        phi.operands = [value, preheader] + inside
+
+    preheader.instructions.append(Instruction(Opcode.BR, None, [header]))
+    preheader.successors.append(header)
+    header.predecessors.insert(0, preheader)
+    return preheader
+
+
+def retarget(block: BasicBlock, old: BasicBlock, new: BasicBlock):
+    """Troca old por new no terminador e nos sucessores de block"""
+    for inst in block.instructions:
+        if inst.opcode in (Opcode.BR, Opcode.COND_BR):
+            inst.operands = [new if op is old else op for op in inst.operands]
+            break
+        if inst.opcode is Opcode.RET:
+            break
+    block.successors = [new if succ is old else succ for succ in block.successors]
+
+
+def remove_incoming(block: BasicBlock, pred: BasicBlock):
+    """Tira uma aresta pred -> block: o predecessor e a entrada dos PHIs"""
+    block.predecessors.remove(pred)
+    for inst in block.instructions:
+        if inst.opcode is not Opcode.PHI:
+            break
+        operands = inst.operands
+        for k in range(1, len(operands), 2):
+            if operands[k] is pred:
+                del operands[k - 1:k + 1]
+                break
+
+
+def live_instructions(block: BasicBlock):
+    """Instruções até o primeiro terminador (o resto nunca executa)"""
+    for inst in block.instructions:
+        yield inst
+        if inst.opcode in TERMINATORS:
+            return
+
+
+class Liveness:
+    """Valores SSA vivos na entrada e na saída de cada bloco alcançável
+
+    Fluxo de dados para trás até o ponto fixo, visitando em pós-ordem. Um
+    operando de PHI é vivo só na saída do predecessor correspondente, não
+    na entrada do bloco do PHI.
+    """
+
+    def __init__(self, func: Function, domtree: Optional[DominatorTree] = None):
+        self.function = func
+        order = domtree.order if domtree is not None else reverse_postorder(func)
+        self.live_in: Dict[BasicBlock, Set[Value]] = {}
+        self.live_out: Dict[BasicBlock, Set[Value]] = {}
+        if order:
+            self._compute(order)
+
+    def _compute(self, order: List[BasicBlock]):
+        reachable = set(order)
+        uses: Dict[BasicBlock, Set[Value]] = {}
+        defs: Dict[BasicBlock, Set[Value]] = {}
+        # Operandos de PHI por aresta (predecessor -> bloco do PHI)
+        edge_uses: Dict[BasicBlock, Set[Value]] = {block: set() for block in order}
+        for block in order:
+            used: Set[Value] = set()
+            defined: Set[Value] = set()
+            for inst in block.instructions:
+                if inst.opcode is Opcode.PHI:
+                    for k in range(0, len(inst.operands), 2):
+                        value, pred = inst.operands[k], inst.operands[k + 1]
+                        if pred in reachable and is_ssa_value(value):
+                            edge_uses[pred].add(value)
+                else:
+                    for op in inst.operands:
+                        if is_ssa_value(op) and op not in defined:
+                            used.add(op)
+                if inst.result is not None:
+                    defined.add(inst.result)
+            uses[block] = used
+            defs[block] = defined
+
+        live_in = {block: set() for block in order}
+        live_out = {block: set() for block in order}
+        changed = True
+        while changed:
+            changed = False
+            for block in reversed(order):
+                out = set(edge_uses[block])
+                for succ in block.successors:
+                    if succ in live_in:
+                        out |= live_in[succ]
+                new_in = uses[block] | (out - defs[block])
+                if new_in != live_in[block] or out != live_out[block]:
+                    live_in[block] = new_in
+                    live_out[block] = out
+                    changed = True
+        self.live_in = live_in
+        self.live_out = live_out
+
+    def is_live_out(self, value: Value, block: BasicBlock) -> bool:
+        return value in self.live_out.get(block, ())
+
+
+def is_ssa_value(operand: object) -> bool:
+    """operand é um valor com definição (resultado ou parâmetro), não constante"""
+    return isinstance(operand, Value) and not isinstance(operand, Constant)
@@ -0,0 +1,1397 @@
+#!/usr/bin/env python3
+"""
+ULX Bench - Benchmarks do compilador ULX
+Gera programas sintéticos grandes e mede cada fase do front-end
+"""
+
+import sys
+import os
+import time
+import tracemalloc
+import shutil
+import tempfile
+import argparse
+import subprocess
+import dataclasses
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ulx_parser
+from ulx_cache import ParseCache
+from ulx_parser import ASTNode, InternTable, Lexer, ByteLexer, Parser, IncrementalParser, map_source, parse_source
+
+
+FUNCTION_TEMPLATE = """
+// Função gerada {index}
+funcao calcula_{index}(a: inteiro, b: inteiro): inteiro {{
+    var total_{index}: inteiro = a * {index} + b;
+    var i: inteiro;
+    /* laço principal
+       com comentário de bloco */
+    para (i = 0; i < {limit}; i = i + 1) {{
+        se (total_{index} >= 1000 && i != 3) {{
+            total_{index} = total_{index} - (a / 2) % 7;
+        }} senao {{
+            total_{index} = total_{index} + i * 3 + b;
+        }}
+    }}
+    escreva("resultado {index}:\\t");
+    escreva(total_{index});
+    retorne total_{index};
+}}
+"""
+
+EXPRESSION_TEMPLATE = """
+funcao expr_{index}(a: inteiro, b: inteiro, c: inteiro): inteiro {{
+    var x: inteiro = a * {index} + b - c / 3 % 7 + (a - b) * (c + {limit}) - a * b * c + 1;
+    var y: inteiro = -x + a * (b + c * (a - {limit}) / 2) - (x % 5) * 3 + c;
+    se (x + y > a * b - c && x - y <= {index} || !(a == b) && c != x * 2) {{
+        x = x * 2 + y / 3 - (a + b + c) * (x - y) + {limit} * a % 11;
+    }}
+    retorne x * y - (a + b) * (c - x) + y / (1 + a * a) - {index};
+}}
+"""
+
+SYMBOL_TEMPLATE = """
+funcao simbolos_{index}(base: inteiro): inteiro {{
+    var contador_{index}: inteiro = base + {limit};
+    var acumulado: inteiro = contador_{index} * 2;
+    var limite_superior: inteiro = acumulado + contador_{index};
+    var indice: inteiro = 0;
+    enquanto (indice < limite_superior) {{
+        acumulado = acumulado + indice * contador_{index} - limite_superior / 3;
+        contador_{index} = contador_{index} + acumulado % 7 - base;
+        indice = indice + 1;
+    }}
+    se (acumulado > limite_superior) {{
+        acumulado = acumulado - limite_superior + contador_{index} * indice;
+    }}
+    retorne acumulado + contador_{index} + indice + limite_superior + base;
+}}
+"""
+
+SCOPE_TEMPLATE = """
+funcao escopos_{index}(n: inteiro): inteiro {{
+    var total: inteiro = 0;
+    se (n > {limit}) {{
+        var dobro: inteiro = n * 2;
+        var soma: inteiro = dobro + {index};
+        total = dobro + soma;
+    }} senao {{
+        var anterior: inteiro = n - 1;
+        var triplo: inteiro = anterior * 3;
+        total = anterior - triplo;
+    }}
+    enquanto (n > 0) {{
+        var passo: inteiro = n % 3;
+        var resto: inteiro = n - passo;
+        total = total + resto;
+        n = n - 1;
+    }}
+    para (var i: inteiro = 0; i < {limit}; i = i + 1) {{
+        var quadrado: inteiro = i * i;
+        total = total + quadrado;
+    }}
+    retorne total;
+}}
+"""
+
+CONSTANT_TEMPLATE = """
+funcao configurado_{index}(x: inteiro): inteiro {{
+    var modo: inteiro = {index} % 3;
+    var escala: inteiro = 4 * 8 - 30;
+    var limite: inteiro = escala * {limit};
+    var total: inteiro = 0;
+    se (modo == 1) {{
+        total = x * escala + limite;
+    }} senao {{
+        se (escala > 10) {{
+            total = x - limite;
+        }}
+        total = total + escala * 3;
+    }}
+    var passo: inteiro = 1;
+    enquanto (x < limite) {{
+        x = x + passo * escala;
+        se (passo != 1) {{
+            passo = passo + 1;
+        }}
+    }}
+    retorne total + x + passo;
+}}
+"""
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'examples')
+
+
+def generate_source(functions: int, template: str = FUNCTION_TEMPLATE) -> str:
+    """Gera um programa ULX sintético com o número de funções pedido"""
+    parts = [template.format(index=i, limit=i % 17 + 1) for i in range(functions)]
+    parts.append("\nfuncao main() {\n    escreva(calcula_0(1, 2));\n    retorne 0;\n}\n")
+    return "".join(parts)
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    """Menor tempo de parede entre repeat execuções"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def best_time_prepared(prepare: Callable[[], object], func: Callable[[object], object],
+                       repeat: int) -> float:
+    """Menor tempo de func(prepare()) entre repeat execuções, medindo só func
+    (prepare roda fora da medição a cada repetição)"""
+    best = float('inf')
+    for _ in range(repeat):
+        argument = prepare()
+        start = time.perf_counter()
+        func(argument)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func: Callable[[], object]) -> int:
+    """Pico de memória alocada (bytes) durante func, medido com tracemalloc"""
+    tracemalloc.start()
+    try:
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def bench_lexer(source: str, repeat: int) -> List[str]:
+    """Compara o lexer caractere a caractere com o lexer de padrão mestre"""
+    reference = Lexer(source).tokenize_chars()
+    tokens = Lexer(source).tokenize()
+    if tokens != reference:
+        raise AssertionError("Token streams differ between lexers")
+
+    megabytes = len(source.encode('utf-8')) / (1024 * 1024)
+    old = best_time(lambda: Lexer(source).tokenize_chars(), repeat)
+    new = best_time(lambda: Lexer(source).tokenize(), repeat)
+    return [
+        f"source: {megabytes:.2f} MB, {len(tokens)} tokens",
+        f"char-at-a-time lexer: {old:.3f}s  {megabytes / old:.2f} MB/s",
+        f"master-pattern lexer: {new:.3f}s  {megabytes / new:.2f} MB/s",
+        f"speedup: {old / new:.1f}x",
+    ]
+
+
+def bench_streaming(source: str, repeat: int) -> List[str]:
+    """Compara parse com List[Token] materializada e parse em streaming"""
+    if parse_source(source) != parse_source(source, streaming=True):
+        raise AssertionError("Streaming parser built a different AST")
+
+    list_time = best_time(lambda: parse_source(source), repeat)
+    stream_time = best_time(lambda: parse_source(source, streaming=True), repeat)
+    list_peak = peak_memory(lambda: parse_source(source))
+    stream_peak = peak_memory(lambda: parse_source(source, streaming=True))
+    tokens_peak = peak_memory(lambda: Lexer(source).tokenize())
+    mib = 1024 * 1024
+    return [
+        f"token list alone: {tokens_peak / mib:.1f} MiB peak",
+        f"list parser:      {list_time:.3f}s  {list_peak / mib:.1f} MiB peak",
+        f"streaming parser: {stream_time:.3f}s  {stream_peak / mib:.1f} MiB peak",
+        f"peak memory saved: {(list_peak - stream_peak) / mib:.1f} MiB "
+        f"({100 * (list_peak - stream_peak) / list_peak:.0f}%)",
+    ]
+
+
+def bench_compact(source: str, repeat: int) -> List[str]:
+    """Compara List[Token] com o TokenBuffer em colunas"""
+    if list(Lexer(source).tokenize_compact()) != Lexer(source).tokenize():
+        raise AssertionError("TokenBuffer differs from the token list")
+    if parse_source(source, compact=True) != parse_source(source):
+        raise AssertionError("Compact parser built a different AST")
+
+    count = len(Lexer(source).tokenize_compact())
+    list_bytes = peak_memory(lambda: Lexer(source).tokenize())
+    compact_bytes = peak_memory(lambda: Lexer(source).tokenize_compact())
+    list_time = best_time(lambda: Lexer(source).tokenize(), repeat)
+    compact_time = best_time(lambda: Lexer(source).tokenize_compact(), repeat)
+    list_parse = best_time(lambda: parse_source(source), repeat)
+    compact_parse = best_time(lambda: parse_source(source, compact=True), repeat)
+    return [
+        f"tokens: {count}",
+        f"List[Token]: {list_bytes / count:.1f} bytes/token  lex {list_time:.3f}s  "
+        f"lex+parse {list_parse:.3f}s",
+        f"TokenBuffer: {compact_bytes / count:.1f} bytes/token  lex {compact_time:.3f}s  "
+        f"lex+parse {compact_parse:.3f}s",
+        f"memory: {list_bytes / compact_bytes:.1f}x smaller",
+    ]
+
+
+def bench_incremental(source: str, repeat: int) -> List[str]:
+    """Edita o corpo de uma função no meio do arquivo e reanalisa"""
+    marker = source.index("retorne total_", len(source) // 2)
+    edited = source[:marker] + "total_0 = 1;\n    " + source[marker:]
+
+    incremental = IncrementalParser()
+    incremental.parse(source)
+    if incremental.update(edited) != parse_source(edited):
+        raise AssertionError("Incremental parse differs from a full parse")
+
+    def edit_cycle():
+        incremental.update(source)
+        incremental.update(edited)
+
+    full = best_time(lambda: parse_source(edited), repeat)
+    cycle = best_time(edit_cycle, repeat) / 2
+    return [
+        f"declarations: {len(incremental.program.declarations)}, "
+        f"reparsed per edit: {incremental.reparsed}, reused: {incremental.reused}",
+        f"full parse:        {full * 1000:.1f} ms",
+        f"incremental parse: {cycle * 1000:.1f} ms",
+        f"speedup: {full / cycle:.0f}x",
+    ]
+
+
+def bench_mmap(source: str, repeat: int) -> List[str]:
+    """Compara leitura+decodificação do arquivo inteiro com mmap + ByteLexer"""
+    with tempfile.NamedTemporaryFile('w', suffix='.ulx', encoding='utf-8', delete=False) as f:
+        f.write(source)
+        path = f.name
+    
+    def read_text():
+        with open(path, 'r', encoding='utf-8') as f:
+            return Lexer(f.read())
+    
+    def read_mapped():
+        return ByteLexer(map_source(path))
+    
+    def first_token(open_lexer):
+        return lambda: next(open_lexer().iter_tokens())
+    
+    def lex_all(open_lexer):
+        def run():
+            lexer = open_lexer()
+            for _ in lexer.iter_tokens():
+                pass
+            return lexer
+        return run
+    
+    try:
+        reference = [(t.type, t.value, t.line, t.column) for t in read_text().iter_tokens()]
+        mapped = [(t.type, t.value, t.line, t.column) for t in read_mapped().iter_tokens()]
+        if mapped != reference:
+            raise AssertionError("ByteLexer differs from the str lexer")
+        
+        text_first = best_time(first_token(read_text), repeat)
+        mmap_first = best_time(first_token(read_mapped), repeat)
+        text_lex = best_time(lex_all(read_text), repeat)
+        mmap_lex = best_time(lex_all(read_mapped), repeat)
+        text_peak = peak_memory(lex_all(read_text))
+        mmap_peak = peak_memory(lex_all(read_mapped))
+    finally:
+        os.unlink(path)
+    
+    mib = 1024 * 1024
+    return [
+        f"file: {len(source.encode('utf-8')) / mib:.2f} MiB, {len(reference)} tokens",
+        f"read+decode: first token {text_first * 1000:.2f} ms  streaming lex {text_lex:.3f}s  "
+        f"{text_peak / mib:.1f} MiB peak",
+        f"mmap bytes:  first token {mmap_first * 1000:.2f} ms  streaming lex {mmap_lex:.3f}s  "
+        f"{mmap_peak / mib:.1f} MiB peak",
+        f"time to first token: {text_first / mmap_first:.0f}x faster",
+    ]
+
+
+class ChainParser(Parser):
+    """Parser com a cadeia recursiva original de expressões"""
+    
+    def expression(self):
+        return self.assignment()
+
+
+def call_profile(func: Callable[[], object]) -> tuple:
+    """(chamadas Python, profundidade máxima de frames) durante func"""
+    state = {'depth': 0, 'max': 0, 'calls': 0}
+    
+    def profile(frame, event, arg):
+        if event == 'call':
+            state['calls'] += 1
+            state['depth'] += 1
+            state['max'] = max(state['max'], state['depth'])
+        elif event == 'return':
+            state['depth'] -= 1
+    
+    sys.setprofile(profile)
+    try:
+        func()
+    finally:
+        sys.setprofile(None)
+    return state['calls'], state['max']
+
+
+NESTING_LIMIT = 4096
+
+
+def max_nesting(parser_class: type) -> str:
+    """Maior aninhamento de parênteses (até NESTING_LIMIT) que o parser aceita
+    no limite de recursão padrão"""
+    low, high = 1, NESTING_LIMIT
+    while low < high:
+        depth = (low + high + 1) // 2
+        tokens = Lexer("x = " + "(" * depth + "1" + ")" * depth + ";").tokenize()
+        try:
+            parser_class(tokens).statement()
+            low = depth
+        except RecursionError:
+            high = depth - 1
+    return f"{low}+" if low == NESTING_LIMIT else str(low)
+
+
+def bench_expressions(source: str, repeat: int) -> List[str]:
+    """Compara a cadeia recursiva com o precedence climbing em código
+    dominado por expressões (mesmo número de funções do programa de entrada)"""
+    functions = len(parse_source(source).declarations)
+    expressions = generate_source(functions, EXPRESSION_TEMPLATE)
+    tokens = Lexer(expressions).tokenize()
+    if ChainParser(tokens).parse() != Parser(tokens).parse():
+        raise AssertionError("Precedence climbing built a different AST")
+    
+    chain_time = best_time(lambda: ChainParser(tokens).parse(), repeat)
+    pratt_time = best_time(lambda: Parser(tokens).parse(), repeat)
+    chain_calls, chain_depth = call_profile(lambda: ChainParser(tokens).parse())
+    pratt_calls, pratt_depth = call_profile(lambda: Parser(tokens).parse())
+    return [
+        f"tokens: {len(tokens)}",
+        f"recursive chain:     {chain_time:.3f}s  {chain_calls} calls  "
+        f"max depth {chain_depth}  max nesting {max_nesting(ChainParser)}",
+        f"precedence climbing: {pratt_time:.3f}s  {pratt_calls} calls  "
+        f"max depth {pratt_depth}  max nesting {max_nesting(Parser)}",
+        f"speedup: {chain_time / pratt_time:.1f}x",
+    ]
+
+
+def plain_node_classes() -> Dict[type, type]:
+    """Cópias das classes da AST sem __slots__ (representação anterior)"""
+    classes = {}
+    for cls in vars(ulx_parser).values():
+        if isinstance(cls, type) and issubclass(cls, ASTNode) and dataclasses.is_dataclass(cls):
+            fields = [(f.name, f.type, f) for f in dataclasses.fields(cls)]
+            classes[cls] = dataclasses.make_dataclass(cls.__name__, fields)
+    return classes
+
+
+def copy_tree(node: object, classes: Dict[type, type]) -> object:
+    """Copia a AST, trocando cada classe pela correspondente em classes"""
+    if isinstance(node, list):
+        return [copy_tree(item, classes) for item in node]
+    if isinstance(node, tuple):
+        return tuple(copy_tree(item, classes) for item in node)
+    if isinstance(node, ASTNode):
+        values = {f.name: copy_tree(getattr(node, f.name), classes)
+                  for f in dataclasses.fields(node)}
+        return classes[type(node)](**values)
+    return node
+
+
+def retained_memory(func: Callable[[], object]) -> int:
+    """Memória (bytes) que continua alocada pelo resultado de func"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return retained
+
+
+def count_nodes(node: object) -> int:
+    if isinstance(node, (list, tuple)):
+        return sum(count_nodes(item) for item in node)
+    if isinstance(node, ASTNode):
+        return 1 + sum(count_nodes(getattr(node, f.name)) for f in dataclasses.fields(node))
+    return 0
+
+
+def bench_ast(source: str, repeat: int) -> List[str]:
+    """Bytes por nó da AST com __dict__ por instância e com __slots__
+    
+    As duas árvores são cópias da mesma AST; repeat não é usado.
+    """
+    program = parse_source(source)
+    nodes = count_nodes(program)
+    plain = plain_node_classes()
+    slotted = {cls: cls for cls in plain}
+    
+    dict_bytes = retained_memory(lambda: copy_tree(program, plain))
+    slot_bytes = retained_memory(lambda: copy_tree(program, slotted))
+    mib = 1024 * 1024
+    return [
+        f"nodes: {nodes} (bytes/node includes child lists)",
+        f"__dict__ nodes:  {dict_bytes / nodes:.1f} bytes/node  {dict_bytes / mib:.1f} MiB",
+        f"__slots__ nodes: {slot_bytes / nodes:.1f} bytes/node  {slot_bytes / mib:.1f} MiB",
+        f"memory: {dict_bytes / slot_bytes:.1f}x smaller",
+    ]
+
+
+def bench_cache(source: str, repeat: int) -> List[str]:
+    """Parse completo contra carga do cache em disco (diretório temporário)"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ParseCache(directory)
+        program = parse_source(source, cache=cache)
+        if parse_source(source, cache=cache) != program:
+            raise AssertionError("Cached AST differs from a fresh parse")
+        
+        parse_time = best_time(lambda: parse_source(source), repeat)
+        hit_time = best_time(lambda: parse_source(source, cache=cache), repeat)
+        key_time = best_time(lambda: cache.key(source), repeat)
+        entry = cache.size()
+        stats = cache.stats()
+    return [
+        f"full parse:  {parse_time * 1000:.1f} ms",
+        f"cache hit:   {hit_time * 1000:.1f} ms (hashing {key_time * 1000:.1f} ms)  "
+        f"entry {entry / 1024:.0f} KiB",
+        f"speedup: {parse_time / hit_time:.1f}x",
+        stats.replace(directory, '<tmp>'),
+    ]
+
+
+class CopiedNames(InternTable):
+    """Sem internação: cada ocorrência vira uma str nova (comportamento anterior)"""
+    
+    def intern(self, name: str) -> str:
+        return name
+    
+    def intern_bytes(self, raw: bytes) -> str:
+        return raw.decode('utf-8')
+    
+    def ir_name(self, name: str) -> str:
+        return f"%{name}"
+
+
+def front_end(source: str, names: InternTable, cache: Optional[ParseCache] = None) -> tuple:
+    """Parse (ou carga do cache), verificação de tipos e geração de IR de source"""
+    from ulxc import TypeChecker, ASTtoIR
+    program = parse_source(source, cache=cache, names=names)
+    TypeChecker().check_program(program)
+    return program, ASTtoIR().convert(program, names)
+
+
+def identifier_strings(program: object, module: object) -> tuple:
+    """(ocorrências, objetos str distintos, bytes desses objetos) dos nomes
+    de identificadores na AST e dos nomes de valores no IR"""
+    found = []
+    
+    def walk(node):
+        if isinstance(node, list):
+            for item in node:
+                walk(item)
+        elif isinstance(node, ASTNode):
+            for f in dataclasses.fields(node):
+                value = getattr(node, f.name)
+                if f.name in ('name', 'target', 'callee'):
+                    found.append(value)
+                else:
+                    walk(value)
+    
+    walk(program)
+    for function in module.functions:
+        found.extend(param.name for param in function.params)
+        for block in function.blocks:
+            for inst in block.instructions:
+                if inst.result is not None:
+                    found.append(inst.result.name)
+    distinct = {id(name): name for name in found}
+    return len(found), len(distinct), sum(sys.getsizeof(name) for name in distinct.values())
+
+
+def bench_intern(source: str, repeat: int) -> List[str]:
+    """Front-end com e sem a tabela de identificadores num programa cheio de
+    nomes (mesmo número de funções do programa de entrada)"""
+    functions = len(parse_source(source).declarations)
+    symbols = generate_source(functions, SYMBOL_TEMPLATE).replace(
+        "escreva(calcula_0(1, 2))", "escreva(simbolos_0(1))")
+    
+    copied = front_end(symbols, CopiedNames())
+    interned = front_end(symbols, InternTable())
+    if str(copied[1]) != str(interned[1]):
+        raise AssertionError("Interning changed the generated IR")
+    
+    copied_time = best_time(lambda: front_end(symbols, CopiedNames()), repeat)
+    interned_time = best_time(lambda: front_end(symbols, InternTable()), repeat)
+    copied_count, copied_objects, copied_bytes = identifier_strings(*copied)
+    _, interned_objects, interned_bytes = identifier_strings(*interned)
+    
+    # Acerto do cache: a AST carregada é internada na tabela da compilação
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ParseCache(directory)
+        front_end(symbols, InternTable(), cache)
+        cached = front_end(symbols, InternTable(), cache)
+        if cache.hits != 1 or str(cached[1]) != str(interned[1]):
+            raise AssertionError("Cached front-end differs from a fresh one")
+        cached_time = best_time(lambda: front_end(symbols, InternTable(), cache), repeat)
+    _, cached_objects, cached_bytes = identifier_strings(*cached)
+    kib = 1024
+    return [
+        f"identifier occurrences (AST names + IR value names): {copied_count}",
+        f"copied names:   {copied_objects} str objects  {copied_bytes / kib:.0f} KiB  "
+        f"front-end {copied_time:.3f}s",
+        f"interned names: {interned_objects} str objects  {interned_bytes / kib:.0f} KiB  "
+        f"front-end {interned_time:.3f}s",
+        f"cache hit:      {cached_objects} str objects  {cached_bytes / kib:.0f} KiB  "
+        f"front-end {cached_time:.3f}s",
+        f"string memory: {copied_bytes / interned_bytes:.1f}x smaller",
+    ]
+
+
+DEEP_SHAPES = {
+    'long chain': lambda n: "x" + "".join(f" {'+-*/'[i % 4]} {i % 9 + 1}" for i in range(n)),
+    'nested groups': lambda n: "(" * n + "x" + " + 1)" * n,
+    'right nesting': lambda n: "x - (" * n + "1" + ")" * n,
+    'unary prefixes': lambda n: "- " * n + "x",
+    'assignments': lambda n: "x = " * n + "1",
+}
+
+
+def deep_program(expression: str) -> str:
+    return ("funcao main(): inteiro {\n    var x: inteiro = 1;\n"
+            f"    x = {expression};\n    retorne x;\n}}\n")
+
+
+def bench_deep(source: str, repeat: int) -> List[str]:
+    """Teste de estresse dos percursos de expressão com pilha explícita:
+    cadeias e aninhamentos de 1k a 100k níveis, custo por nó em µs"""
+    from ulxc import TypeChecker, ASTtoIR
+    lines = [f"{'shape':<15} {'depth':>7}  {'parse':>7}  {'check':>7}  {'lower':>7}  (µs/node)"]
+    for name, shape in DEEP_SHAPES.items():
+        for depth in (1000, 10000, 100000):
+            text = deep_program(shape(depth))
+            program = parse_source(text)
+            parse_time = best_time(lambda: parse_source(text), repeat)
+            check_time = best_time(lambda: TypeChecker().check_program(program), repeat)
+            lower_time = best_time(lambda: ASTtoIR().convert(program), repeat)
+            per_node = 1e6 / depth
+            lines.append(f"{name:<15} {depth:>7}  {parse_time * per_node:>7.2f}  "
+                         f"{check_time * per_node:>7.2f}  {lower_time * per_node:>7.2f}")
+    return lines
+
+
+def bench_frontend(source: str, repeat: int) -> List[str]:
+    """Verificação de tipos + geração de IR: duas passadas (TypeChecker e
+    ASTtoIR) contra a passada única do FusedLowering, sobre a AST já pronta"""
+    from ulxc import TypeChecker, ASTtoIR, FusedLowering
+    functions = len(parse_source(source).declarations)
+    inputs = {
+        'input program': source,
+        'symbol program': generate_source(functions, SYMBOL_TEMPLATE).replace(
+            "escreva(calcula_0(1, 2))", "escreva(simbolos_0(1))"),
+        'expression program': generate_source(functions, EXPRESSION_TEMPLATE).replace(
+            "escreva(calcula_0(1, 2))", "escreva(expr_0(1, 2, 3))"),
+    }
+    
+    def two_pass(program, names):
+        TypeChecker().check_program(program)
+        return ASTtoIR().convert(program, names)
+    
+    lines = []
+    for name, text in inputs.items():
+        names = InternTable()
+        program = parse_source(text, names=names)
+        if str(two_pass(program, names)) != str(FusedLowering().convert(program, names)):
+            raise AssertionError(f"Fused lowering changed the generated IR ({name})")
+        parse_time = best_time(lambda: parse_source(text, names=InternTable()), repeat)
+        two_time = best_time(lambda: two_pass(program, names), repeat)
+        fused_time = best_time(lambda: FusedLowering().convert(program, names), repeat)
+        lines.append(f"{name} ({count_nodes(program)} nodes, parse {parse_time:.3f}s):")
+        lines.append(f"  two-pass: {two_time:.3f}s  fused: {fused_time:.3f}s  "
+                     f"({two_time / fused_time:.2f}x)  "
+                     f"front-end {parse_time + two_time:.3f}s -> {parse_time + fused_time:.3f}s")
+    return lines
+
+
+def bench_types(source: str, repeat: int) -> List[str]:
+    """Resolução de nomes de tipo, comparação de tipos e TypeChecker"""
+    from ulxc import TypeChecker
+    from ulx_ir import TYPES, TypeI32, TypeF64, ArrayType, FunctionType
+    checker = TypeChecker()
+    names = ['inteiro', 'real', 'texto', 'booleano', 'i64', 'desconhecido'] * 50000
+    pairs = [(TypeI32, TypeI32), (TypeI32, TypeF64),
+             (ArrayType(ArrayType(TypeI32, 4), 8), ArrayType(ArrayType(TypeI32, 4), 8))] * 100000
+    
+    def resolve_all():
+        for name in names:
+            checker.string_to_type(name)
+    
+    def compare_all():
+        for left, right in pairs:
+            left == right
+    
+    program = parse_source(source)
+    resolve_time = best_time(resolve_all, repeat)
+    compare_time = best_time(compare_all, repeat)
+    check_time = best_time(lambda: TypeChecker().check_program(program), repeat)
+    if FunctionType(TypeI32, [TypeF64]) is not FunctionType(TypeI32, [TypeF64]):
+        raise AssertionError("Function types are not canonical")
+    return [
+        f"string_to_type: {resolve_time / len(names) * 1e9:.0f} ns/call",
+        f"type comparison: {compare_time / len(pairs) * 1e9:.0f} ns/compare",
+        f"TypeChecker on input program: {check_time:.3f}s",
+        f"canonical types: {len(TYPES)}",
+    ]
+
+
+def bench_scopes(source: str, repeat: int) -> List[str]:
+    """Quadros de pilha com um slot por declaração contra slots por escopo
+    (reaproveitados entre escopos disjuntos), e tempo do front-end"""
+    from ulxc import FusedLowering
+    from ulx_parser import FunctionDecl, VarDecl
+    functions = len(parse_source(source).declarations)
+    inputs = {
+        'input program': source,
+        'symbol program': generate_source(functions, SYMBOL_TEMPLATE).replace(
+            "escreva(calcula_0(1, 2))", "escreva(simbolos_0(1))"),
+        'scope program': generate_source(functions, SCOPE_TEMPLATE).replace(
+            "escreva(calcula_0(1, 2))", "escreva(escopos_0(1))"),
+    }
+    
+    def declarations(node) -> int:
+        if isinstance(node, (list, tuple)):
+            return sum(declarations(item) for item in node)
+        if isinstance(node, ASTNode):
+            return (isinstance(node, VarDecl) +
+                    sum(declarations(getattr(node, f.name)) for f in dataclasses.fields(node)))
+        return 0
+    
+    lines = []
+    for name, text in inputs.items():
+        program = parse_source(text)
+        module = FusedLowering().convert(program)
+        flat = sum(len(decl.params) + declarations(decl.body)
+                   for decl in program.declarations if isinstance(decl, FunctionDecl))
+        scoped = sum(func.frame_size for func in module.functions)
+        lower_time = best_time(lambda: FusedLowering().convert(program), repeat)
+        count = len(module.functions)
+        lines.append(f"{name}: frame {8 * flat / count:.0f} -> {8 * scoped / count:.0f} bytes "
+                     f"per function ({flat / scoped:.2f}x smaller)  check+lower {lower_time:.3f}s")
+    return lines
+
+
+HOT_LOOP_SOURCE = """
+funcao soma(n: inteiro): inteiro {
+    var total: inteiro = 0;
+    var i: inteiro;
+    para (i = 0; i < n; i = i + 1) {
+        var j: inteiro = 0;
+        enquanto (j < 100) {
+            total = (total + i * j) % 65521;
+            j = j + 1;
+        }
+    }
+    retorne total;
+}
+
+funcao main() {
+    retorne soma(2000000) % 256;
+}
+"""
+
+
+def count_opcodes(module, opcodes) -> Dict[str, int]:
+    counts = {opcode.name.lower(): 0 for opcode in opcodes}
+    for func in module.functions:
+        for block in func.blocks:
+            for inst in block.instructions:
+                if inst.opcode in opcodes:
+                    counts[inst.opcode.name.lower()] += 1
+    return counts
+
+
+def run_binary(module, directory: str, name: str) -> tuple:
+    """Converte module para C e compila com gcc -O0; devolve (tempo, código de saída)"""
+    from ulxc import ULXCompiler
+    c_path = os.path.join(directory, name + '.c')
+    binary = os.path.join(directory, name)
+    with open(c_path, 'w') as f:
+        f.write(ULXCompiler().ir_to_c(module))
+    subprocess.run(['gcc', '-O0', '-o', binary, c_path], check=True, capture_output=True)
+    start = time.perf_counter()
+    result = subprocess.run([binary])
+    return time.perf_counter() - start, result.returncode
+
+
+def bench_mem2reg(source: str, repeat: int) -> List[str]:
+    """Loads/stores/allocas antes e depois do mem2reg, tempo do passe e,
+    com gcc disponível, o binário de um laço quente (-O0, sem o mem2reg do gcc)"""
+    from ulxc import FusedLowering
+    from ulx_ir import Opcode
+    from ulx_mem2reg import mem2reg
+    functions = len(parse_source(source).declarations)
+    inputs = {
+        'input program': source,
+        'symbol program': generate_source(functions, SYMBOL_TEMPLATE).replace(
+            "escreva(calcula_0(1, 2))", "escreva(simbolos_0(1))"),
+        'scope program': generate_source(functions, SCOPE_TEMPLATE).replace(
+            "escreva(calcula_0(1, 2))", "escreva(escopos_0(1))"),
+    }
+    opcodes = (Opcode.ALLOCA, Opcode.LOAD, Opcode.STORE, Opcode.PHI)
+    
+    lines = []
+    for name, text in inputs.items():
+        program = parse_source(text)
+        module = FusedLowering().convert(program)
+        before = count_opcodes(module, opcodes)
+        promoted = mem2reg(module)
+        after = count_opcodes(module, opcodes)
+        
+        lower_time = best_time(lambda: FusedLowering().convert(program), repeat)
+        pass_time = best_time_prepared(lambda: FusedLowering().convert(program), mem2reg, repeat)
+        memory = ', '.join(f"{op} {before[op]} -> {after[op]}" for op in ('alloca', 'load', 'store'))
+        lines.append(f"{name}: {promoted} variables promoted, {memory}, phi {after['phi']}  "
+                     f"mem2reg {pass_time:.3f}s (lowering {lower_time:.3f}s)")
+    
+    if shutil.which('gcc') is None:
+        lines.append("hot loop: gcc not found, skipped")
+        return lines
+    hot_loop = parse_source(HOT_LOOP_SOURCE)
+    promoted = FusedLowering().convert(hot_loop)
+    mem2reg(promoted)
+    with tempfile.TemporaryDirectory() as directory:
+        memory_time, memory_exit = run_binary(FusedLowering().convert(hot_loop), directory, 'memory')
+        ssa_time, ssa_exit = run_binary(promoted, directory, 'ssa')
+    if memory_exit != ssa_exit:
+        raise AssertionError(f"mem2reg changed the program result ({memory_exit} != {ssa_exit})")
+    lines.append(f"hot loop (gcc -O0): memory {memory_time:.3f}s  ssa {ssa_time:.3f}s  "
+                 f"({memory_time / ssa_time:.2f}x)")
+    return lines
+
+
+# Formas de CFG para as análises: um comando por repetição numa só função
+CFG_SHAPES = {
+    'if chain': "    se (x > {i}) {{ x = x - 1; }} senao {{ x = x + 2; }}\n",
+    'loop nests': ("    i = 0;\n    enquanto (i < 3) {{\n        j = 0;\n"
+                   "        enquanto (j < i) {{\n            se (j == {i}) {{ x = x + j; }}\n"
+                   "            j = j + 1;\n        }}\n        i = i + 1;\n    }}\n"),
+    'deep loops': "".join("    " * k + "    enquanto (x > {i}) {{\n" for k in range(16)) +
+                  "    " * 16 + "    x = x - 1;\n" + "".join("    " * k + "    }}\n" for k in reversed(range(16))),
+}
+
+
+def cfg_function(shape: str, repeat_count: int) -> str:
+    body = "".join(CFG_SHAPES[shape].format(i=i) for i in range(repeat_count))
+    return (f"funcao grande(x: inteiro): inteiro {{\n    var i: inteiro;\n    var j: inteiro;\n"
+            f"{body}    retorne x;\n}}\n")
+
+
+def bench_loops(source: str, repeat: int) -> List[str]:
+    """Dominadores, fronteiras e floresta de laços em funções com 10k+ blocos
+    
+    O tempo por bloco deve ficar estável quando o número de blocos dobra.
+    source não é usado.
+    """
+    from ulxc import FusedLowering
+    from ulx_analysis import DominatorTree, LoopForest
+    lines = [f"{'shape':<13} {'blocks':>7} {'loops':>6}  "
+             f"{'domtree':>8} {'frontier':>8} {'loops':>8} {'total':>8}  (us/block)"]
+    for shape in CFG_SHAPES:
+        for scale in (1, 2, 4, 8):
+            statements = {'if chain': 3500, 'loop nests': 1250, 'deep loops': 220}[shape] * scale
+            module = FusedLowering().convert(parse_source(cfg_function(shape, statements)))
+            func = module.get_function('grande')
+            blocks = len(func.blocks)
+            domtree = DominatorTree(func)
+            domtree_time = best_time(lambda: DominatorTree(func), repeat)
+            
+            def frontiers():
+                domtree._frontiers = None
+                return domtree.frontiers()
+            frontier_time = best_time(frontiers, repeat)
+            loops_time = best_time(lambda: LoopForest(func, domtree), repeat)
+            loops = len(LoopForest(func, domtree).loops())
+            per_block = 1e6 / blocks
+            lines.append(f"{shape:<13} {blocks:>7} {loops:>6}  {domtree_time * per_block:>8.2f} "
+                         f"{frontier_time * per_block:>8.2f} {loops_time * per_block:>8.2f} "
+                         f"{(domtree_time + frontier_time + loops_time) * per_block:>8.2f}")
+    return lines
+
+
+def ir_size(module) -> tuple:
+    """(instruções, blocos) das funções definidas"""
+    functions = [func for func in module.functions if not func.is_external]
+    return (sum(len(block.instructions) for func in functions for block in func.blocks),
+            sum(len(func.blocks) for func in functions))
+
+
+def bench_sccp(source: str, repeat: int) -> List[str]:
+    """Instruções e blocos eliminados pelo SCCP depois do mem2reg, por
+    exemplo e num programa gerado com constantes de configuração"""
+    from ulxc import FusedLowering
+    from ulx_mem2reg import mem2reg
+    from ulx_sccp import sccp
+    functions = len(parse_source(source).declarations)
+    inputs = {}
+    for name in sorted(os.listdir(EXAMPLES_DIR)):
+        if name.endswith('.ulx'):
+            with open(os.path.join(EXAMPLES_DIR, name)) as f:
+                inputs[name] = f.read()
+    inputs['constant program'] = generate_source(functions, CONSTANT_TEMPLATE).replace(
+        "escreva(calcula_0(1, 2))", "escreva(configurado_0(1))")
+    
+    lines = [f"{'program':<20} {'instructions':>14} {'blocks':>12}  {'folded':>6} {'branches':>8}  time"]
+    for name, text in inputs.items():
+        program = parse_source(text)
+        
+        def promoted():
+            module = FusedLowering().convert(program)
+            mem2reg(module)
+            return module
+        module = promoted()
+        instructions, blocks = ir_size(module)
+        folded, branches, removed = sccp(module)
+        after_instructions, after_blocks = ir_size(module)
+        pass_time = best_time_prepared(promoted, sccp, repeat)
+        lines.append(f"{name:<20} {instructions:>6} -> {after_instructions:<6} {blocks:>4} -> {after_blocks:<5}  "
+                     f"{folded:>6} {branches:>8}  {pass_time * 1000:.1f} ms")
+    return lines
+
+
+ARITHMETIC_OPCODES = ('ADD', 'SUB', 'MUL', 'SDIV', 'ICMP', 'LOAD')
+
+
+def bench_gvn(source: str, repeat: int) -> List[str]:
+    """Instruções que chegam ao backend com e sem GVN, em memória (loads
+    repetidos) e depois de mem2reg+sccp, em código dominado por aritmética"""
+    from ulxc import FusedLowering
+    from ulx_ir import Opcode
+    from ulx_passes import PassManager
+    functions = len(parse_source(source).declarations)
+    inputs = {
+        'input program': source,
+        'expression program': generate_source(functions, EXPRESSION_TEMPLATE).replace(
+            "escreva(calcula_0(1, 2))", "escreva(expr_0(1, 2, 3))"),
+    }
+    with open(os.path.join(EXAMPLES_DIR, 'loops.ulx')) as f:
+        inputs['loops.ulx'] = f.read()
+    pipelines = [('', 'gvn'), ('mem2reg,sccp', 'mem2reg,sccp,gvn')]
+    opcodes = tuple(getattr(Opcode, name) for name in ARITHMETIC_OPCODES)
+    
+    lines = []
+    for name, text in inputs.items():
+        program = parse_source(text)
+        lines.append(f"{name}:")
+        for base, numbered in pipelines:
+            sizes = []
+            for pipeline in (base, numbered):
+                module = FusedLowering().convert(program)
+                manager = PassManager(pipeline)
+                manager.run(module)
+                counts = count_opcodes(module, opcodes)
+                sizes.append((ir_size(module)[0], sum(counts.values()), manager.stats.get('gvn')))
+            (before, before_ops, _), (after, after_ops, stats) = sizes
+            lines.append(f"  {base or 'no passes':<13} -> +gvn: instructions {before} -> {after} "
+                         f"({100 * (after - before) / before:+.1f}%), "
+                         f"{'/'.join(ARITHMETIC_OPCODES).lower()} {before_ops} -> {after_ops}  "
+                         f"gvn {stats.seconds * 1000:.1f} ms")
+    return lines
+
+
+def bench_simplifycfg(source: str, repeat: int) -> List[str]:
+    """Blocos, instruções e rótulos/gotos do C gerado antes e depois do
+    simplifycfg, no fim do pipeline mem2reg,sccp,gvn"""
+    from ulxc import FusedLowering, ULXCompiler
+    from ulx_passes import PassManager
+    inputs = {}
+    for name in sorted(os.listdir(EXAMPLES_DIR)):
+        if name.endswith('.ulx'):
+            with open(os.path.join(EXAMPLES_DIR, name)) as f:
+                inputs[name] = f.read()
+    inputs['input program'] = source
+    functions = len(parse_source(source).declarations)
+    inputs['constant program'] = generate_source(functions, CONSTANT_TEMPLATE).replace(
+        "escreva(calcula_0(1, 2))", "escreva(configurado_0(1))")
+    compiler = ULXCompiler()
+    
+    lines = [f"{'program':<18} {'blocks':>15} {'instructions':>17} {'labels':>15} {'gotos':>15}  time"]
+    for name, text in inputs.items():
+        program = parse_source(text)
+        sizes = []
+        for pipeline in ('mem2reg,sccp,gvn', 'mem2reg,sccp,gvn,simplifycfg'):
+            module = FusedLowering().convert(program)
+            manager = PassManager(pipeline)
+            manager.run(module)
+            c_source = compiler.ir_to_c(module)
+            instructions, blocks = ir_size(module)
+            labels = sum(1 for line in c_source.splitlines() if line.startswith('L_'))
+            sizes.append((blocks, instructions, labels, c_source.count('goto '), manager.stats.get('simplifycfg')))
+        (blocks, instructions, labels, gotos, _), after = sizes
+        lines.append(f"{name:<18} {blocks:>6} -> {after[0]:<6} {instructions:>7} -> {after[1]:<7} "
+                     f"{labels:>6} -> {after[2]:<6} {gotos:>6} -> {after[3]:<6}  "
+                     f"{after[4].seconds * 1000:.1f} ms")
+    return lines
+
+
+# Laço interno que recalcula expressões sobre variáveis do laço externo
+INVARIANT_LOOP_SOURCE = """
+funcao soma(n: inteiro, m: inteiro): inteiro {
+    var total: inteiro = 0;
+    var i: inteiro;
+    para (i = 0; i < n; i = i + 1) {
+        var j: inteiro = 0;
+        enquanto (j < 100) {
+            total = (total + (i * m + n / 7) * j + i * i - m * 3) % 65521;
+            j = j + 1;
+        }
+    }
+    retorne total;
+}
+
+funcao main() {
+    retorne soma(2000000, 13) % 256;
+}
+"""
+
+
+def bench_licm(source: str, repeat: int) -> List[str]:
+    """Instruções subidas pelo LICM e tempo dos binários (gcc -O0) de laços
+    aninhados, com as variáveis em memória e depois do mem2reg"""
+    from ulxc import FusedLowering
+    from ulx_licm import licm
+    from ulx_passes import PassManager
+    programs = {'invariant loop': INVARIANT_LOOP_SOURCE, 'hot loop': HOT_LOOP_SOURCE}
+    pipelines = [('', 'licm'), ('mem2reg,sccp,gvn,simplifycfg', 'mem2reg,sccp,gvn,licm,simplifycfg')]
+    with open(os.path.join(EXAMPLES_DIR, 'loops.ulx')) as f:
+        loops_example = parse_source(f.read())
+    
+    lines = []
+    sources = {'loops.ulx': loops_example}
+    sources.update((name, parse_source(text)) for name, text in programs.items())
+    for name, program in sources.items():
+        for base, _ in pipelines:
+            module = FusedLowering().convert(program)
+            PassManager(base).run(module)
+            created, hoisted, sunk = licm(module)
+            lines.append(f"{name}, {base or 'no passes'}: {hoisted} hoisted, {sunk} stores sunk, "
+                         f"{created} preheaders created")
+    if shutil.which('gcc') is None:
+        lines.append("binaries: gcc not found, skipped")
+        return lines
+    with tempfile.TemporaryDirectory() as directory:
+        for name, text in programs.items():
+            program = parse_source(text)
+            for base, hoisted in pipelines:
+                results = []
+                for pipeline in (base, hoisted):
+                    module = FusedLowering().convert(program)
+                    PassManager(pipeline).run(module)
+                    label = name.replace(' ', '_') + str(len(results))
+                    results.append(min(run_binary(module, directory, label) for _ in range(repeat)))
+                (before, before_exit), (after, after_exit) = results
+                if before_exit != after_exit:
+                    raise AssertionError(f"licm changed the program result ({before_exit} != {after_exit})")
+                lines.append(f"{name} (gcc -O0), {base or 'no passes'}: {before:.3f}s -> +licm {after:.3f}s "
+                             f"({before / after:.2f}x)")
+    return lines
+
+
+# Multiplicações pelas variáveis de indução dos dois laços
+INDUCTION_LOOP_SOURCE = """
+funcao soma(n: inteiro): inteiro {
+    var total: inteiro = 0;
+    var i: inteiro;
+    var j: inteiro;
+    para (i = 0; i < 30000; i = i + 1) {
+        para (j = 0; j < n; j = j + 1) {
+            total = (total + i * 3 + j * 7) % 65521;
+        }
+    }
+    retorne total;
+}
+
+funcao main() {
+    retorne soma(2000) % 256;
+}
+"""
+
+
+def bench_indvars(source: str, repeat: int) -> List[str]:
+    """Multiplicações e variáveis de indução antes e depois do indvars, e
+    tempo dos binários (gcc -O0) de laços que multiplicam pelo contador"""
+    from ulxc import FusedLowering
+    from ulx_ir import Opcode
+    from ulx_indvars import indvars
+    from ulx_passes import PassManager
+    base = 'mem2reg,sccp,gvn,licm'
+    programs = {'induction loop': INDUCTION_LOOP_SOURCE, 'invariant loop': INVARIANT_LOOP_SOURCE}
+    opcodes = (Opcode.MUL, Opcode.PHI)
+    
+    lines = []
+    for name, text in programs.items():
+        module = FusedLowering().convert(parse_source(text))
+        PassManager(base).run(module)
+        before = count_opcodes(module, opcodes)
+        created, reduced, replaced, removed = indvars(module)
+        after = count_opcodes(module, opcodes)
+        lines.append(f"{name}: {reduced} multiplications reduced, {replaced} exit tests replaced, "
+                     f"{removed} induction variables removed; mul {before['mul']} -> {after['mul']}, "
+                     f"phi {before['phi']} -> {after['phi']}")
+    if shutil.which('gcc') is None:
+        lines.append("binaries: gcc not found, skipped")
+        return lines
+    with tempfile.TemporaryDirectory() as directory:
+        for name, text in programs.items():
+            program = parse_source(text)
+            results = []
+            for pipeline in (base + ',simplifycfg', base + ',indvars,simplifycfg'):
+                module = FusedLowering().convert(program)
+                PassManager(pipeline).run(module)
+                label = name.replace(' ', '_') + str(len(results))
+                results.append(min(run_binary(module, directory, label) for _ in range(repeat)))
+            (before, before_exit), (after, after_exit) = results
+            if before_exit != after_exit:
+                raise AssertionError(f"indvars changed the program result ({before_exit} != {after_exit})")
+            lines.append(f"{name} (gcc -O0): {before:.3f}s -> +indvars {after:.3f}s ({before / after:.2f}x)")
+    return lines
+
+
+# Laço interno curto com limite conhecido e outro com limite em parâmetro
+UNROLL_LOOP_SOURCE = """
+funcao mistura(n: inteiro): inteiro {
+    var total: inteiro = 0;
+    var i: inteiro;
+    var j: inteiro;
+    para (i = 0; i < 2000000; i = i + 1) {
+        para (j = 0; j < 4; j = j + 1) {
+            total = (total * 3 + j) % 65521;
+        }
+        para (j = 0; j < n; j = j + 1) {
+            total = total + j;
+        }
+    }
+    retorne total;
+}
+
+funcao main() {
+    retorne mistura(100) % 256;
+}
+"""
+
+
+def bench_unroll(source: str, repeat: int) -> List[str]:
+    """Laços desenrolados (observações do passe) e tempo dos binários
+    (gcc -O0) com e sem unroll depois do licm"""
+    from ulxc import FusedLowering
+    from ulx_passes import PassManager
+    base = 'mem2reg,sccp,gvn,licm'
+    pipelines = (base + ',simplifycfg', base + ',unroll,sccp,gvn,simplifycfg')
+    program = parse_source(UNROLL_LOOP_SOURCE)
+    
+    module = FusedLowering().convert(program)
+    manager = PassManager(pipelines[1])
+    manager.run(module)
+    lines = [f"{len(manager.remarks)} loops unrolled"] + manager.remarks_report().splitlines()[1:]
+    if shutil.which('gcc') is None:
+        lines.append("binaries: gcc not found, skipped")
+        return lines
+    with tempfile.TemporaryDirectory() as directory:
+        results = []
+        for pipeline in pipelines:
+            module = FusedLowering().convert(program)
+            PassManager(pipeline).run(module)
+            results.append(min(run_binary(module, directory, 'unroll' + str(len(results)))
+                               for _ in range(repeat)))
+        (before, before_exit), (after, after_exit) = results
+        if before_exit != after_exit:
+            raise AssertionError(f"unroll changed the program result ({before_exit} != {after_exit})")
+        lines.append(f"unroll loop (gcc -O0): {before:.3f}s -> +unroll {after:.3f}s ({before / after:.2f}x)")
+    return lines
+
+
+VECTOR_ARRAY_SIZE = 1 << 16
+VECTOR_REPEATS = 2000
+
+
+def saxpy_module(size: int, repeats: int):
+    """IR de c[i] = a[i] * s + b[i] sobre arrays f32 (a linguagem ainda
+    não tem arrays): main preenche a e b e chama o kernel repeats vezes"""
+    from ulx_ir import (Module, Function, Value, Constant, Opcode, ICmpPredicate, IRBuilder,
+                        ArrayType, TypeF32, TypeI32, TypeVoid, TYPES)
+    module = Module('saxpy')
+    floats = TYPES.pointer(TypeF32)
+    params = [Value('%a', floats), Value('%b', floats), Value('%c', floats), Value('%n', TypeI32),
+              Value('%s', TypeF32)]
+    kernel = Function('saxpy', TypeVoid, params)
+    main = Function('main', TypeI32, [])
+    module.add_function(kernel)
+    module.add_function(main)
+    builder = IRBuilder(module)
+    
+    def counted_loop(limit: Value, body: Callable[[Value], None]):
+        """para (i = 0; i < limit; i = i + 1) body(i), já em SSA"""
+        preheader = builder.current_block
+        header = builder.create_block('for.cond')
+        loop_body = builder.create_block('for.body')
+        end = builder.create_block('for.end')
+        builder.br(header)
+        builder.set_block(header)
+        index = builder.phi(TypeI32, [(Constant(TypeI32, 0), preheader)])
+        phi = header.instructions[-1]
+        builder.cond_br(builder.icmp(ICmpPredicate.SLT, index, limit), loop_body, end)
+        builder.set_block(loop_body)
+        body(index)
+        phi.operands.extend([builder.add(index, Constant(TypeI32, 1)), builder.current_block])
+        builder.br(header)
+        builder.set_block(end)
+    
+    a, b, c, n, scale = params
+    builder.set_function(kernel)
+    counted_loop(n, lambda i: builder.store(
+        builder.fadd(builder.fmul(builder.load(builder.gep(a, i)), scale), builder.load(builder.gep(b, i))),
+        builder.gep(c, i)))
+    builder.ret()
+    
+    builder.set_function(main)
+    arrays = [builder.gep(builder.alloca(ArrayType(TypeF32, size)), Constant(TypeI32, 0)) for _ in range(3)]
+    size_value = Constant(TypeI32, size)
+    
+    def fill(i: Value):
+        value = builder.cast(Opcode.SITOFP, i, TypeF32)
+        builder.store(builder.fmul(value, Constant(TypeF32, 0.5)), builder.gep(arrays[0], i))
+        builder.store(builder.fsub(Constant(TypeF32, 1.0), value), builder.gep(arrays[1], i))
+    counted_loop(size_value, fill)
+    counted_loop(Constant(TypeI32, repeats), lambda _: builder.call(
+        kernel, arrays + [size_value, Constant(TypeF32, 1.5)]))
+    last = builder.load(builder.gep(arrays[2], Constant(TypeI32, size - 3)))
+    builder.ret(builder.sdiv(builder.cast(Opcode.FPTOSI, last, TypeI32), Constant(TypeI32, 256)))
+    return module
+
+
+def bench_vectorize(source: str, repeat: int) -> List[str]:
+    """Laço f32 elemento a elemento (saxpy) com e sem o vetorizador:
+    observações do passe e vazão dos binários (gcc -O0) em arrays grandes"""
+    from ulx_passes import PassManager
+    pipelines = ('', 'vectorize,simplifycfg')
+    manager = PassManager(pipelines[1])
+    manager.run(saxpy_module(VECTOR_ARRAY_SIZE, VECTOR_REPEATS))
+    lines = manager.remarks_report().splitlines()[1:]
+    if shutil.which('gcc') is None:
+        lines.append("binaries: gcc not found, skipped")
+        return lines
+    elements = VECTOR_ARRAY_SIZE * VECTOR_REPEATS
+    with tempfile.TemporaryDirectory() as directory:
+        results = []
+        for pipeline in pipelines:
+            module = saxpy_module(VECTOR_ARRAY_SIZE, VECTOR_REPEATS)
+            PassManager(pipeline).run(module)
+            results.append(min(run_binary(module, directory, 'saxpy' + str(len(results)))
+                               for _ in range(repeat)))
+        (before, before_exit), (after, after_exit) = results
+        if before_exit != after_exit:
+            raise AssertionError(f"vectorize changed the program result ({before_exit} != {after_exit})")
+        lines.append(f"saxpy {VECTOR_ARRAY_SIZE} floats x {VECTOR_REPEATS} (gcc -O0): "
+                     f"scalar {before:.3f}s ({elements / before / 1e6:.0f} M elements/s) -> "
+                     f"vectorized {after:.3f}s ({elements / after / 1e6:.0f} M elements/s, {before / after:.2f}x)")
+    return lines
+
+
+INLINE_LOOP_SOURCE = """
+funcao quadrado(x: inteiro): inteiro {
+    retorne x * x;
+}
+
+funcao limita(x: inteiro, teto: inteiro): inteiro {
+    se (x > teto) {
+        retorne x - teto;
+    }
+    retorne x;
+}
+
+funcao passo(total: inteiro, i: inteiro): inteiro {
+    retorne limita(total + quadrado(i % 100), 65521);
+}
+
+funcao main(): inteiro {
+    var total: inteiro = 0;
+    var i: inteiro;
+    para (i = 0; i < 20000000; i = i + 1) {
+        total = passo(total, i);
+    }
+    retorne total % 256;
+}
+"""
+
+
+def bench_inline(source: str, repeat: int) -> List[str]:
+    """Chamadas expandidas e tamanho do código (instruções da IR) no
+    programa de entrada e num laço quente que chama funções pequenas, com o
+    tempo dos binários (gcc -O0) com e sem inline depois do mem2reg"""
+    from ulxc import FusedLowering
+    from ulx_passes import PassManager, count_instructions
+    pipelines = ('mem2reg,sccp,gvn,licm,simplifycfg', 'mem2reg,inline,sccp,gvn,licm,simplifycfg')
+    lines = []
+    for label, text in (('input program', source), ('call loop', INLINE_LOOP_SOURCE)):
+        sizes = []
+        for pipeline in pipelines:
+            module = FusedLowering().convert(parse_source(text))
+            manager = PassManager(pipeline)
+            manager.run(module)
+            sizes.append(sum(count_instructions(func) for func in manager.functions(module)))
+        inlined = sum(1 for name, message in manager.remarks if name == 'inline' and ': inlined ' in message)
+        lines.append(f"{label}: {inlined} calls inlined, {len(module.functions)} functions left, "
+                     f"instructions {sizes[0]} -> {sizes[1]} ({sizes[1] - sizes[0]:+d})")
+    if shutil.which('gcc') is None:
+        lines.append("binaries: gcc not found, skipped")
+        return lines
+    program = parse_source(INLINE_LOOP_SOURCE)
+    with tempfile.TemporaryDirectory() as directory:
+        results = []
+        for pipeline in pipelines:
+            module = FusedLowering().convert(program)
+            PassManager(pipeline).run(module)
+            results.append(min(run_binary(module, directory, 'inline' + str(len(results)))
+                               for _ in range(repeat)))
+        (before, before_exit), (after, after_exit) = results
+        if before_exit != after_exit:
+            raise AssertionError(f"inline changed the program result ({before_exit} != {after_exit})")
+        lines.append(f"call loop (gcc -O0): {before:.3f}s -> +inline {after:.3f}s ({before / after:.2f}x)")
+    return lines
+
+
+TAILREC_SOURCE = """
+funcao soma(n: inteiro, total: inteiro): inteiro {
+    se (n <= 0) {
+        retorne total;
+    }
+    retorne soma(n - 1, total + 1);
+}
+
+funcao conta(n: inteiro): inteiro {
+    se (n <= 0) {
+        retorne 0;
+    }
+    retorne 1 + conta(n - 1);
+}
+
+funcao main(): inteiro {
+    var total: inteiro = 0;
+    var i: inteiro;
+    para (i = 0; i < {calls}; i = i + 1) {
+        total = total + soma({depth}, 0) / {depth} + conta({depth}) / {depth};
+    }
+    retorne total;
+}
+"""
+
+
+def bench_tailrec(source: str, repeat: int) -> List[str]:
+    """Chamadas de cauda eliminadas no programa de entrada e, com gcc, o
+    tempo de recursões rasas repetidas e de uma recursão de 10M níveis
+    (que sem o passe estoura a pilha) com e sem tailrec"""
+    from ulxc import FusedLowering
+    from ulx_passes import PassManager
+    pipelines = ('mem2reg,sccp,gvn,licm,simplifycfg', 'mem2reg,tailrec,sccp,gvn,licm,simplifycfg')
+    manager = PassManager(pipelines[1])
+    manager.run(FusedLowering().convert(parse_source(source)))
+    lines = [f"input program: {len(manager.remarks)} functions turned into loops"]
+    if shutil.which('gcc') is None:
+        lines.append("binaries: gcc not found, skipped")
+        return lines
+    shapes = (('shallow (1000 x depth 10000)', 1000, 10000), ('deep (1 x depth 10000000)', 1, 10000000))
+    with tempfile.TemporaryDirectory() as directory:
+        for label, calls, depth in shapes:
+            program = parse_source(TAILREC_SOURCE.replace('{calls}', str(calls)).replace('{depth}', str(depth)))
+            results = []
+            for pipeline in pipelines:
+                module = FusedLowering().convert(program)
+                PassManager(pipeline).run(module)
+                results.append(min(run_binary(module, directory, 'tailrec' + str(len(results)))
+                                   for _ in range(repeat)))
+            (before, before_exit), (after, after_exit) = results
+            if before_exit < 0:
+                lines.append(f"{label} (gcc -O0): recursion killed by signal {-before_exit}  "
+                             f"+tailrec {after:.3f}s (exit {after_exit})")
+                continue
+            if before_exit != after_exit:
+                raise AssertionError(f"tailrec changed the program result ({before_exit} != {after_exit})")
+            lines.append(f"{label} (gcc -O0): {before:.3f}s -> +tailrec {after:.3f}s ({before / after:.2f}x)")
+    return lines
+
+
+def bench_passes(source: str, repeat: int) -> List[str]:
+    """Custo do PassManager: mem2reg direto contra o pipeline (contagem de
+    instruções, cache de análises) e o relatório de um pipeline com análises"""
+    from ulxc import FusedLowering
+    from ulx_mem2reg import mem2reg
+    from ulx_passes import PassManager
+    program = parse_source(source)
+    
+    def lower():
+        return FusedLowering().convert(program)
+    
+    direct_time = best_time_prepared(lower, mem2reg, repeat)
+    managed_time = best_time_prepared(lower, lambda module: PassManager('mem2reg').run(module), repeat)
+    manager = PassManager('mem2reg,loops,liveness,domtree')
+    manager.run(lower())
+    return [
+        f"mem2reg direct: {direct_time:.3f}s  via PassManager: {managed_time:.3f}s "
+        f"({100 * (managed_time / direct_time - 1):+.0f}%)",
+    ] + manager.report().splitlines()
+
+
+BENCHMARKS = {
+    'lexer': bench_lexer,
+    'streaming': bench_streaming,
+    'compact': bench_compact,
+    'incremental': bench_incremental,
+    'mmap': bench_mmap,
+    'expressions': bench_expressions,
+    'ast': bench_ast,
+    'cache': bench_cache,
+    'intern': bench_intern,
+    'deep': bench_deep,
+    'frontend': bench_frontend,
+    'types': bench_types,
+    'scopes': bench_scopes,
+    'mem2reg': bench_mem2reg,
+    'loops': bench_loops,
+    'passes': bench_passes,
+    'sccp': bench_sccp,
+    'gvn': bench_gvn,
+    'simplifycfg': bench_simplifycfg,
+    'licm': bench_licm,
+    'indvars': bench_indvars,
+    'unroll': bench_unroll,
+    'vectorize': bench_vectorize,
+    'inline': bench_inline,
+    'tailrec': bench_tailrec,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ULX compiler benchmarks')
+    parser.add_argument('benchmarks', nargs='*', default=list(BENCHMARKS),
+                        help=f"Benchmarks to run ({', '.join(BENCHMARKS)})")
+    parser.add_argument('--functions', type=int, default=2000,
+                        help='Functions in the generated program')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions per measurement')
+    parser.add_argument('--input', help='Benchmark an existing ULX file instead')
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, 'r') as f:
+            source = f.read()
+    else:
+        source = generate_source(args.functions)
+
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"Unknown benchmark: {name}")
+        print(f"=== {name} ===")
+        for line in BENCHMARKS[name](source, args.repeat):
+            print(line)
+        print()
+
+
+if __name__ == '__main__':
+    main()
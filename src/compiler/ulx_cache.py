@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+ULX Cache - Cache em disco de ASTs já analisadas
+Chave = hash do fonte + versão do compilador; valor = Program serializado
+em tuplas com marshal (carga rápida, sem pickle de dataclasses)
+"""
+
+import gc
+import os
+import sys
+import marshal
+import hashlib
+import tempfile
+import dataclasses
+from typing import Dict, List, Optional, Union
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ulx_parser
+from ulx_parser import ASTNode, Program
+
+
+# Incrementar quando o formato serializado mudar
+CACHE_FORMAT = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'ulx')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Classes da AST em ordem estável; o índice identifica a classe no cache
+NODE_CLASSES = sorted(
+    (cls for cls in vars(ulx_parser).values()
+     if isinstance(cls, type) and issubclass(cls, ASTNode)),
+    key=lambda cls: cls.__name__)
+NODE_CODES = {cls: code for code, cls in enumerate(NODE_CLASSES)}
+NODE_FIELDS = [tuple(f.name for f in dataclasses.fields(cls)) for cls in NODE_CLASSES]
+TUPLE_CODE = -1
+
+_compiler_version: Optional[str] = None
+
+
+def compiler_version() -> str:
+    """Versão do compilador: hash do código do parser (que define a AST)"""
+    global _compiler_version
+    if _compiler_version is None:
+        digest = hashlib.sha256(f"ulx-cache-{CACHE_FORMAT}".encode())
+        with open(ulx_parser.__file__, 'rb') as f:
+            digest.update(f.read())
+        _compiler_version = digest.hexdigest()[:16]
+    return _compiler_version
+
+
+def encode(value: object) -> object:
+    """Converte a AST em tuplas/listas aceitas por marshal
+
+    Nó -> (código da classe, campo, ...); tupla -> (TUPLE_CODE, item, ...).
+    """
+    if isinstance(value, ASTNode):
+        fields = NODE_FIELDS[NODE_CODES[type(value)]]
+        return (NODE_CODES[type(value)],) + tuple(encode(getattr(value, name)) for name in fields)
+    if isinstance(value, list):
+        return [encode(item) for item in value]
+    if isinstance(value, tuple):
+        return (TUPLE_CODE,) + tuple(encode(item) for item in value)
+    return value
+
+
+def decode(value: object) -> object:
+    """Inverso de encode"""
+    kind = type(value)
+    if kind is tuple:
+        code = value[0]
+        if code == TUPLE_CODE:
+            return tuple(map(decode, value[1:]))
+        return NODE_CLASSES[code](*map(decode, value[1:]))
+    if kind is list:
+        return list(map(decode, value))
+    return value
+
+
+class ParseCache:
+    """Cache de ASTs em disco com despejo LRU limitado por tamanho
+
+    A recência é o mtime do arquivo (atualizado a cada acerto), então o LRU
+    vale entre execuções do compilador. Falhas de E/S viram miss.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, source: Union[str, bytes]) -> str:
+        if isinstance(source, str):
+            source = source.encode('utf-8')
+        digest = hashlib.sha256(compiler_version().encode())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.ast')
+
+    def get(self, source: Union[str, bytes]) -> Optional[Program]:
+        """Program em cache para source, ou None"""
+        path = self.path(self.key(source))
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Milhares de nós criados de uma vez: o GC cíclico só atrapalharia
+            enabled = gc.isenabled()
+            gc.disable()
+            try:
+                program = decode(marshal.loads(data))
+            finally:
+                if enabled:
+                    gc.enable()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, EOFError, TypeError, IndexError):
+            # Entrada corrompida ou de outro formato: descartar
+            self.discard(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return program
+
+    def put(self, source: Union[str, bytes], program: Program):
+        """Grava program no cache e aplica o limite de tamanho"""
+        try:
+            data = marshal.dumps(encode(program))
+        except (ValueError, RecursionError):
+            return  # Aninhamento profundo demais para serializar
+        if len(data) > self.max_bytes:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            # Escrita atômica: leitores concorrentes nunca veem arquivo parcial
+            os.replace(temp, self.path(self.key(source)))
+        except OSError:
+            self.discard(temp)
+            return
+        self.evict()
+
+    def entries(self) -> List[os.DirEntry]:
+        try:
+            with os.scandir(self.directory) as it:
+                return [entry for entry in it if entry.name.endswith('.ast')]
+        except OSError:
+            return []
+
+    def evict(self):
+        """Remove as entradas menos recentes até caber em max_bytes"""
+        stats: Dict[str, os.stat_result] = {}
+        for entry in self.entries():
+            try:
+                stats[entry.path] = entry.stat()
+            except OSError:
+                pass
+        total = sum(st.st_size for st in stats.values())
+        for path in sorted(stats, key=lambda p: stats[p].st_mtime_ns):
+            if total <= self.max_bytes:
+                break
+            total -= stats[path].st_size
+            self.discard(path)
+            self.evictions += 1
+
+    def discard(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        for entry in self.entries():
+            self.discard(entry.path)
+
+    def size(self) -> int:
+        total = 0
+        for entry in self.entries():
+            try:
+                total += entry.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def stats(self) -> str:
+        return (f"parse cache: {self.hits} hits, {self.misses} misses, "
+                f"{self.evictions} evictions, {self.size() / 1024:.0f} KiB in {self.directory}")
@@ -0,0 +1,588 @@
+#!/usr/bin/env python3
+"""
+ULX Check - Verificador da IR, interpretador e teste diferencial
+verify confere a forma da IR (terminadores, PHIs, definições que dominam
+os usos); Interpreter executa um Module com a mesma semântica do backend C;
+main compila os exemplos, os programas de regressão e programas aleatórios
+com vários pipelines e compara os resultados
+"""
+
+import argparse
+import os
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from ulx_ir import (Module, Function, BasicBlock, Instruction, Value, Constant, Type, TypeKind,
+                    Opcode, ICmpPredicate)
+from ulx_analysis import TERMINATORS, DominatorTree, live_instructions
+from ulx_sccp import INTEGER_BITS, wrap, fold_binary, fold_icmp
+
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'examples')
+
+# Pipelines comparados com a IR sem otimização ('')
+PIPELINES = [
+    'mem2reg',
+    'mem2reg,sccp,gvn,simplifycfg',
+    'mem2reg,licm,indvars,unroll,simplifycfg',
+    'mem2reg,tailrec',
+    'mem2reg,simplifycfg,tailrec,sccp',
+    'mem2reg,inline,tailrec,sccp,gvn,licm,indvars,unroll,simplifycfg',
+    None,   # DEFAULT_PIPELINE
+]
+
+
+def successors(block: BasicBlock) -> List[BasicBlock]:
+    """Alvos do primeiro terminador de block"""
+    for inst in live_instructions(block):
+        if inst.opcode in TERMINATORS:
+            return [op for op in inst.operands if isinstance(op, BasicBlock)]
+    return []
+
+
+def verify(func: Function, module: Module) -> List[str]:
+    """Problemas da IR de func (lista vazia se estiver bem formada)
+
+    Só as instruções até o primeiro terminador contam (o resto nunca
+    executa, e simplifycfg ainda não pode ter rodado). Nos blocos
+    alcançáveis: um terminador, PHIs no início com uma entrada por
+    predecessor, cada valor definido uma vez e antes dos usos
+    (o uso num PHI conta no fim do predecessor).
+    """
+    problems: List[str] = []
+    if not func.blocks:
+        return problems
+    domtree = DominatorTree(func)
+    reachable = [block for block in func.blocks if domtree.contains(block)]
+    predecessors: Dict[BasicBlock, List[BasicBlock]] = {block: [] for block in reachable}
+    defined: Dict[Value, Tuple[BasicBlock, int]] = {param: (func.blocks[0], -1) for param in func.params}
+    for block in reachable:
+        for target in successors(block):
+            if target not in predecessors:
+                problems.append(f"{block.name}: branch to unknown block {target.name}")
+            else:
+                predecessors[target].append(block)
+        for index, inst in enumerate(live_instructions(block)):
+            if inst.result is not None:
+                if inst.result in defined:
+                    problems.append(f"{block.name}: {inst.result.name} defined twice")
+                defined[inst.result] = (block, index)
+    if func.blocks[0].predecessors or predecessors.get(func.blocks[0]):
+        problems.append(f"entry block {func.blocks[0].name} has predecessors")
+
+    def available(value: Value, block: BasicBlock, index: int) -> bool:
+        """value definido antes da posição index de block"""
+        where = defined.get(value)
+        if where is None:
+            return False
+        def_block, def_index = where
+        if def_block is block:
+            return def_index < index
+        return domtree.dominates(def_block, block)
+
+    functions = set(id(f) for f in module.functions)
+    for block in reachable:
+        instructions = list(live_instructions(block))
+        if not instructions or instructions[-1].opcode not in TERMINATORS:
+            problems.append(f"{block.name}: no terminator")
+        phis_done = False
+        for index, inst in enumerate(instructions):
+            where = f"{block.name}: {str(inst).strip()}"
+            if inst.opcode is Opcode.PHI:
+                if phis_done:
+                    problems.append(f"{where}: phi after other instructions")
+                incoming = inst.operands[1::2]
+                expected = predecessors[block]
+                # Entradas de blocos que não desviam para cá (inalcançáveis, ou
+                # com o desvio depois de um ret) nunca são usadas: toleradas
+                if any(pred not in incoming for pred in expected):
+                    problems.append(f"{where}: incoming blocks do not match predecessors "
+                                    f"({', '.join(pred.name for pred in expected)})")
+                for value, pred in zip(inst.operands[0::2], incoming):
+                    if pred in expected and isinstance(value, Value) and not isinstance(value, Constant) \
+                            and not available(value, pred, len(pred.instructions)):
+                        problems.append(f"{where}: {value.name} does not reach the end of {pred.name}")
+                continue
+            phis_done = True
+            for op in inst.operands:
+                if isinstance(op, Function):
+                    if id(op) not in functions:
+                        problems.append(f"{where}: call to a function outside the module")
+                elif isinstance(op, BasicBlock) or isinstance(op, Type) or isinstance(op, Constant):
+                    continue
+                elif isinstance(op, Value) and not available(op, block, index):
+                    problems.append(f"{where}: {op.name} used before its definition")
+    return problems
+
+
+def verify_module(module: Module) -> List[str]:
+    return [f"@{func.name}: {problem}" for func in module.functions
+            if not func.is_external for problem in verify(func, module)]
+
+
+class Trap(Exception):
+    """Execução inválida (divisão por zero, limite de passos/recursão)"""
+
+
+# Tamanho em bytes de cada tipo na memória do interpretador
+SIZES = {TypeKind.I8: 1, TypeKind.I16: 2, TypeKind.I32: 4, TypeKind.I64: 8,
+         TypeKind.F32: 4, TypeKind.F64: 8, TypeKind.PTR: 8}
+
+FLOAT_OPS = {Opcode.FADD: lambda a, b: a + b, Opcode.FSUB: lambda a, b: a - b,
+             Opcode.FMUL: lambda a, b: a * b, Opcode.FDIV: lambda a, b: a / b}
+
+INTEGER_TO_FLOAT = {Opcode.ADD: Opcode.FADD, Opcode.SUB: Opcode.FSUB,
+                    Opcode.MUL: Opcode.FMUL, Opcode.SDIV: Opcode.FDIV}
+
+VECTOR_OPS = {Opcode.VADDPS: Opcode.FADD, Opcode.VSUBPS: Opcode.FSUB,
+              Opcode.VMULPS: Opcode.FMUL, Opcode.VDIVPS: Opcode.FDIV}
+
+
+def size_of(type: Type) -> int:
+    if type.kind is TypeKind.ARRAY:
+        return type.size * size_of(type.element_type)
+    return SIZES.get(type.kind, 8)
+
+
+def to_f32(value: float) -> float:
+    return struct.unpack('f', struct.pack('f', value))[0]
+
+
+class Interpreter:
+    """Executa a IR como o backend C a traduz
+
+    Inteiros truncam na largura do tipo; memória é um dicionário endereço
+    -> valor, zerada como as variáveis do C; parâmetros usados em load/store
+    são variáveis (como os slots do C). Chamadas a funções externas só
+    registram os argumentos em calls.
+    """
+
+    def __init__(self, module: Module, max_steps: int = 2_000_000, max_depth: int = 200):
+        self.module = module
+        self.memory: Dict[int, object] = {}
+        self.next_address = 4096
+        self.steps = max_steps
+        self.depth = max_depth
+        self.calls: List[Tuple[str, Tuple[object, ...]]] = []
+
+    def run(self, name: str = 'main') -> int:
+        """Código de saída de name() (os 8 bits baixos, como no processo)"""
+        func = next(func for func in self.module.functions if func.name == name)
+        result = self.call(func, [])
+        return (result if isinstance(result, int) else 0) & 0xff
+
+    def call(self, func: Function, args: List[object]) -> object:
+        if func.is_external or not func.blocks:
+            self.calls.append((func.name, tuple(args)))
+            return 0
+        if self.depth == 0:
+            raise Trap(f"recursion limit in @{func.name}")
+        self.depth -= 1
+        try:
+            return self.execute(func, args)
+        finally:
+            self.depth += 1
+
+    def execute(self, func: Function, args: List[object]) -> object:
+        values: Dict[Value, object] = dict(zip(func.params, args))
+        params = set(func.params)
+        previous, block = None, func.blocks[0]
+        while True:
+            instructions = block.instructions
+            index = 0
+            # PHIs leem os valores da aresta ao mesmo tempo
+            updates = []
+            while index < len(instructions) and instructions[index].opcode is Opcode.PHI:
+                inst = instructions[index]
+                ops = inst.operands
+                for k in range(1, len(ops), 2):
+                    if ops[k] is previous:
+                        updates.append((inst.result, self.operand(ops[k - 1], values)))
+                        break
+                else:
+                    raise Trap(f"@{func.name}: {block.name} entered from a block missing in its phi")
+                index += 1
+            values.update(updates)
+            for inst in instructions[index:]:
+                self.steps -= 1
+                if self.steps < 0:
+                    raise Trap("step limit")
+                opcode = inst.opcode
+                if opcode is Opcode.BR:
+                    previous, block = block, inst.operands[0]
+                    break
+                if opcode is Opcode.COND_BR:
+                    condition, true_block, false_block = inst.operands
+                    taken = true_block if self.operand(condition, values) else false_block
+                    previous, block = block, taken
+                    break
+                if opcode is Opcode.RET:
+                    return self.operand(inst.operands[0], values) if inst.operands else None
+                if opcode is Opcode.LOAD and inst.operands[0] in params:
+                    values[inst.result] = values[inst.operands[0]]
+                elif opcode is Opcode.STORE and inst.operands[1] in params:
+                    values[inst.operands[1]] = self.operand(inst.operands[0], values)
+                else:
+                    result = self.evaluate(inst, values)
+                    if inst.result is not None:
+                        values[inst.result] = result
+            else:
+                raise Trap(f"@{func.name}: {block.name} falls through")
+
+    def operand(self, value: Value, values: Dict[Value, object]) -> object:
+        if isinstance(value, Constant):
+            if isinstance(value.value, str) or value.value is None:
+                return 0
+            if value.type.kind is TypeKind.F32:
+                return to_f32(float(value.value))
+            return value.value
+        if value not in values:
+            raise Trap(f"{value.name} read before being defined")
+        return values[value]
+
+    def evaluate(self, inst: Instruction, values: Dict[Value, object]) -> object:
+        opcode = inst.opcode
+        ops = [self.operand(op, values) if isinstance(op, Value) else op for op in inst.operands]
+        result_type = inst.result.type if inst.result is not None else None
+        if opcode in FOLD_OPCODES:
+            if opcode in (Opcode.SDIV, Opcode.SREM) and ops[1] == 0:
+                raise Trap("division by zero")
+            if result_type.kind not in INTEGER_BITS:
+                # O front-end usa add/sub/mul/sdiv também para 'real'
+                operation = FLOAT_OPS[INTEGER_TO_FLOAT[opcode]]
+                return operation(float(ops[0]), float(ops[1]))
+            return wrap(fold_binary(opcode, ops[0], ops[1]), result_type)
+        if opcode is Opcode.ICMP:
+            bits = INTEGER_BITS.get(inst.operands[0].type.kind, 64)
+            return fold_icmp(inst.predicate, ops[0], ops[1], bits)
+        if opcode in FLOAT_OPS:
+            if opcode is Opcode.FDIV and ops[1] == 0:
+                raise Trap("float division by zero")
+            value = FLOAT_OPS[opcode](ops[0], ops[1])
+            return to_f32(value) if result_type.kind is TypeKind.F32 else value
+        if opcode is Opcode.CALL:
+            return self.call(inst.operands[0], ops[1:])
+        if opcode is Opcode.ALLOCA:
+            address = self.next_address
+            self.next_address += max(size_of(inst.operands[0]), 8)
+            return address
+        if opcode is Opcode.LOAD:
+            return self.memory.get(ops[0], 0.0 if result_type.kind in (TypeKind.F32, TypeKind.F64) else 0)
+        if opcode is Opcode.STORE:
+            self.memory[ops[1]] = ops[0]
+            return None
+        if opcode is Opcode.GEP:
+            element = result_type.element_type
+            return ops[0] + ops[1] * (size_of(element) if element is not None else 1)
+        if opcode is Opcode.VLOAD:
+            return tuple(self.memory.get(ops[0] + 4 * k, 0.0) for k in range(result_type.size))
+        if opcode is Opcode.VSTORE:
+            value, address = ops
+            lanes = value if isinstance(value, tuple) else (value,) * 8
+            for k, lane in enumerate(lanes):
+                self.memory[address + 4 * k] = lane
+            return None
+        if opcode in VECTOR_OPS:
+            lhs, rhs = ops
+            width = result_type.size
+            lhs = lhs if isinstance(lhs, tuple) else (lhs,) * width
+            rhs = rhs if isinstance(rhs, tuple) else (rhs,) * width
+            operation = FLOAT_OPS[VECTOR_OPS[opcode]]
+            return tuple(to_f32(operation(a, b)) for a, b in zip(lhs, rhs))
+        if opcode in (Opcode.TRUNC, Opcode.SEXT, Opcode.PTRTOINT, Opcode.INTTOPTR, Opcode.BITCAST):
+            return wrap(ops[0], result_type) if result_type.kind in INTEGER_BITS else ops[0]
+        if opcode is Opcode.ZEXT:
+            return ops[0] & ((1 << INTEGER_BITS[inst.operands[0].type.kind]) - 1)
+        if opcode in (Opcode.FPTRUNC, Opcode.FPEXT, Opcode.SITOFP):
+            value = float(ops[0])
+            return to_f32(value) if result_type.kind is TypeKind.F32 else value
+        if opcode is Opcode.FPTOSI:
+            return wrap(int(ops[0]), result_type)
+        raise Trap(f"cannot interpret {opcode.value}")
+
+
+FOLD_OPCODES = frozenset([Opcode.ADD, Opcode.SUB, Opcode.MUL, Opcode.SDIV, Opcode.SREM,
+                          Opcode.AND, Opcode.OR, Opcode.XOR])
+
+
+def lower(source: str) -> Module:
+    from ulx_parser import parse_source
+    from ulxc import FusedLowering
+    return FusedLowering().convert(parse_source(source))
+
+
+def optimize(source: str, pipeline: Optional[str]) -> Tuple[Module, List[str]]:
+    """Module de source depois de pipeline, verificado depois de cada passo;
+    devolve também os problemas encontrados ('passo: problema')"""
+    from ulx_passes import PassManager, DEFAULT_PIPELINE
+    module = lower(source)
+    problems = [f"lowering: {problem}" for problem in verify_module(module)]
+    names = DEFAULT_PIPELINE if pipeline is None else pipeline
+    for name in filter(None, names.split(',')):
+        PassManager(name).run(module)
+        problems.extend(f"{name}: {problem}" for problem in verify_module(module))
+        if problems:
+            break
+    return module, problems
+
+
+def interpret(module: Module) -> object:
+    """Código de saída de main, ou 'trap: motivo'"""
+    try:
+        return Interpreter(module).run()
+    except Trap as trap:
+        return f"trap: {trap}"
+
+
+def check_source(source: str, expected: Optional[int] = None) -> List[str]:
+    """Falhas de source: passo que levanta exceção, IR inválida depois de
+    algum passo ou resultado diferente do da IR sem otimização (ou de
+    expected)"""
+    failures = []
+    reference = interpret(optimize(source, '')[0])
+    if expected is not None and reference != expected:
+        failures.append(f"--passes=: exit {reference}, expected {expected}")
+    if isinstance(reference, str):
+        return failures     # Trap sem otimização: nada a comparar
+    for pipeline in PIPELINES:
+        label = 'default' if pipeline is None else pipeline
+        try:
+            module, problems = optimize(source, pipeline)
+        except Exception as error:
+            failures.append(f"{label}: {type(error).__name__} in a pass: {str(error)[:200]}")
+            continue
+        if problems:
+            failures.append(f"{label}: invalid IR after " + "; ".join(problems[:3]))
+            continue
+        result = interpret(module)
+        if result != reference:
+            failures.append(f"{label}: exit {result}, expected {reference}")
+    return failures
+
+
+def run_with_gcc(source: str, pipeline: Optional[str], directory: str) -> int:
+    """Compila module pelo backend C (gcc -O0) e devolve o código de saída"""
+    from ulxc import ULXCompiler
+    module, _ = optimize(source, pipeline)
+    c_path = os.path.join(directory, 'check.c')
+    binary = os.path.join(directory, 'check')
+    with open(c_path, 'w') as f:
+        f.write(ULXCompiler().ir_to_c(module))
+    subprocess.run(['gcc', '-O0', '-w', '-o', binary, c_path], check=True, capture_output=True)
+    return subprocess.run([binary]).returncode & 0xff
+
+
+# Programas que já foram compilados errado: (nome, código, saída esperada)
+REGRESSIONS: List[Tuple[str, str, int]] = [
+    # tailrec antes do simplifycfg: 'retorne 7' no laço deixa 'ret 7; ...; br'
+    # e o ret não ganhava o acumulador
+    ('tailrec: return inside a loop', """
+funcao f0(a: inteiro, b: inteiro): inteiro {
+    se (a > 0 && a < 8) {
+        retorne a + f0(a - 1, a);
+    }
+    se (0 < b) {
+        var w0: inteiro = 4;
+        enquanto (w0 > 0) {
+            retorne 7;
+            w0 = w0 - 1;
+        }
+    }
+    retorne 0;
+}
+
+funcao main(): inteiro {
+    retorne f0(3, 0) + f0(0, 1) * 10;
+}
+""", 83),
+    # Slots reaproveitados entre escopos: 'var y: inteiro;' lia o x morto
+    ('uninitialized variable in a reused slot', """
+funcao main(): inteiro {
+    var r: inteiro = 0;
+    se (r == 0) {
+        var x: inteiro = 5;
+        r = r + x;
+    }
+    se (r == 5) {
+        var y: inteiro;
+        r = r + y;
+    }
+    retorne r;
+}
+""", 5),
+]
+
+
+def random_expression(rng: random.Random, names: List[str], depth: int = 0) -> str:
+    choice = rng.random()
+    if depth > 2 or choice < 0.3:
+        return rng.choice(names) if names and rng.random() < 0.7 else str(rng.randint(0, 9))
+    if choice < 0.4:
+        return f"-{random_expression(rng, names, depth + 1)}"
+    if choice < 0.5:
+        return f"({random_expression(rng, names, depth + 1)} / {rng.randint(1, 5)})"
+    operator = rng.choice(['+', '-', '*', '+', '-'])
+    return f"({random_expression(rng, names, depth + 1)} {operator} {random_expression(rng, names, depth + 1)})"
+
+
+def random_condition(rng: random.Random, names: List[str]) -> str:
+    operator = rng.choice(['<', '>', '<=', '>=', '==', '!='])
+    return f"{random_expression(rng, names, 1)} {operator} {random_expression(rng, names, 1)}"
+
+
+class ProgramGenerator:
+    """Programa ULX aleatório que sempre termina: laços com contador
+    próprio, recursão só com o primeiro parâmetro decrescendo e chamadas
+    só para funções anteriores"""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.counter = 0
+
+    def fresh(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def statements(self, names: List[str], callees: List[Tuple[str, int]], depth: int, indent: str) -> List[str]:
+        rng = self.rng
+        names = list(names)
+        lines = []
+        for _ in range(rng.randint(1, 4)):
+            choice = rng.random()
+            if choice < 0.25:
+                name = self.fresh('v')
+                if rng.random() < 0.8:
+                    lines.append(f"{indent}var {name}: inteiro = {random_expression(rng, names)};")
+                else:
+                    lines.append(f"{indent}var {name}: inteiro;")
+                    lines.append(f"{indent}{name} = {random_expression(rng, names)};")
+                names.append(name)
+            elif choice < 0.45 and any(not name.startswith('w') for name in names):
+                # Contadores de laço (w...) só são alterados pelo próprio laço
+                target = rng.choice([name for name in names if not name.startswith('w')])
+                value = random_expression(rng, names)
+                if callees and rng.random() < 0.4:
+                    callee, arity = rng.choice(callees)
+                    args = [random_expression(rng, names, 1) for _ in range(arity)]
+                    if callee == 'self':
+                        callee, args[0] = self.current, f"{self.guard} - 1"
+                    value = f"{value} + {callee}({', '.join(args)})"
+                lines.append(f"{indent}{target} = {value};")
+            elif choice < 0.65 and depth < 3:
+                lines.append(f"{indent}se ({random_condition(rng, names)}) {{")
+                lines.extend(self.statements(names, callees, depth + 1, indent + "    "))
+                if rng.random() < 0.5:
+                    lines.append(f"{indent}}} senao {{")
+                    lines.extend(self.statements(names, callees, depth + 1, indent + "    "))
+                lines.append(f"{indent}}}")
+            elif choice < 0.8 and depth < 3:
+                counter = self.fresh('w')
+                lines.append(f"{indent}var {counter}: inteiro = {rng.randint(0, 4)};")
+                lines.append(f"{indent}enquanto ({counter} > 0) {{")
+                inner = self.statements(names + [counter], callees, depth + 1, indent + "    ")
+                lines.extend(inner)
+                lines.append(f"{indent}    {counter} = {counter} - 1;")
+                lines.append(f"{indent}}}")
+                names.append(counter)
+            else:
+                lines.append(f"{indent}retorne {self.return_value(names, callees)};")
+                break
+        return lines
+
+    def return_value(self, names: List[str], callees: List[Tuple[str, int]]) -> str:
+        rng = self.rng
+        value = random_expression(rng, names, 1)
+        if self.guarded and rng.random() < 0.5:
+            args = [f"{self.guard} - 1"] + [random_expression(rng, names, 2) for _ in range(self.arity - 1)]
+            call = f"{self.current}({', '.join(args)})"
+            shape = rng.randint(0, 2)
+            return call if shape == 0 else f"{value} + {call}" if shape == 1 else f"{call} * {rng.randint(1, 3)}"
+        return value
+
+    def program(self) -> str:
+        rng = self.rng
+        functions, callees = [], []
+        for index in range(rng.randint(1, 3)):
+            self.arity = rng.randint(1, 3)
+            params = [f"p{k}" for k in range(self.arity)]
+            self.current, self.guard, self.guarded = f"f{index}", params[0], False
+            lines = [f"funcao f{index}({', '.join(f'{p}: inteiro' for p in params)}): inteiro {{"]
+            # A recursão só aparece dentro da guarda p0 > 0 e 0 <= p0 < 7
+            lines.append(f"    se ({params[0]} < 0) {{ retorne {rng.randint(0, 9)}; }}")
+            lines.append(f"    se ({params[0]} > 6) {{ retorne {rng.randint(0, 9)}; }}")
+            lines.append(f"    se ({params[0]} > 0) {{")
+            self.guarded = True
+            lines.extend(self.statements(params, callees + [('self', self.arity)], 1, "        "))
+            self.guarded = False
+            lines.append("    }")
+            lines.extend(self.statements(params, callees, 1, "    "))
+            lines.append(f"    retorne {random_expression(rng, params)};")
+            lines.append("}")
+            functions.append("\n".join(lines))
+            callees.append((f"f{index}", self.arity))
+        calls = " + ".join(f"{name}({', '.join(str(rng.randint(0, 8)) for _ in range(arity))})"
+                           for name, arity in callees)
+        functions.append(f"funcao main(): inteiro {{\n    retorne {calls};\n}}")
+        return "\n\n".join(functions) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ULX IR verifier and differential tests')
+    parser.add_argument('--seeds', type=int, default=100, help='Random programs to check')
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--no-gcc', action='store_true', help='Do not run the examples through gcc')
+    args = parser.parse_args()
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+
+    failures = 0
+
+    def report(label: str, problems: List[str], source: Optional[str] = None):
+        nonlocal failures
+        if not problems:
+            return
+        failures += 1
+        print(f"FAIL {label}")
+        for problem in problems:
+            print(f"  {problem}")
+        if source is not None:
+            print("  " + source.replace("\n", "\n  "))
+
+    examples = sorted(name for name in os.listdir(EXAMPLES_DIR) if name.endswith('.ulx'))
+    sources = {}
+    for name in examples:
+        with open(os.path.join(EXAMPLES_DIR, name), 'r') as f:
+            sources[name] = f.read()
+        report(name, check_source(sources[name]))
+    print(f"examples: {len(examples)} checked")
+
+    if not args.no_gcc and shutil.which('gcc') is not None:
+        with tempfile.TemporaryDirectory() as directory:
+            for name, source in sources.items():
+                plain = run_with_gcc(source, '', directory)
+                optimized = run_with_gcc(source, None, directory)
+                if plain != optimized:
+                    report(f"{name} (gcc)", [f"exit {optimized} with the default pipeline, {plain} with --passes="])
+        print(f"examples (gcc -O0): {len(examples)} compiled and run")
+
+    for name, source, expected in REGRESSIONS:
+        report(name, check_source(source, expected), source)
+    print(f"regressions: {len(REGRESSIONS)} checked")
+
+    for seed in range(args.first_seed, args.first_seed + args.seeds):
+        source = ProgramGenerator(seed).program()
+        report(f"seed {seed}", check_source(source), source)
+    print(f"random programs: {args.seeds} checked")
+
+    if failures:
+        print(f"{failures} failure(s)")
+        sys.exit(1)
+    print("All checks passed!")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,16 @@ from dataclasses import dataclass, field
 from .ulx_ir import *
 
 
+# ymm0-13 guardam valores vetoriais; ymm14/15 recebem os escalares replicados
+VECTOR_REGISTERS = [f'ymm{i}' for i in range(14)]
+VECTOR_SCRATCH = ('ymm14', 'ymm15')
+
+# Instruções cujo resultado pode ser (ou carregar) um endereço vindo de um operando
+FRAME_DERIVING = (Opcode.GEP, Opcode.PTRTOINT, Opcode.INTTOPTR, Opcode.BITCAST, Opcode.TRUNC,
+                  Opcode.ZEXT, Opcode.SEXT, Opcode.ADD, Opcode.SUB, Opcode.AND, Opcode.OR,
+                  Opcode.XOR, Opcode.PHI)
+
+
 class RegisterAllocator:
     """Alocador de registradores simples (linear scan)"""
     
@@ -75,8 +85,15 @@ class X86_64CodeGen:
         self.functions: List[AssemblyFunction] = []
         self.data_section: List[str] = []
         self.current_function: Optional[AssemblyFunction] = None
+        self.ir_function: Optional[Function] = None
         self.reg_alloc: Optional[RegisterAllocator] = None
         self.label_counter = 0
+        # Valores vetoriais (VLOAD/V*PS) só vivem dentro do bloco que os define
+        self.vector_regs: Dict[str, str] = {}
+        self.vector_free: List[str] = []
+        self.vector_last_use: Dict[str, Instruction] = {}
+        self.definitions: Dict[Value, Instruction] = {}
+        self.stores: List[Instruction] = []
     
     def new_label(self, prefix: str = "L") -> str:
         """Gera um novo label único"""
@@ -118,8 +135,13 @@ class X86_64CodeGen:
     def generate_function(self, func: Function):
         """Gera código para uma função"""
         self.current_function = AssemblyFunction(func.name)
+        self.ir_function = func
         self.reg_alloc = RegisterAllocator()
         self.functions.append(self.current_function)
+        self.definitions = {inst.result: inst for block in func.blocks for inst in block.instructions
+                            if inst.result is not None}
+        self.stores = [inst for block in func.blocks for inst in block.instructions
+                       if inst.opcode == Opcode.STORE]
         
         # Prologue
         self.emit("pushq %rbp")
@@ -157,6 +179,10 @@ class X86_64CodeGen:
     
     def calculate_locals_size(self, func: Function) -> int:
         """Calcula espaço necessário para variáveis locais"""
+        if func.frame:
+            # Slots já atribuídos pelos escopos (reaproveitados entre blocos)
+            return max(func.frame_size, len(func.params)) * 8
+        
         # Contar alocações no entry block
         count = len(func.params)
         for block in func.blocks:
@@ -170,8 +196,57 @@ class X86_64CodeGen:
         if block.name != "entry":
             self.emit(f"{block.name}:")
         
-        for inst in block.instructions:
+        instructions = block.instructions
+        self.vector_regs = {}
+        self.vector_free = list(VECTOR_REGISTERS)
+        self.vector_last_use = {op.name: inst for inst in instructions for op in inst.operands
+                                if isinstance(op, Value) and not isinstance(op, Constant)}
+        index = 0
+        while index < len(instructions):
+            inst = instructions[index]
+            if self.is_sibling_call(inst, instructions[index + 1:]):
+                # call + ret viram um único jmp; o ret não é gerado
+                self.gen_sibling_call(inst)
+                index += 2
+                continue
             self.generate_instruction(inst)
+            index += 1
+    
+    def is_sibling_call(self, inst: Instruction, rest: List[Instruction]) -> bool:
+        """call seguido de ret do seu resultado (ou ret sem valor numa chamada
+        sem resultado), com os argumentos cabendo em registradores"""
+        if inst.opcode != Opcode.CALL or len(rest) != 1 or rest[0].opcode != Opcode.RET:
+            return False
+        func = inst.operands[0]
+        if not isinstance(func, Function) or len(inst.operands) - 1 > 6:
+            return False
+        if any(self.points_into_frame(arg) for arg in inst.operands[1:]):
+            return False
+        ret = rest[0]
+        if ret.operands:
+            return inst.result is not None and ret.operands[0] is inst.result
+        return inst.result is None
+    
+    def points_into_frame(self, value: Value, through_memory: bool = True) -> bool:
+        """value pode ser um endereço no quadro atual (alloca, ou derivado de
+        uma por gep/casts/aritmética/phi, ou um load quando a função guarda
+        algum desses na memória); o leave o deixaria pendurado"""
+        pending, seen = [value], set()
+        while pending:
+            value = pending.pop()
+            if value in seen or not isinstance(value, Value):
+                continue
+            seen.add(value)
+            inst = self.definitions.get(value)
+            if inst is None:
+                continue
+            if inst.opcode == Opcode.ALLOCA:
+                return True
+            if inst.opcode == Opcode.LOAD and through_memory and self.frame_stored():
+                return True
+            if inst.opcode in FRAME_DERIVING:
+                pending.extend(inst.operands)
+        return False
     
     def generate_instruction(self, inst: Instruction):
         """Gera código para uma instrução"""
@@ -191,6 +266,9 @@ class X86_64CodeGen:
             Opcode.PHI: self.gen_phi,
             # ULX Interceptor Hardware Acceleration
             Opcode.VADDPS: self.gen_vaddps,
+            Opcode.VSUBPS: self.gen_vsubps,
+            Opcode.VMULPS: self.gen_vmulps,
+            Opcode.VDIVPS: self.gen_vdivps,
             Opcode.VLOAD: self.gen_vload,
             Opcode.VSTORE: self.gen_vstore,
             Opcode.GPU_SUBMIT: self.gen_gpu_submit,
@@ -202,6 +280,13 @@ class X86_64CodeGen:
         else:
             self.emit(f"# TODO: {inst.opcode}")
     
+    def frame_address(self, ptr: Value) -> str:
+        """Endereço de um parâmetro/local: slot N fica em -8*(N+1)(%rbp)"""
+        slot = self.ir_function.frame.get(ptr.name) if self.ir_function else None
+        if slot is None:
+            return ptr.name
+        return f"-{8 * (slot + 1)}(%rbp)"
+    
     def gen_alloca(self, inst: Instruction):
         """Gera código para alloca"""
         # Alocação já feita no prologue
@@ -212,13 +297,14 @@ class X86_64CodeGen:
         ptr = inst.operands[0]
         result = inst.result
         
+        address = self.frame_address(ptr)
         reg = self.reg_alloc.allocate(result.name)
         if reg:
-            self.emit(f"movq {ptr.name}, %{reg}")
+            self.emit(f"movq {address}, %{reg}")
         else:
             # Spill
             offset = self.reg_alloc.spill_slots[result.name]
-            self.emit(f"movq {ptr.name}, %rax")
+            self.emit(f"movq {address}, %rax")
             self.emit(f"movq %rax, -{offset}(%rbp)")
     
     def gen_store(self, inst: Instruction):
@@ -227,7 +313,7 @@ class X86_64CodeGen:
         ptr = inst.operands[1]
         
         self.emit(f"movq {value.name}, %rax")
-        self.emit(f"movq %rax, {ptr.name}")
+        self.emit(f"movq %rax, {self.frame_address(ptr)}")
     
     def gen_add(self, inst: Instruction):
         """Gera código para add"""
@@ -358,6 +444,27 @@ class X86_64CodeGen:
             if reg and reg != 'rax':
                 self.emit(f"movq %rax, %{reg}")
     
+    def frame_stored(self) -> bool:
+        """Algum store da função grava um endereço do quadro"""
+        return any(self.points_into_frame(inst.operands[0], False) for inst in self.stores)
+    
+    def gen_sibling_call(self, inst: Instruction):
+        """Chamada de cauda: carrega os argumentos, desfaz o quadro atual e
+        salta para a função, que retorna direto para o nosso chamador"""
+        func = inst.operands[0]
+        args = inst.operands[1:]
+        
+        # Argumentos primeiro: podem estar no quadro que vai ser desfeito
+        for i, arg in enumerate(args):
+            arg_reg = RegisterAllocator.ARG_REGISTERS[i]
+            self.emit(f"movq {arg.name}, %{arg_reg}")
+        
+        for reg in reversed(RegisterAllocator.CALLEE_SAVED):
+            self.emit(f"popq %{reg}")
+        
+        self.emit("leave")
+        self.emit(f"jmp {func.name}")
+    
     def gen_ret(self, inst: Instruction):
         """Gera código para retorno"""
         if inst.operands:
@@ -380,20 +487,72 @@ class X86_64CodeGen:
 
     # --- ULX Interceptor: AVX & GPU Code Generation ---
 
+    def vector_operand(self, value: Value, scratch: str) -> str:
+        """Registrador ymm com value: vetores já estão em um; escalares f32
+        são replicados nos 8 elementos em scratch com vbroadcastss"""
+        if value.name in self.vector_regs:
+            return self.vector_regs[value.name]
+        if isinstance(value, Constant):
+            label = self.new_label("LCF")
+            self.data_section.append(f"{label}: .float {float(value.value)!r}")
+            source = f"{label}(%rip)"
+        else:
+            source = value.name
+        self.emit(f"vbroadcastss {source}, %{scratch}")
+        return scratch
+
+    def release_vectors(self, inst: Instruction):
+        """Libera os ymm dos operandos vetoriais cujo último uso é inst"""
+        for op in inst.operands:
+            if isinstance(op, Value) and self.vector_last_use.get(op.name) is inst:
+                reg = self.vector_regs.get(op.name)
+                if reg is not None and reg not in self.vector_free:
+                    self.vector_free.append(reg)
+
+    def allocate_vector(self, value: Value) -> str:
+        if not self.vector_free:
+            raise RuntimeError(f"{self.ir_function.name}: no free ymm register for {value.name}")
+        reg = self.vector_free.pop(0)
+        self.vector_regs[value.name] = reg
+        return reg
+
     def gen_vload(self, inst: Instruction):
         """AVX: Carrega 256 bits (8 floats) para um registrador YMM"""
         ptr = inst.operands[0]
-        # Usamos vmovaps para carregar memória alinhada (SlabAllocator garante isso)
-        self.emit(f"vmovaps {ptr.name}, %ymm0")
+        reg = self.allocate_vector(inst.result)
+        # vmovups: o vetorizador carrega a[i + c], sem alinhamento de 32 bytes
+        self.emit(f"vmovups {self.frame_address(ptr)}, %{reg}")
+
+    def gen_vector_binary(self, inst: Instruction, mnemonic: str):
+        """result = lhs op rhs; em AT&T 'op %rhs, %lhs, %result'"""
+        lhs = self.vector_operand(inst.operands[0], VECTOR_SCRATCH[0])
+        rhs = self.vector_operand(inst.operands[1], VECTOR_SCRATCH[1])
+        self.release_vectors(inst)
+        reg = self.allocate_vector(inst.result)
+        self.emit(f"{mnemonic} %{rhs}, %{lhs}, %{reg}")
 
     def gen_vaddps(self, inst: Instruction):
         """AVX: Soma vetorial de 8 floats em paralelo"""
-        self.emit("vaddps %ymm1, %ymm0, %ymm0")
+        self.gen_vector_binary(inst, "vaddps")
+
+    def gen_vsubps(self, inst: Instruction):
+        """AVX: Subtração vetorial de 8 floats"""
+        self.gen_vector_binary(inst, "vsubps")
+
+    def gen_vmulps(self, inst: Instruction):
+        """AVX: Multiplicação vetorial de 8 floats"""
+        self.gen_vector_binary(inst, "vmulps")
+
+    def gen_vdivps(self, inst: Instruction):
+        """AVX: Divisão vetorial de 8 floats"""
+        self.gen_vector_binary(inst, "vdivps")
 
     def gen_vstore(self, inst: Instruction):
         """AVX: Salva 256 bits do registrador YMM para a memória"""
-        ptr = inst.operands[0]
-        self.emit(f"vmovaps %ymm0, {ptr.name}")
+        value, ptr = inst.operands
+        reg = self.vector_operand(value, VECTOR_SCRATCH[0])
+        self.release_vectors(inst)
+        self.emit(f"vmovups %{reg}, {self.frame_address(ptr)}")
 
     def gen_gpu_submit(self, inst: Instruction):
         """GPU: Intercepta e envia comando para a Vulkan Layer do ULX"""
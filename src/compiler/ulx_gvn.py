@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+ULX GVN - Numeração de valores sobre a árvore de dominadores
+Reaproveita o valor dominante equivalente de cada expressão pura e, dentro
+de um bloco, loads repetidos do mesmo endereço
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from ulx_ir import Module, Function, BasicBlock, Instruction, Value, Constant, Opcode, ICmpPredicate
+from ulx_analysis import DominatorTree, TERMINATORS
+
+
+# Sem efeitos colaterais: o mesmo opcode com os mesmos operandos dá o mesmo valor.
+# Divisões entram porque a equivalente dominante já executou (ou já trapou).
+PURE = frozenset([
+    Opcode.ADD, Opcode.SUB, Opcode.MUL, Opcode.SDIV, Opcode.UDIV, Opcode.SREM, Opcode.UREM,
+    Opcode.FADD, Opcode.FSUB, Opcode.FMUL, Opcode.FDIV, Opcode.FREM,
+    Opcode.AND, Opcode.OR, Opcode.XOR, Opcode.SHL, Opcode.LSHR, Opcode.ASHR,
+    Opcode.ICMP, Opcode.FCMP, Opcode.GEP,
+    Opcode.TRUNC, Opcode.ZEXT, Opcode.SEXT, Opcode.FPTRUNC, Opcode.FPEXT,
+    Opcode.FPTOUI, Opcode.FPTOSI, Opcode.UITOFP, Opcode.SITOFP,
+    Opcode.PTRTOINT, Opcode.INTTOPTR, Opcode.BITCAST,
+])
+
+COMMUTATIVE = frozenset([Opcode.ADD, Opcode.MUL, Opcode.AND, Opcode.OR, Opcode.XOR,
+                         Opcode.FADD, Opcode.FMUL])
+
+# Predicado equivalente com os operandos trocados (a < b  <=>  b > a)
+SWAPPED = {
+    ICmpPredicate.EQ: ICmpPredicate.EQ, ICmpPredicate.NE: ICmpPredicate.NE,
+    ICmpPredicate.SLT: ICmpPredicate.SGT, ICmpPredicate.SGT: ICmpPredicate.SLT,
+    ICmpPredicate.SLE: ICmpPredicate.SGE, ICmpPredicate.SGE: ICmpPredicate.SLE,
+    ICmpPredicate.ULT: ICmpPredicate.UGT, ICmpPredicate.UGT: ICmpPredicate.ULT,
+    ICmpPredicate.ULE: ICmpPredicate.UGE, ICmpPredicate.UGE: ICmpPredicate.ULE,
+}
+
+
+def operand_key(operand: object) -> object:
+    """Constantes iguais são objetos distintos: a chave usa tipo e valor"""
+    if isinstance(operand, Constant):
+        return ('const', operand.type, operand.value)
+    return operand
+
+
+def expression_key(inst: Instruction) -> Optional[tuple]:
+    """(opcode, predicado, tipo, operandos) canônico, ou None se impura"""
+    opcode = inst.opcode
+    if opcode not in PURE or inst.result is None:
+        return None
+    keys = [operand_key(op) for op in inst.operands]
+    predicate = inst.predicate
+    if len(keys) == 2 and (opcode in COMMUTATIVE or predicate in SWAPPED):
+        # Ordem canônica: o operando de menor id primeiro; constantes por último
+        first, second = keys
+        if rank(second) < rank(first):
+            keys = [second, first]
+            if predicate is not None:
+                predicate = SWAPPED[predicate]
+    return (opcode, predicate, inst.result.type, tuple(keys))
+
+
+def rank(key: object) -> tuple:
+    if isinstance(key, tuple):
+        return (1, str(key[2]))
+    return (0, id(key))
+
+
+class ValueNumbering:
+    """GVN de uma função em pré-ordem da árvore de dominadores
+
+    A tabela de expressões é aninhada como a árvore: o que um bloco define
+    vale nos blocos que ele domina e sai da tabela ao voltar da subárvore.
+    PHIs de um mesmo bloco com as mesmas entradas também são unificados.
+    """
+
+    def __init__(self, func: Function, domtree: DominatorTree):
+        self.function = func
+        self.domtree = domtree
+        self.table: Dict[tuple, Value] = {}
+        self.replace: Dict[Value, Value] = {}
+        self.removed = 0
+
+    def resolve(self, value: object) -> object:
+        replace = self.replace
+        while value in replace:
+            value = replace[value]
+        return value
+
+    def run(self) -> int:
+        if not self.domtree.order:
+            return 0
+        stack: List[Tuple[BasicBlock, Optional[list]]] = [(self.domtree.order[0], None)]
+        while stack:
+            block, added = stack.pop()
+            if added is not None:
+                for key in added:
+                    del self.table[key]
+                continue
+            stack.append((block, self.number_block(block)))
+            stack.extend((child, None) for child in reversed(self.domtree.children[block]))
+
+        # Operandos de PHI vindos de arestas de volta e blocos fora da árvore
+        if self.replace:
+            for block in self.function.blocks:
+                reachable = self.domtree.contains(block)
+                for inst in block.instructions:
+                    if reachable and inst.opcode is not Opcode.PHI:
+                        break
+                    inst.operands = [self.resolve(op) if isinstance(op, Value) else op
+                                     for op in inst.operands]
+        return self.removed
+
+    def number_block(self, block: BasicBlock) -> list:
+        """Numera as instruções de block; devolve as chaves que ele acrescentou"""
+        table = self.table
+        replace = self.replace
+        added = []
+        loads: Dict[Value, Value] = {}     # Ponteiro -> último valor lido/escrito
+        phis: Dict[tuple, Value] = {}
+        kept = []
+        terminated = False
+        for inst in block.instructions:
+            if replace:
+                inst.operands = [self.resolve(op) if isinstance(op, Value) else op
+                                 for op in inst.operands]
+            opcode = inst.opcode
+            if terminated:
+                # Depois do terminador nada executa: não pode ser líder
+                pass
+            elif opcode in TERMINATORS:
+                terminated = True
+            elif opcode is Opcode.PHI:
+                key = tuple(operand_key(op) for op in inst.operands)
+                leader = phis.get(key)
+                if leader is not None and leader.type is inst.result.type:
+                    replace[inst.result] = leader
+                    self.removed += 1
+                    continue
+                phis[key] = inst.result
+            elif opcode is Opcode.LOAD:
+                known = loads.get(inst.operands[0])
+                if known is not None and known.type is inst.result.type:
+                    replace[inst.result] = known
+                    self.removed += 1
+                    continue
+                loads[inst.operands[0]] = inst.result
+            elif opcode is Opcode.STORE:
+                # Sem análise de alias entre ponteiros: só o endereço escrito segue conhecido
+                loads.clear()
+                loads[inst.operands[1]] = inst.operands[0]
+            elif opcode is Opcode.CALL or opcode is Opcode.VSTORE:
+                loads.clear()
+            else:
+                key = expression_key(inst)
+                if key is not None:
+                    leader = table.get(key)
+                    if leader is not None:
+                        replace[inst.result] = leader
+                        self.removed += 1
+                        continue
+                    table[key] = inst.result
+                    added.append(key)
+            kept.append(inst)
+        block.instructions = kept
+        return added
+
+
+def number_values(func: Function, domtree: Optional[DominatorTree] = None) -> int:
+    """GVN em func; devolve quantas instruções foram removidas"""
+    if func.is_external or not func.blocks:
+        return 0
+    return ValueNumbering(func, domtree or DominatorTree(func)).run()
+
+
+def gvn(module: Module) -> int:
+    return sum(number_values(func) for func in module.functions)
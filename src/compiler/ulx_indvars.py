@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+ULX IndVars - Variáveis de indução e redução de força
+Troca multiplicações por uma variável de indução por recorrências aditivas
+e, quando possível, reescreve o teste de saída sobre a nova variável
+(linear-function test replacement) e elimina a original
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from ulx_ir import Module, Function, BasicBlock, Instruction, Value, Constant, Opcode, ICmpPredicate
+from ulx_analysis import LoopForest, Loop, TERMINATORS
+from ulx_gvn import operand_key
+from ulx_sccp import INTEGER_BITS, wrap
+
+
+class InductionVariable:
+    """Variável de indução básica: phi = [init, pré-cabeçalho], [phi op step, latches]"""
+
+    __slots__ = ('phi', 'init', 'step', 'increment', 'block')
+
+    def __init__(self, phi: Instruction, init: Value, step: Value, increment: Instruction, block: BasicBlock):
+        self.phi = phi
+        self.init = init
+        self.step = step                # Invariante; subtraído se increment for SUB
+        self.increment = increment
+        self.block = block              # Bloco do increment
+
+    def constant_step(self) -> Optional[int]:
+        """Passo com sinal, se constante"""
+        if not isinstance(self.step, Constant) or not isinstance(self.step.value, int):
+            return None
+        return -self.step.value if self.increment.opcode is Opcode.SUB else self.step.value
+
+
+class DerivedVariable:
+    """Variável derivada base * factor, mantida por uma recorrência própria"""
+
+    __slots__ = ('base', 'factor', 'phi', 'increment')
+
+    def __init__(self, base: InductionVariable, factor: Value, phi: Instruction, increment: Instruction):
+        self.base = base
+        self.factor = factor
+        self.phi = phi
+        self.increment = increment
+
+
+def is_loop_invariant(value: object, loop: Loop, definitions: Dict[Value, BasicBlock]) -> bool:
+    """Constante, parâmetro ou valor definido fora de loop"""
+    if not isinstance(value, Value):
+        return False
+    block = definitions.get(value)
+    return block is None or block not in loop.blocks
+
+
+def find_induction_variables(loop: Loop, definitions: Dict[Value, BasicBlock]) -> Dict[Value, InductionVariable]:
+    """Variáveis de indução básicas do cabeçalho de loop (que precisa de
+    pré-cabeçalho); definitions mapeia cada valor ao bloco que o define"""
+    header = loop.header
+    preheader = loop.preheader
+    found: Dict[Value, InductionVariable] = {}
+    for phi in header.instructions:
+        if phi.opcode is not Opcode.PHI:
+            break
+        if phi.result.type.kind not in INTEGER_BITS:
+            continue
+        init = None
+        latch_values = set()
+        for k in range(0, len(phi.operands), 2):
+            value, pred = phi.operands[k], phi.operands[k + 1]
+            if pred is preheader:
+                init = value
+            else:
+                latch_values.add(value)
+        if init is None or len(latch_values) != 1:
+            continue
+        increment_value = latch_values.pop()
+        block = definitions.get(increment_value)
+        if block is None or block not in loop.blocks:
+            continue
+        increment = next(inst for inst in block.instructions if inst.result is increment_value)
+        operands = increment.operands
+        if increment.opcode is Opcode.ADD and operands[1] is phi.result:
+            step = operands[0]
+        elif increment.opcode in (Opcode.ADD, Opcode.SUB) and operands[0] is phi.result:
+            step = operands[1]
+        else:
+            continue
+        if step is not phi.result and is_loop_invariant(step, loop, definitions):
+            found[phi.result] = InductionVariable(phi, init, step, increment, block)
+    return found
+
+
+# Predicados com a variável de indução à esquerda que exigem passo positivo
+ASCENDING = {ICmpPredicate.SLT, ICmpPredicate.SLE}
+DESCENDING = {ICmpPredicate.SGT, ICmpPredicate.SGE}
+
+
+class InductionSimplifier:
+    """Redução de força e LFTR numa função, dos laços internos para fora"""
+
+    def __init__(self, func: Function, forest: LoopForest):
+        self.function = func
+        self.forest = forest
+        self.definitions: Dict[Value, BasicBlock] = {}
+        self.used_names: Set[str] = {param.name for param in func.params}
+        for block in func.blocks:
+            for inst in block.instructions:
+                if inst.result is not None:
+                    self.definitions[inst.result] = block
+                    self.used_names.add(inst.result.name)
+        self.reduced = 0
+        self.replaced_tests = 0
+        self.removed = 0
+
+    def new_value(self, base: str, type) -> Value:
+        name, suffix = f"{base}.iv", 1
+        while name in self.used_names:
+            name = f"{base}.iv{suffix}"
+            suffix += 1
+        self.used_names.add(name)
+        return Value(name, type)
+
+    def is_invariant(self, value: object, loop: Loop) -> bool:
+        return is_loop_invariant(value, loop, self.definitions)
+
+    def run(self) -> Tuple[int, int, int]:
+        for loop in reversed(self.forest.loops()):
+            if loop.preheader is not None:
+                self.simplify_loop(loop)
+        return self.reduced, self.replaced_tests, self.removed
+
+    def simplify_loop(self, loop: Loop):
+        basic = find_induction_variables(loop, self.definitions)
+        if not basic:
+            return
+        uses = self.collect_uses()
+        derived: Dict[tuple, DerivedVariable] = {}
+        replace: Dict[Value, Value] = {}
+        removed: Set[Instruction] = set()
+        for block in loop.blocks:
+            for inst in list(block.instructions):    # derive insere no cabeçalho
+                if inst.opcode is not Opcode.MUL:
+                    continue
+                first, second = inst.operands
+                if first in basic and self.is_invariant(second, loop):
+                    iv, factor = basic[first], second
+                elif second in basic and self.is_invariant(first, loop):
+                    iv, factor = basic[second], first
+                else:
+                    continue
+                if inst.result.type is not iv.phi.result.type:
+                    continue
+                # Fora do laço o valor é o da iteração em que a multiplicação rodou
+                if any(user_block not in loop.blocks for _, user_block in uses.get(inst.result, ())):
+                    continue
+                key = (iv.phi.result, operand_key(factor))
+                variable = derived.get(key)
+                if variable is None:
+                    variable = derived[key] = self.derive(loop, iv, factor)
+                replace[inst.result] = variable.phi.result
+                removed.add(inst)
+        if removed:
+            for block in self.function.blocks:
+                if any(inst in removed for inst in block.instructions):
+                    block.instructions = [inst for inst in block.instructions if inst not in removed]
+                for inst in block.instructions:
+                    inst.operands = [replace.get(op, op) if isinstance(op, Value) else op
+                                     for op in inst.operands]
+            self.reduced += len(removed)
+        for variable in derived.values():
+            self.replace_test(loop, variable)
+
+    def derive(self, loop: Loop, iv: InductionVariable, factor: Value) -> DerivedVariable:
+        """Cria phi = [init * factor], [phi op step * factor] ao lado de iv"""
+        type = iv.phi.result.type
+        preheader = loop.preheader
+        setup: List[Instruction] = []
+
+        def product(a: Value, b: Value) -> Value:
+            known = [op.value for op in (a, b) if isinstance(op, Constant) and isinstance(op.value, int)]
+            if len(known) == 2:
+                return Constant(type, wrap(known[0] * known[1], type))
+            if known and known[0] == 0:
+                return Constant(type, 0)
+            if known and known[0] == 1:
+                return b if isinstance(a, Constant) else a
+            result = self.new_value(iv.phi.result.name + '.mul', type)
+            setup.append(Instruction(Opcode.MUL, result, [a, b]))
+            self.definitions[result] = preheader
+            return result
+        start = product(iv.init, factor)
+        stride = product(iv.step, factor)
+        position = next(index for index, inst in enumerate(preheader.instructions)
+                        if inst.opcode in TERMINATORS)
+        preheader.instructions[position:position] = setup
+
+        phi_value = self.new_value(iv.phi.result.name, type)
+        next_value = self.new_value(iv.phi.result.name + '.next', type)
+        operands = []
+        for pred in loop.header.predecessors:
+            operands.extend((start if pred is preheader else next_value, pred))
+        phi = Instruction(Opcode.PHI, phi_value, operands)
+        header = loop.header.instructions
+        header.insert(header.index(iv.phi) + 1, phi)
+        increment = Instruction(iv.increment.opcode, next_value, [phi_value, stride])
+        block = iv.block.instructions
+        block.insert(block.index(iv.increment) + 1, increment)
+        self.definitions[phi_value] = loop.header
+        self.definitions[next_value] = iv.block
+        return DerivedVariable(iv, factor, phi, increment)
+
+    def replace_test(self, loop: Loop, variable: DerivedVariable):
+        """LFTR: 'icmp iv, limite' vira 'icmp derivada, limite * fator' e a
+        variável original some se só o teste e o incremento a usavam
+
+        Só com início, passo, fator e limite constantes, fator positivo,
+        passo no sentido do teste e nenhum produto estourando o tipo: assim
+        a ordem das comparações é a mesma.
+        """
+        iv = variable.base
+        factor, init, step = variable.factor, iv.init, iv.constant_step()
+        if step is None or not all(isinstance(value, Constant) and isinstance(value.value, int)
+                                   for value in (factor, init)) or factor.value <= 0:
+            return
+        uses = self.collect_uses()
+        phi_users = [user for user, _ in uses.get(iv.phi.result, ()) if user is not iv.increment]
+        if len(phi_users) != 1 or any(user is not iv.phi for user, _ in uses.get(iv.increment.result, ())):
+            return
+        # O teste precisa ser a saída do cabeçalho, avaliada em toda iteração
+        test = phi_users[0]
+        header = loop.header
+        branch = header.instructions[-1]
+        if test.opcode is not Opcode.ICMP or test not in header.instructions \
+                or [user for user, _ in uses.get(test.result, ())] != [branch] \
+                or branch.opcode is not Opcode.COND_BR or branch.operands[1] not in loop.blocks \
+                or branch.operands[2] in loop.blocks:
+            return
+        left, right = test.operands
+        predicate = test.predicate
+        if left is iv.phi.result:
+            limit = right
+        else:
+            limit = left
+            predicate = {ICmpPredicate.SLT: ICmpPredicate.SGT, ICmpPredicate.SLE: ICmpPredicate.SGE,
+                         ICmpPredicate.SGT: ICmpPredicate.SLT, ICmpPredicate.SGE: ICmpPredicate.SLE}.get(predicate)
+        if not isinstance(limit, Constant) or not isinstance(limit.value, int):
+            return
+        if not (predicate in ASCENDING and step > 0 or predicate in DESCENDING and step < 0):
+            return
+        type = iv.phi.result.type
+        bits = INTEGER_BITS[type.kind]
+        low = min(init.value, limit.value) - abs(step)
+        high = max(init.value, limit.value) + abs(step)
+        bound = 1 << (bits - 1)
+        if not all(-bound <= value * factor.value < bound for value in (low, high)):
+            return
+        scaled = Constant(type, limit.value * factor.value)
+        test.operands = [variable.phi.result, scaled] if left is iv.phi.result else [scaled, variable.phi.result]
+        self.replaced_tests += 1
+
+        # A variável original ficou só com o ciclo phi <-> incremento
+        header.instructions.remove(iv.phi)
+        iv.block.instructions.remove(iv.increment)
+        self.removed += 1
+
+    def collect_uses(self) -> Dict[Value, List[Tuple[Instruction, BasicBlock]]]:
+        uses: Dict[Value, List[Tuple[Instruction, BasicBlock]]] = {}
+        for block in self.function.blocks:
+            for inst in block.instructions:
+                for op in inst.operands:
+                    if isinstance(op, Value) and not isinstance(op, Constant):
+                        uses.setdefault(op, []).append((inst, block))
+        return uses
+
+
+def simplify_induction_variables(func: Function, forest: Optional[LoopForest] = None) -> Tuple[int, int, int, int]:
+    """Redução de força e LFTR em func; devolve (pré-cabeçalhos criados,
+    multiplicações reduzidas, testes substituídos, variáveis eliminadas)"""
+    if func.is_external or not func.blocks:
+        return 0, 0, 0, 0
+    if forest is None:
+        forest = LoopForest(func)
+    if not forest.roots:
+        return 0, 0, 0, 0
+    created = forest.insert_preheaders()
+    reduced, replaced, removed = InductionSimplifier(func, forest).run()
+    return created, reduced, replaced, removed
+
+
+def indvars(module: Module) -> Tuple[int, int, int, int]:
+    """simplify_induction_variables em todas as funções; devolve os totais"""
+    totals = (0, 0, 0, 0)
+    for func in module.functions:
+        totals = tuple(a + b for a, b in zip(totals, simplify_induction_variables(func)))
+    return totals
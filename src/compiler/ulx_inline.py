@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+ULX Inline - Expansão de chamadas
+Percorre o grafo de chamadas de baixo para cima (quem é chamado antes de
+quem chama) e copia o corpo de funções pequenas no lugar das chamadas,
+trocando parâmetros por argumentos; funções que perderam todas as
+chamadas são removidas do módulo
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from ulx_ir import Module, Function, BasicBlock, Instruction, Value, Constant, Opcode, TypeKind, TYPES
+from ulx_analysis import TERMINATORS
+
+
+INLINE_THRESHOLD = 40       # Instruções de uma função que vale a pena copiar
+MAX_CALLER_SIZE = 2000      # Uma função não cresce além disso por expansões
+
+
+class CallGraph:
+    """Quem chama quem, e quantas chamadas cada função recebe"""
+
+    def __init__(self, module: Module):
+        self.functions = list(module.functions)
+        self.callees: Dict[Function, List[Function]] = {}
+        self.sites: Dict[Function, int] = {func: 0 for func in self.functions}
+        for func in self.functions:
+            callees: Dict[Function, None] = {}
+            for block in func.blocks:
+                for inst in block.instructions:
+                    if inst.opcode is Opcode.CALL:
+                        callee = inst.operands[0]
+                        callees[callee] = None
+                        self.sites[callee] = self.sites.get(callee, 0) + 1
+            self.callees[func] = list(callees)
+
+    def components(self) -> List[List[Function]]:
+        """Componentes fortemente conexos (Tarjan, iterativo) de baixo para
+        cima: um componente só aparece depois dos que ele chama"""
+        index: Dict[Function, int] = {}
+        low: Dict[Function, int] = {}
+        stack: List[Function] = []
+        on_stack: Set[Function] = set()
+        result: List[List[Function]] = []
+        for root in self.functions:
+            if root in index:
+                continue
+            work = [(root, 0)]
+            while work:
+                func, position = work.pop()
+                if position == 0:
+                    index[func] = low[func] = len(index)
+                    stack.append(func)
+                    on_stack.add(func)
+                callees = self.callees.get(func, [])
+                if position < len(callees):
+                    work.append((func, position + 1))
+                    callee = callees[position]
+                    if callee not in index:
+                        work.append((callee, 0))
+                    elif callee in on_stack:
+                        low[func] = min(low[func], index[callee])
+                    continue
+                if low[func] == index[func]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member is func:
+                            break
+                    result.append(component)
+                if work:
+                    caller = work[-1][0]
+                    low[caller] = min(low[caller], low[func])
+        return result
+
+
+class InlinedCall:
+    """Uma chamada expandida, para relatórios"""
+
+    __slots__ = ('caller', 'callee', 'size')
+
+    def __init__(self, caller: str, callee: str, size: int):
+        self.caller = caller
+        self.callee = callee
+        self.size = size
+
+    def __str__(self):
+        return f"{self.caller}: inlined {self.callee} ({self.size} instructions)"
+
+
+def function_size(func: Function) -> int:
+    return sum(len(block.instructions) for block in func.blocks)
+
+
+class Inliner:
+    """Expande chamadas num módulo, de baixo para cima no grafo"""
+
+    def __init__(self, module: Module, threshold: int = INLINE_THRESHOLD):
+        self.module = module
+        self.threshold = threshold
+        self.graph = CallGraph(module)
+        self.sizes: Dict[Function, int] = {func: function_size(func) for func in module.functions}
+        self.slot_params: Dict[Function, Optional[Set[Value]]] = {}
+        self.inlined: List[InlinedCall] = []
+        self.removed: List[str] = []
+
+    def run(self) -> List[InlinedCall]:
+        for component in self.graph.components():
+            members = set(component)
+            for caller in component:
+                if caller.is_external or not caller.blocks:
+                    continue
+                calls = [(block, inst) for block in caller.blocks for inst in block.instructions
+                         if inst.opcode is Opcode.CALL]
+                # Chamadas vindas das cópias já foram recusadas na própria função copiada
+                for block, inst in calls:
+                    callee = inst.operands[0]
+                    if callee not in members and self.should_inline(caller, callee, inst):
+                        self.inline_call(caller, self.block_of(caller, inst, block), inst)
+        self.remove_dead_functions()
+        return self.inlined
+
+    def block_of(self, caller: Function, inst: Instruction, block: BasicBlock) -> BasicBlock:
+        """Bloco atual de inst: expansões anteriores podem tê-la movido para
+        o bloco de continuação"""
+        if inst in block.instructions:
+            return block
+        return next(other for other in caller.blocks if inst in other.instructions)
+
+    def should_inline(self, caller: Function, callee: Function, call: Instruction) -> bool:
+        if callee.is_external or not callee.blocks or callee.name == 'main':
+            return False
+        if len(call.operands) - 1 != len(callee.params) or self.parameter_slots(callee) is None:
+            return False
+        size = self.sizes[callee]
+        if self.sizes[caller] + size > MAX_CALLER_SIZE:
+            return False
+        # Com uma chamada só, a função some depois: o código não cresce
+        return size <= self.threshold or self.graph.sites.get(callee, 0) == 1
+
+    def parameter_slots(self, callee: Function) -> Optional[Set[Value]]:
+        """Parâmetros usados como endereço de load/store (antes do mem2reg
+        o lowering os trata como variáveis), ou None se a função não puder
+        ser copiada: entrada com predecessores, bloco sem terminador, array
+        na pilha ou parâmetro usado das duas formas"""
+        if callee in self.slot_params:
+            return self.slot_params[callee]
+        slots: Optional[Set[Value]] = set()
+        values: Set[Value] = set()
+        params = set(callee.params)
+        if callee.blocks[0].predecessors:
+            slots = None
+        for block in callee.blocks:
+            if slots is None:
+                break
+            if not block.instructions or block.instructions[-1].opcode not in TERMINATORS:
+                slots = None
+                break
+            for inst in block.instructions:
+                if inst.opcode is Opcode.ALLOCA and inst.operands[0].kind == TypeKind.ARRAY:
+                    slots = None
+                    break
+                for position, op in enumerate(inst.operands):
+                    if op not in params:
+                        continue
+                    is_address = inst.opcode is Opcode.LOAD or inst.opcode is Opcode.STORE and position == 1
+                    (slots if is_address else values).add(op)
+        if slots is not None and slots & values:
+            slots = None
+        self.slot_params[callee] = slots
+        return slots
+
+    # --- Cópia ---
+
+    def inline_call(self, caller: Function, block: BasicBlock, call: Instruction):
+        callee = call.operands[0]
+        args = call.operands[1:]
+        names = {param.name for param in caller.params}
+        names.update(inst.result.name for other in caller.blocks for inst in other.instructions
+                     if inst.result is not None)
+        block_names = {other.name for other in caller.blocks}
+
+        def new_name(base: str, used: Set[str]) -> str:
+            name, suffix = f"{base}.i", 1
+            while name in used:
+                name = f"{base}.i{suffix}"
+                suffix += 1
+            used.add(name)
+            return name
+
+        # Valores e blocos da cópia; allocas vão para a entrada do chamador
+        values: Dict[Value, Value] = {}
+        blocks = {old: BasicBlock(new_name(old.name, block_names)) for old in callee.blocks}
+        allocas: List[Instruction] = []
+        setup: List[Instruction] = []
+        slots = self.parameter_slots(callee)
+        for param, arg in zip(callee.params, args):
+            if param in slots:
+                slot = Value(new_name(param.name, names), TYPES.pointer(param.type))
+                allocas.append(Instruction(Opcode.ALLOCA, slot, [param.type]))
+                setup.append(Instruction(Opcode.STORE, None, [arg, slot]))
+                values[param] = slot
+            else:
+                values[param] = arg
+        for old in callee.blocks:
+            for inst in old.instructions:
+                if inst.result is not None:
+                    values[inst.result] = Value(new_name(inst.result.name, names), inst.result.type)
+
+        continuation = BasicBlock(new_name(f"{block.name}.split", block_names))
+        returns: List[Tuple[Value, BasicBlock]] = []
+        for old in callee.blocks:
+            new = blocks[old]
+            for inst in old.instructions:
+                operands = [blocks.get(op, op) if isinstance(op, BasicBlock) else values.get(op, op)
+                            if isinstance(op, Value) else op for op in inst.operands]
+                result = values.get(inst.result) if inst.result is not None else None
+                if inst.opcode is Opcode.ALLOCA:
+                    allocas.append(Instruction(Opcode.ALLOCA, result, operands))
+                    # O quadro do chamado começa zerado a cada chamada
+                    setup.append(Instruction(Opcode.STORE, None, [Constant(inst.operands[0], 0), result]))
+                elif inst.opcode is Opcode.RET:
+                    value = operands[0] if operands else Constant(callee.return_type, 0)
+                    returns.append((value, new))
+                    new.instructions.append(Instruction(Opcode.BR, None, [continuation]))
+                    break
+                else:
+                    new.instructions.append(Instruction(inst.opcode, result, operands, inst.predicate))
+                    if inst.opcode is Opcode.CALL:
+                        target = inst.operands[0]
+                        self.graph.sites[target] = self.graph.sites.get(target, 0) + 1
+                    if inst.opcode in TERMINATORS:
+                        break
+            new.successors = [op for op in new.instructions[-1].operands if isinstance(op, BasicBlock)] \
+                if new.instructions else []
+        # Arestas a partir dos terminadores copiados: um desvio morto depois
+        # de um ret (antes do simplifycfg) não foi copiado e não conta
+        for new in blocks.values():
+            for succ in new.successors:
+                if succ is not continuation:
+                    succ.predecessors.append(new)
+        for new in blocks.values():
+            for inst in new.instructions:
+                if inst.opcode is not Opcode.PHI:
+                    break
+                pairs = zip(inst.operands[0::2], inst.operands[1::2])
+                inst.operands = [op for value, pred in pairs if pred in new.predecessors for op in (value, pred)]
+        entry = blocks[callee.blocks[0]]
+
+        # Divide o bloco da chamada: o que vem depois dela continua após a cópia
+        position = block.instructions.index(call)
+        continuation.instructions = block.instructions[position + 1:]
+        continuation.successors = block.successors
+        for succ in continuation.successors:
+            succ.predecessors = [continuation if pred is block else pred for pred in succ.predecessors]
+            for inst in succ.instructions:
+                if inst.opcode is not Opcode.PHI:
+                    break
+                inst.operands = [continuation if op is block else op for op in inst.operands]
+        block.instructions = block.instructions[:position] + setup + [Instruction(Opcode.BR, None, [entry])]
+        block.successors = [entry]
+        entry.predecessors = [block]
+        continuation.predecessors = [ret_block for _, ret_block in returns]
+
+        if call.result is not None:
+            if len(returns) == 1:
+                result = returns[0][0]
+            elif returns:
+                result = Value(new_name(call.result.name, names), call.result.type)
+                operands = []
+                for value, ret_block in returns:
+                    operands.extend((value, ret_block))
+                continuation.instructions.insert(0, Instruction(Opcode.PHI, result, operands))
+            else:
+                result = Constant(call.result.type, 0)     # O chamado nunca retorna
+            for other in caller.blocks + [continuation]:
+                for inst in other.instructions:
+                    inst.operands = [result if op is call.result else op for op in inst.operands]
+
+        position = caller.blocks.index(block) + 1
+        caller.blocks[position:position] = [blocks[old] for old in callee.blocks] + [continuation]
+        caller_entry = caller.blocks[0].instructions
+        start = 0
+        while start < len(caller_entry) and caller_entry[start].opcode is Opcode.ALLOCA:
+            start += 1
+        caller_entry[start:start] = allocas
+        for inst in allocas:
+            caller.frame[inst.result.name] = caller.frame_size
+            caller.frame_size += 1
+
+        size = self.sizes[callee]
+        self.sizes[caller] = function_size(caller)
+        self.graph.sites[callee] -= 1
+        self.inlined.append(InlinedCall(caller.name, callee.name, size))
+
+    def remove_dead_functions(self):
+        """Remove funções cujas chamadas foram todas expandidas"""
+        expanded = {call.callee for call in self.inlined}
+        dead = [func for func in self.module.functions
+                if func.name in expanded and not self.graph.sites.get(func) and func.name != 'main']
+        if not dead:
+            return
+        self.removed = [func.name for func in dead]
+        self.module.functions = [func for func in self.module.functions if func not in dead]
+
+
+def inline_calls(module: Module, threshold: int = INLINE_THRESHOLD) -> Inliner:
+    """Expande as chamadas de module; o resultado traz as chamadas
+    expandidas (inlined) e as funções removidas (removed)"""
+    inliner = Inliner(module, threshold)
+    inliner.run()
+    return inliner
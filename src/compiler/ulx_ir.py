@@ -6,7 +6,7 @@ Baseado em LLVM IR mas simplificado para o ecossistema ULX
 
 from enum import Enum, auto
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Union, Any
+from typing import List, Dict, Optional, Tuple, Union, Any
 from abc import ABC, abstractmethod
 
 
@@ -25,13 +25,17 @@ class TypeKind(Enum):
     STRUCT = auto()
 
 
-@dataclass
+@dataclass(frozen=True, eq=False)
 class Type:
-    """Representa um tipo na ULX-IR"""
+    """Representa um tipo na ULX-IR
+    
+    Instâncias são canônicas (criadas pelo TypeContext): tipos estruturalmente
+    iguais são o mesmo objeto, então igualdade e hash são por identidade.
+    """
     kind: TypeKind
     element_type: Optional['Type'] = None  # Para arrays e pointers
     size: int = 0  # Para arrays
-    params: List['Type'] = field(default_factory=list)  # Para funções
+    params: Tuple['Type', ...] = ()  # Para funções
     ret_type: Optional['Type'] = None  # Para funções
     
     def __str__(self):
@@ -43,34 +47,76 @@ class Type:
             params = ", ".join(str(p) for p in self.params)
             return f"{self.ret_type} ({params})"
         return self.kind.name.lower()
+
+
+class TypeContext:
+    """Tabela de tipos canônicos (hash-consing)
+    
+    get devolve sempre o mesmo objeto para a mesma estrutura; como os
+    componentes também são canônicos, a chave usa a identidade deles e a
+    busca é O(1). Nomes de tipo são resolvidos por um dicionário fixo.
+    """
+    
+    def __init__(self):
+        self.types: Dict[tuple, Type] = {}
+        self.names: Dict[str, Type] = {}
+    
+    def get(self, kind: TypeKind, element_type: Optional[Type] = None, size: int = 0,
+            params: Tuple[Type, ...] = (), ret_type: Optional[Type] = None) -> Type:
+        key = (kind, element_type, size, params, ret_type)
+        type = self.types.get(key)
+        if type is None:
+            type = self.types[key] = Type(kind, element_type, size, params, ret_type)
+        return type
+    
+    def array(self, element_type: Type, size: int) -> Type:
+        return self.get(TypeKind.ARRAY, element_type=element_type, size=size)
+    
+    def function(self, ret_type: Type, params: List[Type]) -> Type:
+        return self.get(TypeKind.FUNCTION, params=tuple(params), ret_type=ret_type)
+    
+    def pointer(self, element_type: Type) -> Type:
+        """Ponteiro para element_type (impresso como 'ptr', como TypePtr)"""
+        return self.get(TypeKind.PTR, element_type=element_type)
+    
+    def define(self, name: str, type: Type):
+        """Associa um nome de tipo (ex.: 'inteiro') a um tipo canônico"""
+        self.names[name] = type
+    
+    def resolve(self, name: str, default: Optional[Type] = None) -> Optional[Type]:
+        """Tipo de nome, ou default se o nome não for conhecido"""
+        return self.names.get(name, default)
     
-    def __eq__(self, other):
-        if not isinstance(other, Type):
-            return False
-        return (self.kind == other.kind and 
-                self.element_type == other.element_type and
-                self.size == other.size)
+    def __len__(self):
+        return len(self.types)
 
 
+# Contexto global: todos os tipos do compilador saem daqui
+TYPES = TypeContext()
+
 # Tipos pré-definidos
-TypeVoid = Type(TypeKind.VOID)
-TypeI8 = Type(TypeKind.I8)
-TypeI16 = Type(TypeKind.I16)
-TypeI32 = Type(TypeKind.I32)
-TypeI64 = Type(TypeKind.I64)
-TypeF32 = Type(TypeKind.F32)
-TypeF64 = Type(TypeKind.F64)
-TypePtr = Type(TypeKind.PTR)
+TypeVoid = TYPES.get(TypeKind.VOID)
+TypeI8 = TYPES.get(TypeKind.I8)
+TypeI16 = TYPES.get(TypeKind.I16)
+TypeI32 = TYPES.get(TypeKind.I32)
+TypeI64 = TYPES.get(TypeKind.I64)
+TypeF32 = TYPES.get(TypeKind.F32)
+TypeF64 = TYPES.get(TypeKind.F64)
+TypePtr = TYPES.get(TypeKind.PTR)
+
+for _type in (TypeVoid, TypeI8, TypeI16, TypeI32, TypeI64, TypeF32, TypeF64, TypePtr):
+    TYPES.define(str(_type), _type)
+del _type
 
 
 def ArrayType(element_type: Type, size: int) -> Type:
-    """Cria um tipo array"""
-    return Type(TypeKind.ARRAY, element_type=element_type, size=size)
+    """Tipo array (canônico)"""
+    return TYPES.array(element_type, size)
 
 
 def FunctionType(ret_type: Type, params: List[Type]) -> Type:
-    """Cria um tipo função"""
-    return Type(TypeKind.FUNCTION, ret_type=ret_type, params=params)
+    """Tipo função (canônico)"""
+    return TYPES.function(ret_type, params)
 
 
 class Opcode(Enum):
@@ -130,7 +176,9 @@ class Opcode(Enum):
     BITCAST = "bitcast"
 
     # --- ULX Interceptor & Hardware Acceleration ---
-    # AVX Vector Instructions
+    # AVX Vector Instructions (8 x f32). Operandos na ordem de LOAD/STORE:
+    # VLOAD [ptr]; VSTORE [valor, ptr], valor vetorial ou f32 (replicado);
+    # V*PS [lhs, rhs], cada um vetorial ou f32 (replicado)
     VADDPS = "vaddps"  # AVX Vector Add Packed Single-Precision
     VSUBPS = "vsubps"  # AVX Vector Sub Packed Single-Precision
     VMULPS = "vmulps"  # AVX Vector Mul Packed Single-Precision
@@ -142,7 +190,6 @@ class Opcode(Enum):
     GPU_SUBMIT = "gpu_submit"  # Submit Command Buffer to GPU
     GPU_MALLOC = "gpu_malloc"  # Allocate Unified Memory (CPU/GPU)
     GPU_FREE = "gpu_free"      # Free Unified Memory
-}
 
 class ICmpPredicate(Enum):
     """Predicados de comparação inteira"""
@@ -178,7 +225,9 @@ class FCmpPredicate(Enum):
     TRUE = "true"
 
 
-@dataclass
+# Valores, instruções, blocos e funções são comparados por identidade (eq=False)
+# e podem ser chaves de dicionário nos passes de otimização
+@dataclass(eq=False)
 class Value:
     """Valor em SSA form"""
     name: str
@@ -188,7 +237,7 @@ class Value:
         return f"{self.type} {self.name}"
 
 
-@dataclass
+@dataclass(eq=False)
 class Constant(Value):
     """Constante"""
     value: Union[int, float, str, None]
@@ -205,7 +254,16 @@ class Constant(Value):
         return str(self.value)
 
 
-@dataclass
+def operand_str(operand: Any) -> str:
+    """Operando como aparece numa instrução (blocos e funções só pelo nome)"""
+    if isinstance(operand, BasicBlock):
+        return f"label %{operand.name}"
+    if isinstance(operand, Function):
+        return f"@{operand.name}"
+    return str(operand)
+
+
+@dataclass(eq=False)
 class Instruction:
     """Instrução ULX-IR"""
     opcode: Opcode
@@ -219,14 +277,14 @@ class Instruction:
         else:
             result_str = ""
         
-        ops = ", ".join(str(op) for op in self.operands)
+        ops = ", ".join(operand_str(op) for op in self.operands)
         
         if self.predicate:
             return f"  {result_str}{self.opcode.value} {self.predicate.value} {ops}"
         return f"  {result_str}{self.opcode.value} {ops}"
 
 
-@dataclass
+@dataclass(eq=False)
 class BasicBlock:
     """Bloco básico - sequência de instruções"""
     name: str
@@ -244,7 +302,7 @@ class BasicBlock:
         return "\n".join(lines)
 
 
-@dataclass
+@dataclass(eq=False)
 class Function:
     """Função ULX-IR"""
     name: str
@@ -252,6 +310,10 @@ class Function:
     params: List[Value]
     blocks: List[BasicBlock] = field(default_factory=list)
     is_external: bool = False
+    # Quadro da pilha: nome do parâmetro/alloca -> slot (8 bytes cada);
+    # slots de escopos disjuntos são compartilhados
+    frame: Dict[str, int] = field(default_factory=dict)
+    frame_size: int = 0
     
     def __post_init__(self):
         if not self.blocks and not self.is_external:
@@ -330,6 +392,10 @@ class Module:
         return "\n".join(lines)
 
 
+# Nomes '%0', '%1', ... já criados (cada IRBuilder reinicia a contagem)
+TEMP_NAMES: List[str] = []
+
+
 class IRBuilder:
     """Builder para criar IR de forma conveniente"""
     
@@ -339,35 +405,62 @@ class IRBuilder:
         self.current_block: Optional[BasicBlock] = None
         self.temp_counter = 0
         self.block_counter = 0
+        self.entry_allocas = 0  # allocas já no início do bloco de entrada
+        self.block_names: Dict[str, int] = {}  # Nome base -> próximo sufixo
     
     def set_function(self, func: Function):
         self.current_function = func
         self.current_block = func.entry_block()
+        self.entry_allocas = 0
+        self.block_names = {block.name: 1 for block in func.blocks}
     
     def create_block(self, name: str = None) -> BasicBlock:
         if name is None:
             name = f"bb{self.block_counter}"
             self.block_counter += 1
+        # Rótulos únicos na função: if.then, if.then1, if.then2...
+        if name in self.block_names:
+            base = name
+            while name in self.block_names:
+                name = f"{base}{self.block_names[base]}"
+                self.block_names[base] += 1
+        self.block_names[name] = 1
         return self.current_function.add_block(name)
     
     def set_block(self, block: BasicBlock):
         self.current_block = block
     
-    def _new_temp(self, type: Type) -> Value:
-        name = f"%{self.temp_counter}"
+    def _temp_name(self) -> str:
+        """Próximo nome temporário; os nomes '%N' são compartilhados entre funções"""
+        index = self.temp_counter
         self.temp_counter += 1
-        return Value(name, type)
+        while index >= len(TEMP_NAMES):
+            TEMP_NAMES.append(f"%{len(TEMP_NAMES)}")
+        return TEMP_NAMES[index]
+    
+    def _new_temp(self, type: Type) -> Value:
+        return Value(self._temp_name(), type)
     
     def alloca(self, type: Type, name: str = None) -> Value:
         """Cria uma alocação na stack"""
-        result = Value(name or self._new_temp(TypePtr).name, TypePtr)
+        result = Value(name or self._temp_name(), TYPES.pointer(type))
         inst = Instruction(Opcode.ALLOCA, result, [type])
         self.current_block.add_instruction(inst)
         return result
     
+    def entry_alloca(self, type: Type, name: str = None) -> Value:
+        """Alocação no início do bloco de entrada, visível em toda a função"""
+        result = Value(name or self._temp_name(), TYPES.pointer(type))
+        inst = Instruction(Opcode.ALLOCA, result, [type])
+        self.current_function.entry_block().instructions.insert(self.entry_allocas, inst)
+        self.entry_allocas += 1
+        return result
+    
     def load(self, ptr: Value, name: str = None) -> Value:
         """Carrega valor de um ponteiro"""
-        result = Value(name or self._new_temp(ptr.type).name, ptr.type)
+        # Ponteiros de alloca sabem o tipo apontado; os demais (parâmetros,
+        # 'ptr' opaco) carregam o próprio tipo
+        result = Value(name or self._temp_name(), ptr.type.element_type or ptr.type)
         inst = Instruction(Opcode.LOAD, result, [ptr])
         self.current_block.add_instruction(inst)
         return result
@@ -379,35 +472,81 @@ class IRBuilder:
     
     def add(self, lhs: Value, rhs: Value, name: str = None) -> Value:
         """Adição inteira"""
-        result = Value(name or self._new_temp(lhs.type).name, lhs.type)
+        result = Value(name or self._temp_name(), lhs.type)
         inst = Instruction(Opcode.ADD, result, [lhs, rhs])
         self.current_block.add_instruction(inst)
         return result
     
     def sub(self, lhs: Value, rhs: Value, name: str = None) -> Value:
         """Subtração inteira"""
-        result = Value(name or self._new_temp(lhs.type).name, lhs.type)
+        result = Value(name or self._temp_name(), lhs.type)
         inst = Instruction(Opcode.SUB, result, [lhs, rhs])
         self.current_block.add_instruction(inst)
         return result
     
     def mul(self, lhs: Value, rhs: Value, name: str = None) -> Value:
         """Multiplicação inteira"""
-        result = Value(name or self._new_temp(lhs.type).name, lhs.type)
+        result = Value(name or self._temp_name(), lhs.type)
         inst = Instruction(Opcode.MUL, result, [lhs, rhs])
         self.current_block.add_instruction(inst)
         return result
     
     def sdiv(self, lhs: Value, rhs: Value, name: str = None) -> Value:
         """Divisão inteira com sinal"""
-        result = Value(name or self._new_temp(lhs.type).name, lhs.type)
+        result = Value(name or self._temp_name(), lhs.type)
         inst = Instruction(Opcode.SDIV, result, [lhs, rhs])
         self.current_block.add_instruction(inst)
         return result
     
+    def fadd(self, lhs: Value, rhs: Value, name: str = None) -> Value:
+        """Adição de ponto flutuante"""
+        result = Value(name or self._temp_name(), lhs.type)
+        inst = Instruction(Opcode.FADD, result, [lhs, rhs])
+        self.current_block.add_instruction(inst)
+        return result
+    
+    def fsub(self, lhs: Value, rhs: Value, name: str = None) -> Value:
+        """Subtração de ponto flutuante"""
+        result = Value(name or self._temp_name(), lhs.type)
+        inst = Instruction(Opcode.FSUB, result, [lhs, rhs])
+        self.current_block.add_instruction(inst)
+        return result
+    
+    def fmul(self, lhs: Value, rhs: Value, name: str = None) -> Value:
+        """Multiplicação de ponto flutuante"""
+        result = Value(name or self._temp_name(), lhs.type)
+        inst = Instruction(Opcode.FMUL, result, [lhs, rhs])
+        self.current_block.add_instruction(inst)
+        return result
+    
+    def fdiv(self, lhs: Value, rhs: Value, name: str = None) -> Value:
+        """Divisão de ponto flutuante"""
+        result = Value(name or self._temp_name(), lhs.type)
+        inst = Instruction(Opcode.FDIV, result, [lhs, rhs])
+        self.current_block.add_instruction(inst)
+        return result
+    
+    def gep(self, ptr: Value, index: Value, name: str = None) -> Value:
+        """Endereço do elemento index de um array (ptr aponta para o array
+        ou para o primeiro elemento)"""
+        element_type = ptr.type.element_type
+        if element_type is not None and element_type.kind == TypeKind.ARRAY:
+            element_type = element_type.element_type
+        result = Value(name or self._temp_name(), TYPES.pointer(element_type) if element_type else TypePtr)
+        inst = Instruction(Opcode.GEP, result, [ptr, index])
+        self.current_block.add_instruction(inst)
+        return result
+    
+    def cast(self, opcode: Opcode, value: Value, type: Type, name: str = None) -> Value:
+        """Conversão (sitofp, fptosi, ptrtoint...)"""
+        result = Value(name or self._temp_name(), type)
+        inst = Instruction(opcode, result, [value])
+        self.current_block.add_instruction(inst)
+        return result
+    
     def icmp(self, pred: ICmpPredicate, lhs: Value, rhs: Value, name: str = None) -> Value:
         """Comparação inteira"""
-        result = Value(name or self._new_temp(TypeI1).name, TypeI1)
+        result = Value(name or self._temp_name(), TypeI1)
         inst = Instruction(Opcode.ICMP, result, [lhs, rhs], predicate=pred)
         self.current_block.add_instruction(inst)
         return result
@@ -430,8 +569,8 @@ class IRBuilder:
     def call(self, func: Function, args: List[Value], name: str = None) -> Optional[Value]:
         """Chamada de função"""
         result = None
-        if func.return_type != TypeVoid:
-            result = Value(name or self._new_temp(func.return_type).name, func.return_type)
+        if func.return_type is not TypeVoid:
+            result = Value(name or self._temp_name(), func.return_type)
         inst = Instruction(Opcode.CALL, result, [func] + args)
         self.current_block.add_instruction(inst)
         return result
@@ -446,7 +585,7 @@ class IRBuilder:
     
     def phi(self, type: Type, incoming: List[tuple], name: str = None) -> Value:
         """Nó phi para SSA"""
-        result = Value(name or self._new_temp(type).name, type)
+        result = Value(name or self._temp_name(), type)
         operands = []
         for val, block in incoming:
             operands.extend([val, block])
@@ -456,7 +595,7 @@ class IRBuilder:
 
 
 # Tipo i1 para comparações
-TypeI1 = Type(TypeKind.I8)  # Usamos i8 para booleanos
+TypeI1 = TypeI8  # Usamos i8 para booleanos
 
 
 if __name__ == "__main__":
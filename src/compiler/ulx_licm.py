@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+ULX LICM - Movimentação de código invariante de laços
+Sobe instruções sem efeitos cujos operandos não mudam no laço para o
+pré-cabeçalho e afunda para as saídas stores que só a última iteração vê
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from ulx_ir import Module, Function, BasicBlock, Instruction, Value, Constant, Opcode
+from ulx_analysis import LoopForest, Loop, live_instructions, reverse_postorder, TERMINATORS
+from ulx_gvn import PURE
+from ulx_mem2reg import find_variables
+
+
+DIVISIONS = frozenset([Opcode.SDIV, Opcode.UDIV, Opcode.SREM, Opcode.UREM])
+
+
+def speculatable(inst: Instruction) -> bool:
+    """Pode executar no pré-cabeçalho mesmo que o laço não a executasse
+
+    Divisões só com divisor constante que não trapa (nem zero, nem -1,
+    que estoura com o menor inteiro).
+    """
+    if inst.opcode in DIVISIONS:
+        divisor = inst.operands[1]
+        return isinstance(divisor, Constant) and isinstance(divisor.value, int) \
+            and divisor.value not in (0, -1)
+    return inst.opcode in PURE
+
+
+class LoopInvariantMotion:
+    """LICM de uma função, dos laços internos para os externos
+
+    O que sobe para o pré-cabeçalho de um laço interno fica dentro do laço
+    externo e pode subir de novo. Loads sobem só de variáveis que não
+    escapam (endereço usado apenas por load/store) e que o laço não escreve.
+    """
+
+    def __init__(self, func: Function, forest: LoopForest):
+        self.function = func
+        self.forest = forest
+        self.variables = find_variables(func)
+        self.definitions: Dict[Value, BasicBlock] = {}
+        self.hoisted = 0
+        self.sunk = 0
+
+    def run(self) -> Tuple[int, int]:
+        forest = self.forest
+        order = {block: index for index, block in enumerate(reverse_postorder(self.function))}
+        for block in order:
+            for inst in block.instructions:
+                if inst.result is not None:
+                    self.definitions[inst.result] = block
+        for loop in reversed(forest.loops()):
+            if loop.preheader is None:
+                continue
+            blocks = sorted(loop.blocks, key=lambda block: order.get(block, len(order)))
+            self.hoist(loop, blocks)
+            self.sink_stores(loop, blocks)
+        return self.hoisted, self.sunk
+
+    def memory_accesses(self, blocks: List[BasicBlock]) -> Tuple[Dict[Value, List[tuple]], Set[Value]]:
+        """(stores por ponteiro, ponteiros lidos) nos blocos do laço"""
+        stores: Dict[Value, List[Tuple[Instruction, BasicBlock]]] = {}
+        loaded: Set[Value] = set()
+        for block in blocks:
+            for inst in live_instructions(block):
+                if inst.opcode is Opcode.STORE:
+                    stores.setdefault(inst.operands[1], []).append((inst, block))
+                elif inst.opcode is Opcode.LOAD:
+                    loaded.add(inst.operands[0])
+        return stores, loaded
+
+    def hoist(self, loop: Loop, blocks: List[BasicBlock]):
+        stores, _ = self.memory_accesses(blocks)
+        definitions = self.definitions
+        invariant: Set[Value] = set()
+        hoisted: List[Instruction] = []
+        for block in blocks:
+            moved = set()
+            for inst in live_instructions(block):
+                if inst.result is not None and self.is_invariant(inst, loop, invariant, stores):
+                    invariant.add(inst.result)
+                    moved.add(inst)
+                    hoisted.append(inst)
+            if moved:
+                block.instructions = [inst for inst in block.instructions if inst not in moved]
+        if not hoisted:
+            return
+        preheader = loop.preheader
+        position = len(preheader.instructions) - 1
+        while preheader.instructions[position].opcode not in TERMINATORS:
+            position -= 1
+        preheader.instructions[position:position] = hoisted
+        for inst in hoisted:
+            definitions[inst.result] = preheader
+        self.hoisted += len(hoisted)
+
+    def is_invariant(self, inst: Instruction, loop: Loop, invariant: Set[Value],
+                     stores: Dict[Value, list]) -> bool:
+        if inst.opcode is Opcode.LOAD:
+            pointer = inst.operands[0]
+            if pointer not in self.variables or pointer in stores:
+                return False
+        elif not speculatable(inst):
+            return False
+        for op in inst.operands:
+            if isinstance(op, Value) and op in self.definitions and op not in invariant \
+                    and self.definitions[op] in loop.blocks:
+                return False
+        return True
+
+    def sink_stores(self, loop: Loop, blocks: List[BasicBlock]):
+        """Afunda o único store de uma variável que o laço não lê
+
+        O store precisa estar no próprio laço (não num interno) e executar
+        em toda iteração que sai: seu bloco domina todo bloco com aresta de
+        saída. As saídas só podem ter predecessores no laço; cada uma recebe
+        uma cópia do store, que guarda o valor da última iteração.
+        """
+        exits = loop.exit_blocks()
+        if not exits or any(p not in loop.blocks for block in exits for p in block.predecessors):
+            return
+        exiting = [block for block in blocks if any(succ not in loop.blocks for succ in block.successors)]
+        domtree = self.forest.domtree
+        stores, loaded = self.memory_accesses(blocks)
+        for pointer, accesses in stores.items():
+            if len(accesses) != 1 or pointer in loaded or pointer not in self.variables:
+                continue
+            store, block = accesses[0]
+            if self.forest.loop_for(block) is not loop:
+                continue
+            if not all(domtree.dominates(block, other) for other in exiting):
+                continue
+            value = store.operands[0]
+            source = self.definitions.get(value) if isinstance(value, Value) else None
+            if source is not None and source in loop.blocks and self.forest.loop_for(source) is not loop:
+                continue    # Definido num laço interno: pode ter mudado depois do store
+            block.instructions.remove(store)
+            for exit_block in exits:
+                position = 0
+                while exit_block.instructions[position].opcode is Opcode.PHI:
+                    position += 1
+                exit_block.instructions.insert(position, Instruction(Opcode.STORE, None, [value, pointer]))
+            self.sunk += 1
+
+
+def hoist_invariants(func: Function, forest: Optional[LoopForest] = None) -> Tuple[int, int, int]:
+    """LICM em func; devolve (pré-cabeçalhos criados, instruções subidas,
+    stores afundados)"""
+    if func.is_external or not func.blocks:
+        return 0, 0, 0
+    if forest is None:
+        forest = LoopForest(func)
+    if not forest.roots:
+        return 0, 0, 0
+    created = forest.insert_preheaders()
+    hoisted, sunk = LoopInvariantMotion(func, forest).run()
+    return created, hoisted, sunk
+
+
+def licm(module: Module) -> Tuple[int, int, int]:
+    """hoist_invariants em todas as funções; devolve os totais"""
+    totals = (0, 0, 0)
+    for func in module.functions:
+        totals = tuple(a + b for a, b in zip(totals, hoist_invariants(func)))
+    return totals
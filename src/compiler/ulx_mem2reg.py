@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+ULX Mem2Reg - Promoção de variáveis em memória para valores SSA
+PHIs nas fronteiras de dominância iteradas (Cytron et al.) e renomeação
+pela árvore de dominadores
+"""
+
+from typing import Dict, List, Optional, Set
+
+from ulx_ir import Module, Function, BasicBlock, Instruction, Value, Constant, Type, Opcode
+from ulx_analysis import DominatorTree
+
+
+class Variable:
+    """Alloca (ou parâmetro) promovível e sua pilha de definições na renomeação"""
+
+    __slots__ = ('pointer', 'type', 'initial', 'alloca', 'def_blocks', 'stack')
+
+    def __init__(self, pointer: Value, type: Type, initial: Value, alloca: Optional[Instruction]):
+        self.pointer = pointer
+        self.type = type
+        self.initial = initial          # Valor antes de qualquer store
+        self.alloca = alloca            # None para parâmetros
+        self.def_blocks: Dict[BasicBlock, None] = {}
+        self.stack: List[Value] = []
+
+
+def find_variables(func: Function) -> Dict[Value, Variable]:
+    """Allocas e parâmetros usados só como endereço de load/store
+
+    O lowering lê parâmetros com load e os atribui com store, então eles
+    também são promovidos (valor inicial = o próprio parâmetro). Qualquer
+    outro uso do ponteiro (argumento de call, valor de store...) o faz
+    escapar, e ele fica em memória.
+    """
+    candidates: Dict[Value, Variable] = {}
+    for param in func.params:
+        candidates[param] = Variable(param, param.type, param, None)
+    for block in func.blocks:
+        for inst in block.instructions:
+            if inst.opcode is Opcode.ALLOCA:
+                ptr = inst.result
+                # Sem store, a variável vale zero (o C também zera o quadro)
+                candidates[ptr] = Variable(ptr, inst.operands[0], Constant(inst.operands[0], 0), inst)
+
+    accessed: Set[Value] = set()
+    escaped: Set[Value] = set()
+    for block in func.blocks:
+        for inst in block.instructions:
+            opcode = inst.opcode
+            operands = inst.operands
+            if opcode is Opcode.ALLOCA:
+                continue
+            if opcode is Opcode.LOAD and operands[0] in candidates:
+                accessed.add(operands[0])
+                continue
+            if opcode is Opcode.STORE and operands[1] in candidates:
+                accessed.add(operands[1])
+                candidates[operands[1]].def_blocks[block] = None
+                if operands[0] in candidates:
+                    escaped.add(operands[0])
+                continue
+            for operand in operands:
+                if operand in candidates:
+                    escaped.add(operand)
+
+    return {ptr: var for ptr, var in candidates.items()
+            if ptr not in escaped and (var.alloca is not None or ptr in accessed)}
+
+
+def promote_memory(func: Function, domtree: Optional[DominatorTree] = None) -> int:
+    """Promove as variáveis de func para SSA; devolve quantas foram promovidas
+
+    Só instruções mudam: blocos e arestas do CFG ficam como estão (domtree,
+    se dado, continua válida). Blocos inalcançáveis leem o valor inicial
+    das variáveis.
+    """
+    if func.is_external or not func.blocks:
+        return 0
+    variables = find_variables(func)
+    if not variables:
+        return 0
+
+    if domtree is None:
+        domtree = DominatorTree(func)
+    frontiers = domtree.frontiers()
+
+    # Nomes dos PHIs: '%i.0', '%i.1'... sem colidir com nomes existentes
+    used_names = {param.name for param in func.params}
+    for block in func.blocks:
+        for inst in block.instructions:
+            if inst.result is not None:
+                used_names.add(inst.result.name)
+    counters: Dict[str, int] = {}
+
+    def phi_name(base: str) -> str:
+        count = counters.get(base, 0)
+        while f"{base}.{count}" in used_names:
+            count += 1
+        counters[base] = count + 1
+        name = f"{base}.{count}"
+        used_names.add(name)
+        return name
+
+    # 1. PHIs nas fronteiras de dominância iteradas dos blocos com store
+    phis: Dict[BasicBlock, List[tuple]] = {}
+    for var in variables.values():
+        placed: Set[BasicBlock] = set()
+        worklist = [block for block in var.def_blocks if domtree.contains(block)]
+        while worklist:
+            block = worklist.pop()
+            for join in frontiers[block]:
+                if join in placed:
+                    continue
+                placed.add(join)
+                phi = Instruction(Opcode.PHI, Value(phi_name(var.pointer.name), var.type), [])
+                phis.setdefault(join, []).append((phi, var))
+                if join not in var.def_blocks:
+                    worklist.append(join)
+
+    # 2. Renomeação em pré-ordem da árvore de dominadores
+    replace: Dict[Value, Value] = {}               # Resultado de load -> valor
+    incoming: Dict[Instruction, Dict[BasicBlock, Value]] = {}
+    for var in variables.values():
+        var.stack.append(var.initial)
+
+    def rewrite(block: BasicBlock):
+        """Remove loads/stores/allocas promovidos do bloco e troca os usos"""
+        pushed = []
+        kept = []
+        for phi, var in phis.get(block, ()):
+            var.stack.append(phi.result)
+            pushed.append(var)
+            kept.append(phi)
+        for inst in block.instructions:
+            opcode = inst.opcode
+            operands = inst.operands
+            if opcode is Opcode.LOAD and operands[0] in variables:
+                replace[inst.result] = variables[operands[0]].stack[-1]
+                continue
+            if opcode is Opcode.STORE and operands[1] in variables:
+                var = variables[operands[1]]
+                var.stack.append(replace.get(operands[0], operands[0]))
+                pushed.append(var)
+                continue
+            if opcode is Opcode.ALLOCA and inst.result in variables:
+                continue
+            inst.operands = [replace.get(op, op) for op in operands]
+            kept.append(inst)
+        block.instructions = kept
+        for succ in block.successors:
+            for phi, var in phis.get(succ, ()):
+                incoming.setdefault(phi, {})[block] = var.stack[-1]
+        return pushed
+
+    if domtree.order:
+        stack: List[tuple] = [(domtree.order[0], None)]
+        while stack:
+            block, pushed = stack.pop()
+            if pushed is not None:
+                for var in pushed:
+                    var.stack.pop()
+                continue
+            stack.append((block, rewrite(block)))
+            stack.extend((child, None) for child in reversed(domtree.children[block]))
+
+    # Blocos inalcançáveis: só valores iniciais (as pilhas estão na base)
+    for block in func.blocks:
+        if not domtree.contains(block):
+            for var in rewrite(block):
+                var.stack.pop()
+
+    # 3. Operandos dos PHIs na ordem de predecessors
+    all_phis: List[Instruction] = []
+    for block, placed in phis.items():
+        for phi, var in placed:
+            values = incoming.get(phi, {})
+            operands = []
+            for pred in block.predecessors:
+                operands.append(values[pred] if pred in values else var.initial)
+                operands.append(pred)
+            phi.operands = operands
+            all_phis.append(phi)
+
+    simplify_phis(func, all_phis)
+
+    # Allocas promovidas saem do quadro da pilha
+    for var in variables.values():
+        if var.alloca is not None:
+            func.frame.pop(var.pointer.name, None)
+    func.frame_size = max(func.frame.values()) + 1 if func.frame else 0
+    return len(variables)
+
+
+def simplify_phis(func: Function, phis: List[Instruction]):
+    """Remove PHIs triviais (um único valor além de si mesmo) e mortos"""
+    replace: Dict[Value, Value] = {}
+
+    def resolve(value):
+        while value in replace:
+            value = replace[value]
+        return value
+
+    placed = set(phis)
+    live = {phi.result: phi for phi in phis}
+    changed = True
+    while changed:
+        changed = False
+        for result, phi in list(live.items()):
+            values = {resolve(v) for v in phi.operands[0::2]}
+            values.discard(result)
+            if len(values) == 1:
+                replace[result] = values.pop()
+                del live[result]
+                changed = True
+
+    # PHIs vivos: usados fora de PHIs, ou por PHIs vivos
+    used: Set[Value] = set()
+    worklist = []
+    for block in func.blocks:
+        for inst in block.instructions:
+            if replace:
+                inst.operands = [resolve(op) for op in inst.operands]
+            if inst in placed:
+                continue
+            for op in inst.operands:
+                if op in live and op not in used:
+                    used.add(op)
+                    worklist.append(op)
+    while worklist:
+        for op in live[worklist.pop()].operands[0::2]:
+            if op in live and op not in used:
+                used.add(op)
+                worklist.append(op)
+
+    dead = {phi for phi in phis if phi.result not in used}
+    if dead:
+        for block in func.blocks:
+            block.instructions = [inst for inst in block.instructions if inst not in dead]
+
+
+def mem2reg(module: Module) -> int:
+    """Aplica promote_memory a todas as funções; devolve o total promovido"""
+    return sum(promote_memory(func) for func in module.functions)
@@ -4,9 +4,13 @@ Parser ULX - Análise sintática da linguagem ULX
 Usa Recursive Descent + Pratt Parsing para expressões
 """
 
+import re
+import mmap
+import bisect
+from array import array
 from enum import Enum, auto
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Union, Any
+from typing import List, Dict, Optional, Union, Any, Iterator
 from abc import ABC, abstractmethod
 
 
@@ -79,18 +83,200 @@ class TokenType(Enum):
     INVALIDO = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     """Token da linguagem ULX"""
     type: TokenType
     value: str
     line: int
     column: int
+    offset: int = field(default=-1, compare=False)  # Posição no fonte, quando conhecida
     
     def __str__(self):
         return f"Token({self.type}, '{self.value}', line={self.line}, col={self.column})"
 
 
+# Operadores e delimitadores (um e dois caracteres)
+OPERATORS = {
+    '==': TokenType.IGUAL,
+    '!=': TokenType.DIFERENTE,
+    '<=': TokenType.MENOR_IGUAL,
+    '>=': TokenType.MAIOR_IGUAL,
+    '&&': TokenType.E,
+    '||': TokenType.OU,
+    '+': TokenType.MAIS,
+    '-': TokenType.MENOS,
+    '*': TokenType.VEZES,
+    '/': TokenType.DIVIDIDO,
+    '%': TokenType.MODULO,
+    '<': TokenType.MENOR,
+    '>': TokenType.MAIOR,
+    '!': TokenType.NAO,
+    '=': TokenType.ATRIBUICAO,
+    '(': TokenType.PARENTESE_ESQ,
+    ')': TokenType.PARENTESE_DIR,
+    '{': TokenType.CHAVE_ESQ,
+    '}': TokenType.CHAVE_DIR,
+    '[': TokenType.COLCHETE_ESQ,
+    ']': TokenType.COLCHETE_DIR,
+    ';': TokenType.PONTO_VIRGULA,
+    ',': TokenType.VIRGULA,
+    '.': TokenType.PONTO,
+    ':': TokenType.DOIS_PONTOS,
+}
+
+ESCAPES = {'n': '\n', 't': '\t', '\\': '\\', '"': '"'}
+
+# Códigos compactos dos tipos de token (índice em TOKEN_TYPES)
+TOKEN_TYPES = list(TokenType)
+TOKEN_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+
+# Precedência dos operadores binários (maior = liga mais forte), usada pelo
+# parser de expressões por precedence climbing. Todos associam à esquerda;
+# a atribuição (precedência 0) associa à direita.
+BINARY_PRECEDENCE = {
+    TokenType.OU: 1,
+    TokenType.E: 2,
+    TokenType.IGUAL: 3,
+    TokenType.DIFERENTE: 3,
+    TokenType.MAIOR: 4,
+    TokenType.MAIOR_IGUAL: 4,
+    TokenType.MENOR: 4,
+    TokenType.MENOR_IGUAL: 4,
+    TokenType.MAIS: 5,
+    TokenType.MENOS: 5,
+    TokenType.VEZES: 6,
+    TokenType.DIVIDIDO: 6,
+    TokenType.MODULO: 6,
+}
+UNARY_PRECEDENCE = 7  # Prefixos '!' e '-' ligam mais forte que qualquer binário
+
+# Contextos do parser de expressões (ver Parser.expression)
+EXPR_TOP = 0       # A expressão pedida
+EXPR_GROUP = 1     # Dentro de '(...)'
+EXPR_ARGUMENT = 2  # Argumento de uma chamada
+
+# Padrão mestre: cada match consome o espaço em branco de linha e um token
+# inteiro. A ordem das alternativas segue a ordem de decisão do lexer
+# caractere a caractere (comentários antes de '/', dois caracteres antes de um).
+TOKEN_PATTERN = re.compile(r"""
+    [ \t\r]*
+    (?:
+        (?P<NAME>[A-Za-z_]\w*)
+      | (?P<NL>\n)
+      | (?P<COMMENT>//[^\n\x00]*)
+      | (?P<BLOCK>/\*)
+      | (?P<OP>==|!=|<=|>=|&&|\|\||[-+*/%<>!=(){}\[\];,.:])
+      | (?P<NUMBER>\d+(?:\.\d+)?(?:[eE][+-]?\d*)?)
+      | (?P<STRING>")
+      | (?P<END>\Z|\x00)
+    )
+""", re.VERBOSE)
+
+STRING_BODY_PATTERN = re.compile(r'[^"\\\x00]*(?:\\[^\x00][^"\\\x00]*)*')
+ESCAPE_PATTERN = re.compile(r'\\(.)', re.DOTALL)
+
+# Versões em bytes para ler o fonte direto de um mmap (ver ByteLexer)
+# NAME não casa se seguido de byte não-ASCII: o identificador continua em UTF-8
+TOKEN_PATTERN_BYTES = re.compile(
+    TOKEN_PATTERN.pattern.replace(r'[A-Za-z_]\w*', r'[A-Za-z_]\w*(?![\w\x80-\xff])').encode(),
+    re.VERBOSE)
+STRING_BODY_PATTERN_BYTES = re.compile(STRING_BODY_PATTERN.pattern.encode())
+ESCAPE_PATTERN_BYTES = re.compile(ESCAPE_PATTERN.pattern.encode(), re.DOTALL)
+ESCAPES_BYTES = {ord(char): value.encode() for char, value in ESCAPES.items()}
+
+
+class InternTable:
+    """Tabela de identificadores canônicos de uma compilação
+    
+    O lexer entrega um único objeto str por nome; tabelas de símbolos e nomes
+    de valores IR reutilizam esse objeto, então o hash já está calculado e a
+    comparação das chaves nos dicionários é por identidade.
+    """
+    
+    def __init__(self):
+        self.names: Dict[str, str] = {}
+        self.encoded: Dict[bytes, str] = {}   # Nome em UTF-8 -> str canônica
+        self.ir_names: Dict[str, str] = {}    # Nome -> '%nome' canônico
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def intern(self, name: str) -> str:
+        return self.names.setdefault(name, name)
+    
+    def intern_bytes(self, raw: bytes) -> str:
+        name = self.encoded.get(raw)
+        if name is None:
+            name = self.encoded[raw] = self.intern(raw.decode('utf-8'))
+        return name
+    
+    def ir_name(self, name: str) -> str:
+        """Nome do valor IR para a variável name ('%name')"""
+        ir_name = self.ir_names.get(name)
+        if ir_name is None:
+            ir_name = self.ir_names[name] = self.intern('%' + name)
+        return ir_name
+
+
+class TokenBuffer:
+    """Tokens em colunas compactas (struct-of-arrays)
+    
+    Cada token ocupa um byte de tipo e três inteiros de 32 bits (início, fim,
+    linha). O texto é fatiado do fonte só quando pedido e a coluna é derivada
+    do índice de inícios de linha.
+    """
+    
+    def __init__(self, source: str, names: Optional[InternTable] = None):
+        self.source = source
+        self.names = names
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = array('I')
+        self.line_starts = array('I', [0])
+    
+    def __len__(self) -> int:
+        return len(self.kinds)
+    
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.kinds)
+        return Token(self.type(index), self.value(index), self.lines[index],
+                     self.column(index), self.starts[index])
+    
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self.kinds)):
+            yield self[index]
+    
+    def type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.kinds[index]]
+    
+    def text(self, index: int) -> str:
+        """Texto cru do token, como aparece no fonte"""
+        return self.source[self.starts[index]:self.ends[index]]
+    
+    def value(self, index: int) -> str:
+        """Valor do token (strings sem aspas e com escapes resolvidos)"""
+        if TOKEN_TYPES[self.kinds[index]] is TokenType.STRING:
+            value = self.source[self.starts[index] + 1:self.ends[index] - 1]
+            if '\\' in value:
+                value = ESCAPE_PATTERN.sub(lambda m: ESCAPES[m.group(1)], value)
+            return value
+        value = self.source[self.starts[index]:self.ends[index]]
+        if self.names is not None and TOKEN_TYPES[self.kinds[index]] is TokenType.IDENTIFICADOR:
+            value = self.names.intern(value)
+        return value
+    
+    def column(self, index: int) -> int:
+        return self.starts[index] - self.line_starts[self.lines[index] - 1] + 1
+    
+    def nbytes(self) -> int:
+        """Memória ocupada pelas colunas"""
+        columns = (self.kinds, self.starts, self.ends, self.lines, self.line_starts)
+        return sum(len(column) * column.itemsize for column in columns)
+
+
 class Lexer:
     """Analisador léxico (tokenizer) para ULX"""
     
@@ -118,12 +304,13 @@ class Lexer:
         'falso': TokenType.BOOL,
     }
     
-    def __init__(self, source: str):
+    def __init__(self, source: str, names: Optional[InternTable] = None):
         self.source = source
         self.pos = 0
         self.line = 1
         self.column = 1
         self.tokens: List[Token] = []
+        self.names = names if names is not None else InternTable()
     
     def error(self, msg: str):
         raise SyntaxError(f"{msg} at line {self.line}, column {self.column}")
@@ -222,9 +409,240 @@ class Lexer:
             value += self.advance()
         
         token_type = self.KEYWORDS.get(value, TokenType.IDENTIFICADOR)
+        if token_type == TokenType.IDENTIFICADOR:
+            value = self.names.intern(value)
         return Token(token_type, value, start_line, start_col)
     
+    def error_at(self, offset: int, line: int, line_start: int, msg: str):
+        """Erro na posição absoluta offset, a partir de uma linha conhecida"""
+        self.pos = offset
+        self.line = line + self.source.count('\n', line_start, offset)
+        newline = self.source.rfind('\n', line_start, offset)
+        if newline >= 0:
+            line_start = newline + 1
+        self.column = offset - line_start + 1
+        self.error(msg)
+
+    def scan_string(self, start: int, end: int, line: int, line_start: int) -> tuple:
+        """Lê um literal string a partir da aspa em start; retorna (valor, fim)"""
+        source = self.source
+        body_end = STRING_BODY_PATTERN.match(source, start + 1, end).end()
+        value = source[start + 1:body_end]
+        terminated = body_end < end and source[body_end] == '"'
+        if '\\' in value or not terminated:
+            for m in ESCAPE_PATTERN.finditer(source, start + 1, body_end):
+                if m.group(1) not in ESCAPES:
+                    self.error_at(m.end(), line, line_start,
+                                  f"Unknown escape sequence: \\{m.group(1)}")
+            if not terminated:
+                if body_end < end and source[body_end] == '\\':
+                    # Barra invertida no fim da entrada
+                    self.error_at(body_end + 2, line, line_start, "Unknown escape sequence: \\\0")
+                self.error_at(body_end, line, line_start, "Unterminated string")
+            value = ESCAPE_PATTERN.sub(lambda m: ESCAPES[m.group(1)], value)
+        return value, body_end + 1
+
+    def scan_fallback(self, pos: int, end: int, line: int, line_start: int) -> Token:
+        """Caracteres fora do padrão mestre (ex.: letras não-ASCII)"""
+        source = self.source
+        while pos < end and source[pos] in ' \t\r':
+            pos += 1
+        self.pos = pos
+        self.line = line
+        self.column = pos - line_start + 1
+        char = source[pos]
+        if char.isdigit():
+            return self.read_number()
+        if char.isalpha():
+            return self.read_identifier()
+        self.error(f"Invalid character: {char}")
+
+    def iter_tokens(self, pos: int = 0, line: int = 1, line_start: int = 0) -> Iterator[Token]:
+        """Gera os tokens sob demanda com o padrão mestre (um match por token)
+        
+        pos/line/line_start permitem retomar a análise no início de um token
+        já conhecido. Um '\0' no fonte é tratado como fim da entrada.
+        """
+        source = self.source
+        end = len(source)
+
+        match = TOKEN_PATTERN.match
+        keywords = self.KEYWORDS
+        operators = OPERATORS
+        identifier = TokenType.IDENTIFICADOR
+        intern = self.names.intern
+
+        while True:
+            m = match(source, pos, end)
+            if m is None:
+                yield self.scan_fallback(pos, end, line, line_start)
+                pos = self.pos
+                continue
+
+            kind = m.lastgroup
+            next_pos = m.end()
+            if kind == 'NAME':
+                value = intern(m.group(kind))
+                start = next_pos - len(value)
+                yield Token(keywords.get(value, identifier), value,
+                            line, start - line_start + 1, start)
+            elif kind == 'OP':
+                value = m.group(kind)
+                start = next_pos - len(value)
+                yield Token(operators[value], value, line, start - line_start + 1, start)
+            elif kind == 'NL':
+                line += 1
+                line_start = next_pos
+            elif kind == 'NUMBER':
+                value = m.group(kind)
+                start = next_pos - len(value)
+                if not source[next_pos:next_pos + 2].isascii():
+                    # Dígitos não-ASCII (ex.: '²') seguem as regras de str.isdigit
+                    self.pos = start
+                    self.line = line
+                    self.column = start - line_start + 1
+                    yield self.read_number()
+                    next_pos = self.pos
+                else:
+                    yield Token(TokenType.NUMERO, value, line, start - line_start + 1, start)
+            elif kind == 'STRING':
+                start = next_pos - 1
+                value, next_pos = self.scan_string(start, end, line, line_start)
+                yield Token(TokenType.STRING, value, line, start - line_start + 1, start)
+                newlines = source.count('\n', start, next_pos)
+                if newlines:
+                    line += newlines
+                    line_start = source.rfind('\n', start, next_pos) + 1
+            elif kind == 'BLOCK':
+                close = source.find('*/', next_pos, end)
+                nul = source.find('\0', next_pos, close if close >= 0 else end)
+                if nul >= 0:
+                    self.error_at(nul, line, line_start, "Unterminated comment")
+                if close < 0:
+                    self.error_at(end, line, line_start, "Unterminated comment")
+                start = next_pos
+                next_pos = close + 2
+                newlines = source.count('\n', start, close)
+                if newlines:
+                    line += newlines
+                    line_start = source.rfind('\n', start, close) + 1
+            elif kind == 'END':
+                end = m.start(kind)
+                break
+            pos = next_pos
+
+        self.pos = end
+        self.line = line
+        self.column = end - line_start + 1
+        yield Token(TokenType.EOF, "", self.line, self.column, end)
+
     def tokenize(self) -> List[Token]:
+        """Tokeniza o código fonte inteiro"""
+        self.tokens.extend(self.iter_tokens())
+        return self.tokens
+
+    def tokenize_compact(self) -> TokenBuffer:
+        """Tokeniza para um TokenBuffer, sem criar um objeto Token por token"""
+        source = self.source
+        end = source.find('\0')
+        if end < 0:
+            end = len(source)
+
+        buffer = TokenBuffer(source, self.names)
+        add_kind = buffer.kinds.append
+        add_start = buffer.starts.append
+        add_end = buffer.ends.append
+        add_line = buffer.lines.append
+        add_line_start = buffer.line_starts.append
+        match = TOKEN_PATTERN.match
+        keywords = {word: TOKEN_CODES[token_type] for word, token_type in self.KEYWORDS.items()}
+        operators = {op: TOKEN_CODES[token_type] for op, token_type in OPERATORS.items()}
+        identifier = TOKEN_CODES[TokenType.IDENTIFICADOR]
+        number = TOKEN_CODES[TokenType.NUMERO]
+        string = TOKEN_CODES[TokenType.STRING]
+        pos = 0
+        line = 1
+        line_start = 0
+
+        while True:
+            m = match(source, pos, end)
+            if m is None:
+                token = self.scan_fallback(pos, end, line, line_start)
+                pos = self.pos
+                add_kind(TOKEN_CODES[token.type])
+                add_start(pos - len(token.value))
+                add_end(pos)
+                add_line(line)
+                continue
+
+            kind = m.lastgroup
+            next_pos = m.end()
+            if kind == 'NAME':
+                add_kind(keywords.get(m.group(kind), identifier))
+                add_start(m.start(kind))
+            elif kind == 'OP':
+                add_kind(operators[m.group(kind)])
+                add_start(m.start(kind))
+            elif kind == 'NL':
+                line += 1
+                line_start = next_pos
+                add_line_start(line_start)
+                pos = next_pos
+                continue
+            elif kind == 'NUMBER':
+                start = m.start(kind)
+                if not source[next_pos:next_pos + 2].isascii():
+                    self.pos = start
+                    self.line = line
+                    self.column = start - line_start + 1
+                    self.read_number()
+                    next_pos = self.pos
+                add_kind(number)
+                add_start(start)
+            elif kind == 'STRING':
+                start = next_pos - 1
+                next_pos = self.scan_string(start, end, line, line_start)[1]
+                add_kind(string)
+                add_start(start)
+                add_end(next_pos)
+                add_line(line)
+                newline = source.find('\n', start, next_pos)
+                while newline >= 0:
+                    line += 1
+                    line_start = newline + 1
+                    add_line_start(line_start)
+                    newline = source.find('\n', line_start, next_pos)
+                pos = next_pos
+                continue
+            elif kind == 'BLOCK':
+                close = source.find('*/', next_pos, end)
+                if close < 0:
+                    self.error_at(end, line, line_start, "Unterminated comment")
+                newline = source.find('\n', next_pos, close)
+                while newline >= 0:
+                    line += 1
+                    line_start = newline + 1
+                    add_line_start(line_start)
+                    newline = source.find('\n', line_start, close)
+                pos = close + 2
+                continue
+            elif kind == 'COMMENT':
+                pos = next_pos
+                continue
+            else:
+                break
+            add_end(next_pos)
+            add_line(line)
+            pos = next_pos
+
+        add_kind(TOKEN_CODES[TokenType.EOF])
+        add_start(end)
+        add_end(end)
+        add_line(line)
+        return buffer
+
+    def tokenize_chars(self) -> List[Token]:
+        """Tokenizador caractere a caractere (referência para testes e benchmarks)"""
         while self.peek() != '\0':
             self.skip_whitespace()
             
@@ -310,21 +728,175 @@ class Lexer:
         return self.tokens
 
 
+class ByteLexer(Lexer):
+    """Lexer sobre bytes (bytes ou mmap) em UTF-8
+    
+    O fonte não é decodificado por inteiro: só identificadores, números e
+    literais string viram str quando se tornam tokens. Offsets dos tokens são
+    em bytes; colunas continuam em caracteres. Identificadores não-ASCII
+    (raros) fazem o restante do fonte ser decodificado e entregue ao Lexer.
+    """
+    
+    KEYWORDS_BYTES = {word.encode(): token_type for word, token_type in Lexer.KEYWORDS.items()}
+    OPERATORS_BYTES = {op.encode(): (token_type, op) for op, token_type in OPERATORS.items()}
+    
+    def char_column(self, offset: int, line_start: int) -> int:
+        """Coluna em caracteres de offset (em bytes)"""
+        source = self.source
+        end = min(offset, len(source))
+        width = len(source[line_start:end].decode('utf-8', 'replace'))
+        return width + offset - end + 1
+    
+    def error_at(self, offset: int, line: int, line_start: int, msg: str):
+        source = self.source
+        self.line = line + source[line_start:offset].count(b'\n')
+        newline = source.rfind(b'\n', line_start, offset)
+        if newline >= 0:
+            line_start = newline + 1
+        self.pos = offset
+        self.column = self.char_column(offset, line_start)
+        self.error(msg)
+    
+    def scan_string(self, start: int, end: int, line: int, line_start: int) -> tuple:
+        source = self.source
+        body_end = STRING_BODY_PATTERN_BYTES.match(source, start + 1, end).end()
+        value = source[start + 1:body_end]
+        terminated = body_end < end and source[body_end] == 0x22  # "
+        if b'\\' in value or not terminated:
+            for m in ESCAPE_PATTERN_BYTES.finditer(source, start + 1, body_end):
+                if m.group(1)[0] not in ESCAPES_BYTES:
+                    char = source[m.start(1):m.start(1) + 4].decode('utf-8', 'replace')[0]
+                    self.error_at(m.start(1) + len(char.encode()), line, line_start,
+                                  f"Unknown escape sequence: \\{char}")
+            if not terminated:
+                if body_end < end and source[body_end] == 0x5c:  # \
+                    self.error_at(body_end + 2, line, line_start, "Unknown escape sequence: \\\0")
+                self.error_at(body_end, line, line_start, "Unterminated string")
+            value = ESCAPE_PATTERN_BYTES.sub(lambda m: ESCAPES_BYTES[m.group(1)[0]], value)
+        return value.decode('utf-8'), body_end + 1
+    
+    def decode_rest(self, pos: int, line: int, line_start: int) -> Iterator[Token]:
+        """Continua a análise com o Lexer de str a partir de pos"""
+        text = bytes(self.source[line_start:]).decode('utf-8')
+        column = len(self.source[line_start:pos].decode('utf-8'))
+        for token in Lexer(text, self.names).iter_tokens(column, line, 0):
+            token.offset = -1
+            yield token
+    
+    def iter_tokens(self, pos: int = 0, line: int = 1, line_start: int = 0) -> Iterator[Token]:
+        source = self.source
+        end = len(source)
+        match = TOKEN_PATTERN_BYTES.match
+        keywords = self.KEYWORDS_BYTES
+        operators = self.OPERATORS_BYTES
+        identifier = TokenType.IDENTIFICADOR
+        intern_bytes = self.names.intern_bytes
+        wide = False  # Linha atual tem caracteres não-ASCII antes da posição
+        
+        while True:
+            m = match(source, pos, end)
+            if m is None:
+                while source[pos] in b' \t\r':
+                    pos += 1
+                char = source[pos]
+                if char >= 0x80 or char == 0x5f or chr(char).isalpha():
+                    yield from self.decode_rest(pos, line, line_start)
+                    return
+                self.error_at(pos, line, line_start, f"Invalid character: {chr(source[pos])}")
+            
+            kind = m.lastgroup
+            next_pos = m.end()
+            if kind == 'NAME':
+                value = m.group(kind)
+                start = next_pos - len(value)
+                column = self.char_column(start, line_start) if wide else start - line_start + 1
+                yield Token(keywords.get(value, identifier), intern_bytes(value), line, column, start)
+            elif kind == 'OP':
+                start = m.start(kind)
+                token_type, value = operators[m.group(kind)]
+                column = self.char_column(start, line_start) if wide else start - line_start + 1
+                yield Token(token_type, value, line, column, start)
+            elif kind == 'NL':
+                line += 1
+                line_start = next_pos
+                wide = False
+            elif kind == 'NUMBER':
+                value = m.group(kind)
+                start = next_pos - len(value)
+                if not source[next_pos:next_pos + 2].isascii():
+                    # Dígitos não-ASCII (ex.: '²') seguem as regras de str.isdigit
+                    yield from self.decode_rest(start, line, line_start)
+                    return
+                column = self.char_column(start, line_start) if wide else start - line_start + 1
+                yield Token(TokenType.NUMERO, value.decode(), line, column, start)
+            elif kind == 'STRING':
+                start = next_pos - 1
+                value, next_pos = self.scan_string(start, end, line, line_start)
+                column = self.char_column(start, line_start) if wide else start - line_start + 1
+                yield Token(TokenType.STRING, value, line, column, start)
+                newlines = source[start:next_pos].count(b'\n')
+                if newlines:
+                    line += newlines
+                    line_start = source.rfind(b'\n', start, next_pos) + 1
+                    wide = False
+                wide = wide or not source[max(start, line_start):next_pos].isascii()
+            elif kind == 'COMMENT':
+                wide = wide or not m.group(kind).isascii()
+            elif kind == 'BLOCK':
+                close = source.find(b'*/', next_pos, end)
+                nul = source.find(b'\0', next_pos, close if close >= 0 else end)
+                if nul >= 0:
+                    self.error_at(nul, line, line_start, "Unterminated comment")
+                if close < 0:
+                    self.error_at(end, line, line_start, "Unterminated comment")
+                start = next_pos
+                next_pos = close + 2
+                newlines = source[start:close].count(b'\n')
+                if newlines:
+                    line += newlines
+                    line_start = source.rfind(b'\n', start, close) + 1
+                    wide = False
+                wide = wide or not source[max(start, line_start):next_pos].isascii()
+            elif kind == 'END':
+                end = m.start(kind)
+                break
+            pos = next_pos
+        
+        self.pos = end
+        self.line = line
+        self.column = self.char_column(end, line_start) if wide else end - line_start + 1
+        yield Token(TokenType.EOF, "", self.line, self.column, end)
+
+
+def map_source(path: str) -> Union[bytes, 'mmap.mmap']:
+    """Mapeia um arquivo .ulx em memória, sem ler nem decodificar o conteúdo
+    
+    Arquivos vazios e entradas não mapeáveis (pipes) são lidos como bytes.
+    """
+    with open(path, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return f.read()
+
+
 # ==================== AST ====================
+# Nós com __slots__ (sem __dict__ por instância): programas grandes têm
+# milhões de nós e o dicionário dominava a memória da AST.
 
-@dataclass
+@dataclass(slots=True)
 class ASTNode(ABC):
     """Nó base da AST"""
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class Program(ASTNode):
     """Programa completo"""
     declarations: List[ASTNode] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionDecl(ASTNode):
     """Declaração de função"""
     name: str = ""
@@ -333,7 +905,7 @@ class FunctionDecl(ASTNode):
     body: List[ASTNode] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class VarDecl(ASTNode):
     """Declaração de variável"""
     name: str = ""
@@ -341,13 +913,13 @@ class VarDecl(ASTNode):
     initializer: Optional[ASTNode] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Expression(ASTNode, ABC):
     """Expressão base"""
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class BinaryExpr(Expression):
     """Expressão binária"""
     left: Expression = None
@@ -355,53 +927,53 @@ class BinaryExpr(Expression):
     right: Expression = None
 
 
-@dataclass
+@dataclass(slots=True)
 class UnaryExpr(Expression):
     """Expressão unária"""
     operator: str = ""
     operand: Expression = None
 
 
-@dataclass
+@dataclass(slots=True)
 class LiteralExpr(Expression):
     """Literal"""
     value: Any = None
     literal_type: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class IdentifierExpr(Expression):
     """Identificador"""
     name: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class CallExpr(Expression):
     """Chamada de função"""
     callee: str = ""
     arguments: List[Expression] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class AssignmentExpr(Expression):
     """Atribuição"""
     target: str = ""
     value: Expression = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Statement(ASTNode, ABC):
     """Statement base"""
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class ExprStmt(Statement):
     """Statement de expressão"""
     expression: Expression = None
 
 
-@dataclass
+@dataclass(slots=True)
 class IfStmt(Statement):
     """Statement if"""
     condition: Expression = None
@@ -409,14 +981,14 @@ class IfStmt(Statement):
     else_branch: List[Statement] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class WhileStmt(Statement):
     """Statement while"""
     condition: Expression = None
     body: List[Statement] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ForStmt(Statement):
     """Statement for"""
     init: Optional[Statement] = None
@@ -425,42 +997,71 @@ class ForStmt(Statement):
     body: List[Statement] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ReturnStmt(Statement):
     """Statement return"""
     value: Optional[Expression] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class WriteStmt(Statement):
     """Statement escreva"""
     expression: Expression = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ReadStmt(Statement):
     """Statement leia"""
     target: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class OpenStmt(Statement):
     """Statement abre"""
     path: Expression = None
 
 
-@dataclass
+@dataclass(slots=True)
 class CloseStmt(Statement):
     """Statement fecha"""
     target: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class ReadFileStmt(Statement):
     """Statement le (arquivo)"""
     target: str = ""
 
 
+# Campos da AST que guardam nomes vindos de tokens IDENTIFICADOR/tipo
+NAME_FIELDS = frozenset(('name', 'target', 'callee', 'var_type', 'return_type'))
+
+
+def intern_names(node: ASTNode, names: InternTable):
+    """Troca os nomes de uma AST pelos objetos canônicos de names
+    
+    Uma AST que não saiu do lexer desta compilação (ex.: carregada do cache)
+    traz strings próprias; depois disto ela compartilha os nomes com names
+    como se tivesse sido analisada com ele. Palavras-chave que não aparecem
+    na AST (funcao, se, ...) não entram na tabela.
+    """
+    intern = names.intern
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        for attr in node.__slots__:
+            value = getattr(node, attr)
+            if attr in NAME_FIELDS:
+                if isinstance(value, str):
+                    setattr(node, attr, intern(value))
+            elif attr == 'params':
+                node.params = [(intern(name), intern(param_type)) for name, param_type in value]
+            elif isinstance(value, ASTNode):
+                stack.append(value)
+            elif isinstance(value, list):
+                stack.extend(item for item in value if isinstance(item, ASTNode))
+
+
 class Parser:
     """Parser Recursive Descent para ULX"""
     
@@ -752,9 +1353,133 @@ class Parser:
     
     # ==================== EXPRESSÕES (Pratt Parser) ====================
     
+    def current_type(self) -> TokenType:
+        tokens = self.tokens
+        if self.pos >= len(tokens):
+            return tokens[-1].type
+        return tokens[self.pos].type
+    
     def expression(self) -> Expression:
-        """Parse expressão (precedência mais baixa)"""
-        return self.assignment()
+        """Parse expressão por precedence climbing com pilhas explícitas
+        
+        Não há recursão: um grupo '(...)' ou um argumento de chamada suspende
+        o contexto atual em contexts, então o aninhamento só é limitado pela
+        memória e o custo por nó é constante.
+        """
+        precedence = BINARY_PRECEDENCE
+        current_type = self.current_type
+        advance = self.advance
+        reduce = self.reduce
+        contexts = []   # Contextos suspensos (operands, operators, kind, callee, args)
+        operands: List[Expression] = []
+        operators: List[tuple] = []  # (precedência, operador)
+        kind = EXPR_TOP
+        callee = None   # Função chamada (contexto EXPR_ARGUMENT)
+        args = None
+        
+        while True:
+            # Posição de operando: prefixos unários e primário
+            token_type = current_type()
+            while token_type == TokenType.NAO or token_type == TokenType.MENOS:
+                operators.append((UNARY_PRECEDENCE, advance().value))
+                token_type = current_type()
+            
+            if token_type == TokenType.IDENTIFICADOR:
+                expr = IdentifierExpr(advance().value)
+            elif token_type == TokenType.NUMERO:
+                token = advance()
+                if '.' in token.value or 'e' in token.value.lower():
+                    expr = LiteralExpr(float(token.value), "real")
+                else:
+                    expr = LiteralExpr(int(token.value), "inteiro")
+            elif token_type == TokenType.PARENTESE_ESQ:
+                advance()
+                contexts.append((operands, operators, kind, callee, args))
+                operands, operators, kind, callee, args = [], [], EXPR_GROUP, None, None
+                continue
+            else:
+                expr = self.primary()
+            
+            # Posição de operador: chamadas, operadores e fim de contexto
+            while True:
+                token_type = current_type()
+                if token_type == TokenType.PARENTESE_ESQ:
+                    advance()
+                    if not isinstance(expr, IdentifierExpr):
+                        self.error("Can only call functions")
+                    if current_type() == TokenType.PARENTESE_DIR:
+                        advance()
+                        expr = CallExpr(expr.name, [])
+                        continue
+                    contexts.append((operands, operators, kind, callee, args))
+                    operands, operators, kind, callee, args = [], [], EXPR_ARGUMENT, expr.name, []
+                    break
+                
+                operands.append(expr)
+                level = precedence.get(token_type)
+                if level is not None:
+                    reduce(operands, operators, level)
+                    operators.append((level, advance().value))
+                    break
+                if token_type == TokenType.ATRIBUICAO:
+                    # Associa à direita: não reduz atribuições pendentes
+                    reduce(operands, operators, 1)
+                    operators.append((0, advance().value))
+                    break
+                
+                reduce(operands, operators, 0)
+                expr = operands.pop()
+                if kind == EXPR_TOP:
+                    return expr
+                if kind == EXPR_GROUP:
+                    self.consume(TokenType.PARENTESE_DIR)
+                else:
+                    args.append(expr)
+                    if current_type() == TokenType.VIRGULA:
+                        advance()
+                        operands, operators = [], []
+                        break
+                    self.consume(TokenType.PARENTESE_DIR)
+                    expr = CallExpr(callee, args)
+                operands, operators, kind, callee, args = contexts.pop()
+    
+    def reduce(self, operands: List[Expression], operators: List[tuple], limit: int):
+        """Aplica os operadores pendentes com precedência >= limit"""
+        while operators and operators[-1][0] >= limit:
+            level, op = operators.pop()
+            if level == UNARY_PRECEDENCE:
+                operands.append(UnaryExpr(op, operands.pop()))
+            elif level:
+                right = operands.pop()
+                operands.append(BinaryExpr(operands.pop(), op, right))
+            else:
+                value = operands.pop()
+                target = operands.pop()
+                if not isinstance(target, IdentifierExpr):
+                    self.error("Invalid assignment target")
+                operands.append(AssignmentExpr(target.name, value))
+    
+    def call_arguments(self, expr: Expression) -> Expression:
+        """Parse as chamadas (args) que seguem expr"""
+        while self.match(TokenType.PARENTESE_ESQ):
+            self.advance()
+            if isinstance(expr, IdentifierExpr):
+                args = []
+                if not self.match(TokenType.PARENTESE_DIR):
+                    while True:
+                        args.append(self.expression())
+                        if not self.match(TokenType.VIRGULA):
+                            break
+                        self.advance()
+                self.consume(TokenType.PARENTESE_DIR)
+                expr = CallExpr(expr.name, args)
+            else:
+                self.error("Can only call functions")
+        
+        return expr
+    
+    # Cadeia recursiva original (um método por nível de precedência), mantida
+    # como referência para o benchmark de expressões
     
     def assignment(self) -> Expression:
         """Parse atribuição"""
@@ -833,24 +1558,7 @@ class Parser:
     
     def call(self) -> Expression:
         """Parse chamada de função"""
-        expr = self.primary()
-        
-        while self.match(TokenType.PARENTESE_ESQ):
-            self.advance()
-            if isinstance(expr, IdentifierExpr):
-                args = []
-                if not self.match(TokenType.PARENTESE_DIR):
-                    while True:
-                        args.append(self.expression())
-                        if not self.match(TokenType.VIRGULA):
-                            break
-                        self.advance()
-                self.consume(TokenType.PARENTESE_DIR)
-                expr = CallExpr(expr.name, args)
-            else:
-                self.error("Can only call functions")
-        
-        return expr
+        return self.call_arguments(self.primary())
     
     def primary(self) -> Expression:
         """Parse primário (literal, identificador, grupo)"""
@@ -879,9 +1587,279 @@ class Parser:
         self.error(f"Unexpected token: {self.current().value}")
 
 
-def parse_source(source: str) -> Program:
-    """Função utilitária para parse de código fonte ULX"""
-    lexer = Lexer(source)
+class TokenRing:
+    """Buffer circular de lookahead sobre um iterador de tokens"""
+    
+    def __init__(self, tokens: Iterator[Token], size: int = 4):
+        if size < 2:
+            raise ValueError("Token ring needs room for at least 2 tokens")
+        self.tokens = tokens
+        self.size = size
+        self.slots: List[Optional[Token]] = [None] * size
+        self.head = 0   # Slot do token atual
+        self.count = 0  # Tokens válidos a partir de head
+        self.fill(1)
+    
+    def fill(self, count: int):
+        """Garante count tokens no buffer (repete o EOF no fim da entrada)"""
+        while self.count < count:
+            token = next(self.tokens, None)
+            if token is None:
+                # Iterador esgotado: o último token lido é o EOF
+                token = self.slots[(self.head + self.count - 1) % self.size]
+            self.slots[(self.head + self.count) % self.size] = token
+            self.count += 1
+    
+    def peek(self, offset: int = 0) -> Token:
+        if offset >= self.size:
+            raise ValueError(f"Lookahead of {offset} exceeds token ring size {self.size}")
+        if offset >= self.count:
+            self.fill(offset + 1)
+        return self.slots[(self.head + offset) % self.size]
+    
+    def advance(self) -> Token:
+        token = self.slots[self.head]
+        if token.type != TokenType.EOF:
+            self.slots[self.head] = None
+            self.head = (self.head + 1) % self.size
+            self.count -= 1
+            self.fill(1)
+        return token
+
+
+class StreamingParser(Parser):
+    """Parser que consome tokens sob demanda, sem materializar List[Token]"""
+    
+    def __init__(self, tokens: Iterator[Token], lookahead: int = 4):
+        self.tokens = None
+        self.ring = TokenRing(iter(tokens), lookahead)
+        self.pos = 0
+    
+    def current(self) -> Token:
+        ring = self.ring
+        return ring.slots[ring.head]
+    
+    def current_type(self) -> TokenType:
+        ring = self.ring
+        return ring.slots[ring.head].type
+    
+    def peek(self, offset: int = 0) -> Token:
+        return self.ring.peek(offset)
+    
+    def advance(self) -> Token:
+        self.pos += 1
+        return self.ring.advance()
+
+
+class CompactParser(Parser):
+    """Parser sobre um TokenBuffer: compara códigos de tipo e só cria o Token
+    (e fatia seu texto) quando ele é consumido"""
+    
+    def __init__(self, tokens: TokenBuffer):
+        self.tokens = tokens
+        self.kinds = tokens.kinds
+        self.last = len(tokens.kinds) - 1
+        self.pos = 0
+    
+    def current(self) -> Token:
+        return self.tokens[min(self.pos, self.last)]
+    
+    def peek(self, offset: int = 0) -> Token:
+        return self.tokens[min(self.pos + offset, self.last)]
+    
+    def match(self, *types: TokenType) -> bool:
+        return TOKEN_TYPES[self.kinds[min(self.pos, self.last)]] in types
+    
+    def current_type(self) -> TokenType:
+        return TOKEN_TYPES[self.kinds[min(self.pos, self.last)]]
+
+
+def common_prefix_length(a: str, b: str, chunk: int = 4096) -> int:
+    """Tamanho do prefixo comum (comparação em blocos)"""
+    limit = min(len(a), len(b))
+    pos = 0
+    while pos + chunk <= limit and a[pos:pos + chunk] == b[pos:pos + chunk]:
+        pos += chunk
+    while pos < limit and a[pos] == b[pos]:
+        pos += 1
+    return pos
+
+
+def common_suffix_length(a: str, b: str, limit: int, chunk: int = 4096) -> int:
+    """Tamanho do sufixo comum, limitado a limit caracteres"""
+    length = 0
+    len_a, len_b = len(a), len(b)
+    while length + chunk <= limit and \
+            a[len_a - length - chunk:len_a - length] == b[len_b - length - chunk:len_b - length]:
+        length += chunk
+    while length < limit and a[len_a - length - 1] == b[len_b - length - 1]:
+        length += 1
+    return length
+
+
+class IncrementalParser:
+    """Parser incremental para fluxos de edição (editor/watch)
+    
+    Guarda o offset inicial de cada declaração de topo da última análise. Em
+    update(), o trecho editado é localizado por prefixo/sufixo comuns, a
+    análise recomeça na última declaração que começa antes da edição e para
+    assim que o parser volta a uma fronteira de declaração já conhecida depois
+    dela. Lexer e parser não têm estado entre declarações de topo, então as
+    declarações seguintes (e suas subárvores) são reaproveitadas como estão.
+    """
+    
+    def __init__(self):
+        self.source = ""
+        self.program = Program()
+        self.starts: List[int] = []       # Offset do primeiro token de cada declaração
+        self.positions: List[tuple] = []  # (linha, início da linha) de cada declaração
+        self.reparsed = 0  # Declarações analisadas na última chamada
+        self.reused = 0    # Declarações reaproveitadas na última chamada
+        self.names = InternTable()  # Compartilhada entre as reanálises
+    
+    def parse(self, source: str) -> Program:
+        """Análise completa, registrando o início de cada declaração"""
+        try:
+            declarations, starts, positions = self.parse_range(source, 0, 1, 0, None)
+        except (SyntaxError, ValueError):
+            # O parser em streaming pode achar um erro sintático antes de um
+            # erro léxico posterior; parse_source reporta o erro canônico
+            parse_source(source)
+            raise
+        self.commit(source, declarations, starts, positions, len(declarations))
+        return self.program
+    
+    def update(self, source: str, edit: Optional[tuple] = None) -> Program:
+        """Reanalisa só as declarações afetadas pela diferença para o último fonte
+        
+        edit=(início, fim) opcional indica o trecho substituído no fonte
+        anterior (como informado pelo editor), evitando a comparação dos textos.
+        """
+        old = self.source
+        if source == old:
+            self.reparsed = 0
+            self.reused = len(self.starts)
+            return self.program
+        
+        # Trecho editado: [prefix, len(old) - suffix) -> [prefix, len(source) - suffix)
+        if edit is not None:
+            prefix, suffix = edit[0], len(old) - edit[1]
+        else:
+            prefix = common_prefix_length(old, source)
+            suffix = common_suffix_length(old, source, min(len(old), len(source)) - prefix)
+        delta = len(source) - len(old)
+        old_edit_end = len(old) - suffix
+        new_edit_end = len(source) - suffix
+        
+        # Recomeça na última declaração que começa até o início da edição
+        first = bisect.bisect_right(self.starts, prefix) - 1
+        if first >= 0:
+            start = self.starts[first]
+            line, line_start = self.positions[first]
+        else:
+            first, start, line, line_start = 0, 0, 1, 0
+        
+        # Declarações antigas que começam depois da edição (offset novo -> índice)
+        resume = {}
+        for index in range(bisect.bisect_left(self.starts, old_edit_end), len(self.starts)):
+            resume[self.starts[index] + delta] = index
+        
+        try:
+            declarations, starts, positions = self.parse_range(
+                source, start, line, line_start, resume, new_edit_end)
+        except (SyntaxError, ValueError):
+            # Análise completa para reportar o mesmo erro que parse_source
+            return self.parse(source)
+        
+        stop = len(self.starts)
+        if starts and starts[-1] in resume:
+            stop = resume[starts.pop()]
+            positions.pop()
+        
+        # Reaproveita o sufixo, corrigindo linhas e offsets
+        line_delta = source.count('\n', prefix, new_edit_end) - old.count('\n', prefix, old_edit_end)
+        for index in range(stop, len(self.starts)):
+            offset = self.starts[index] + delta
+            line, line_start = self.positions[index]
+            if line_start > old_edit_end:
+                line_start += delta
+            else:
+                line_start = source.rfind('\n', 0, offset) + 1
+            starts.append(offset)
+            positions.append((line + line_delta, line_start))
+            declarations.append(self.program.declarations[index])
+        
+        reparsed = len(declarations) - (len(self.starts) - stop)
+        self.commit(source,
+                    self.program.declarations[:first] + declarations,
+                    self.starts[:first] + starts,
+                    self.positions[:first] + positions,
+                    reparsed)
+        return self.program
+    
+    def parse_range(self, source: str, start: int, line: int, line_start: int,
+                    resume: Optional[Dict[int, int]], edit_end: int = 0) -> tuple:
+        """Analisa declarações a partir de start até o EOF ou até uma fronteira
+        de resume depois de edit_end (que fica como último elemento de starts)"""
+        parser = StreamingParser(Lexer(source, self.names).iter_tokens(start, line, line_start))
+        declarations = []
+        starts = []
+        positions = []
+        while True:
+            token = parser.current()
+            if token.type == TokenType.EOF:
+                break
+            starts.append(token.offset)
+            positions.append((token.line, token.offset - token.column + 1))
+            if resume and token.offset >= edit_end and token.offset in resume:
+                break
+            declarations.append(parser.declaration())
+        return declarations, starts, positions
+    
+    def commit(self, source: str, declarations: List[ASTNode], starts: List[int],
+               positions: List[tuple], reparsed: int):
+        self.source = source
+        self.program = Program(declarations)
+        self.starts = starts
+        self.positions = positions
+        self.reparsed = reparsed
+        self.reused = len(declarations) - reparsed
+
+
+def parse_source(source: Union[str, bytes], streaming: bool = False, compact: bool = False,
+                 cache: Optional['ParseCache'] = None, names: Optional[InternTable] = None) -> Program:
+    """Função utilitária para parse de código fonte ULX
+    
+    source pode ser str ou bytes em UTF-8 (bytes ou mmap); bytes
+    são analisados pelo ByteLexer sem decodificar o fonte inteiro.
+    
+    Com streaming=True os tokens são gerados sob demanda e o parser lê de um
+    buffer circular, mantendo a memória dos tokens constante. Com compact=True
+    os tokens ficam num TokenBuffer em vez de uma List[Token]. Com um cache
+    (ulx_cache.ParseCache) um fonte já visto não é analisado de novo.
+    names é a tabela de identificadores da compilação (ver InternTable);
+    num acerto do cache os nomes da AST carregada são internados nela.
+    """
+    if cache is not None:
+        program = cache.get(source)
+        if program is None:
+            program = parse_source(source, streaming, compact, names=names)
+            cache.put(source, program)
+        elif names is not None:
+            intern_names(program, names)
+        return program
+    
+    if not isinstance(source, str):
+        if compact:
+            # TokenBuffer fatia texto do fonte: precisa do str decodificado
+            return parse_source(bytes(source).decode('utf-8'), compact=True, names=names)
+        lexer = ByteLexer(source, names)
+    else:
+        lexer = Lexer(source, names)
+    if streaming:
+        return StreamingParser(lexer.iter_tokens()).parse()
+    if compact:
+        return CompactParser(lexer.tokenize_compact()).parse()
     tokens = lexer.tokenize()
     parser = Parser(tokens)
     return parser.parse()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+ULX Passes - Gerenciador de passes sobre a ULX-IR
+Pipelines de transformações com análises em cache, invalidação pelo que
+cada passo alterou e medição de tempo/instruções por passo
+"""
+
+import time
+from dataclasses import dataclass
+from enum import Flag
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from ulx_ir import Module, Function
+from ulx_analysis import DominatorTree, LoopForest, Liveness
+from ulx_mem2reg import promote_memory
+from ulx_sccp import propagate_constants
+from ulx_gvn import number_values
+from ulx_simplifycfg import simplify_function
+from ulx_licm import hoist_invariants
+from ulx_indvars import simplify_induction_variables
+from ulx_unroll import unroll_loops, UNROLL_BUDGET
+from ulx_vectorize import vectorize_loops
+from ulx_tailrec import eliminate_tail_recursion
+from ulx_inline import inline_calls, INLINE_THRESHOLD
+
+
+class Change(Flag):
+    """O que um passo alterou; decide quais análises em cache são descartadas"""
+    NONE = 0
+    INSTRUCTIONS = 1    # Instruções criadas, removidas ou reescritas
+    CFG = 2             # Blocos ou arestas
+    ALL = 3
+
+
+@dataclass
+class PassStats:
+    """Medições acumuladas de um passo (ou análise) no pipeline"""
+    name: str
+    kind: str                       # 'transform' ou 'analysis'
+    runs: int = 0
+    changed: int = 0                # Execuções que alteraram a IR
+    hits: int = 0                   # Análises: pedidos atendidos pelo cache
+    seconds: float = 0.0            # Sem o tempo das análises pedidas
+    instructions_before: int = 0
+    instructions_after: int = 0
+
+
+# Análises: nome -> (cálculo, alterações que a invalidam)
+AnalysisFunc = Callable[[Function, 'PassManager'], Any]
+ANALYSES: Dict[str, Tuple[AnalysisFunc, Change]] = {
+    'domtree': (lambda func, manager: DominatorTree(func), Change.CFG),
+    'loops': (lambda func, manager: LoopForest(func, manager.get('domtree', func)), Change.CFG),
+    'liveness': (lambda func, manager: Liveness(func, manager.get('domtree', func)), Change.ALL),
+}
+
+
+def run_mem2reg(func: Function, manager: 'PassManager') -> Change:
+    promoted = promote_memory(func, manager.get('domtree', func))
+    return Change.INSTRUCTIONS if promoted else Change.NONE
+
+
+def run_sccp(func: Function, manager: 'PassManager') -> Change:
+    folded, branches, removed = propagate_constants(func)
+    if branches or removed:
+        return Change.ALL
+    return Change.INSTRUCTIONS if folded else Change.NONE
+
+
+def run_gvn(func: Function, manager: 'PassManager') -> Change:
+    removed = number_values(func, manager.get('domtree', func))
+    return Change.INSTRUCTIONS if removed else Change.NONE
+
+
+def run_simplifycfg(func: Function, manager: 'PassManager') -> Change:
+    result = simplify_function(func)
+    if result.blocks_removed or result.branches_folded or result.threaded:
+        return Change.ALL
+    return Change.INSTRUCTIONS if result.instructions_removed else Change.NONE
+
+
+def run_licm(func: Function, manager: 'PassManager') -> Change:
+    created, hoisted, sunk = hoist_invariants(func, manager.get('loops', func))
+    if created:
+        return Change.ALL
+    return Change.INSTRUCTIONS if hoisted or sunk else Change.NONE
+
+
+def run_indvars(func: Function, manager: 'PassManager') -> Change:
+    created, reduced, replaced, removed = simplify_induction_variables(func, manager.get('loops', func))
+    if created:
+        return Change.ALL
+    return Change.INSTRUCTIONS if reduced or replaced else Change.NONE
+
+
+def run_unroll(func: Function, manager: 'PassManager') -> Change:
+    budget = manager.options.get('unroll-budget', UNROLL_BUDGET)
+    created, unrolled = unroll_loops(func, manager.get('loops', func), budget)
+    for loop in unrolled:
+        manager.remark('unroll', str(loop))
+    return Change.ALL if created or unrolled else Change.NONE
+
+
+def run_vectorize(func: Function, manager: 'PassManager') -> Change:
+    created, vectorized = vectorize_loops(func, manager.get('loops', func))
+    for loop in vectorized:
+        manager.remark('vectorize', str(loop))
+    return Change.ALL if created or vectorized else Change.NONE
+
+
+def run_tailrec(func: Function, manager: 'PassManager') -> Change:
+    eliminated, accumulated = eliminate_tail_recursion(func)
+    if eliminated:
+        manager.remark('tailrec', f"{func.name}: {eliminated} tail call(s) turned into a loop"
+                                  + (f", {accumulated} with accumulator" if accumulated else ""))
+    return Change.ALL if eliminated else Change.NONE
+
+
+def run_inline(module: Module, manager: 'PassManager') -> Change:
+    threshold = manager.options.get('inline-threshold', INLINE_THRESHOLD)
+    inliner = inline_calls(module, threshold)
+    for call in inliner.inlined:
+        manager.remark('inline', str(call))
+    if inliner.removed:
+        manager.remark('inline', f"removed {len(inliner.removed)} function(s): {', '.join(inliner.removed)}")
+    return Change.ALL if inliner.inlined else Change.NONE
+
+
+# Transformações: nome -> (execução, escopo 'function' ou 'module')
+TransformFunc = Callable[[Union[Function, Module], 'PassManager'], Change]
+TRANSFORMS: Dict[str, Tuple[TransformFunc, str]] = {
+    'mem2reg': (run_mem2reg, 'function'),
+    'sccp': (run_sccp, 'function'),
+    'gvn': (run_gvn, 'function'),
+    'simplifycfg': (run_simplifycfg, 'function'),
+    'licm': (run_licm, 'function'),
+    'indvars': (run_indvars, 'function'),
+    'unroll': (run_unroll, 'function'),
+    'vectorize': (run_vectorize, 'function'),
+    'tailrec': (run_tailrec, 'function'),
+    'inline': (run_inline, 'module'),
+}
+
+DEFAULT_PIPELINE = 'mem2reg,inline,tailrec,sccp,gvn,licm,simplifycfg'
+
+
+def count_instructions(func: Function) -> int:
+    return sum(len(block.instructions) for block in func.blocks)
+
+
+class PassManager:
+    """Executa um pipeline de passos sobre um Module
+
+    Cada passo percorre todas as funções antes do próximo começar. Análises
+    são calculadas sob demanda com get e ficam em cache por função até um
+    passo relatar uma alteração que as invalide. Passos de módulo que
+    alteram algo descartam o cache inteiro. Nomes de análise também podem
+    aparecer no pipeline (calculadas para todas as funções). options guarda
+    parâmetros dos passos ('unroll-budget'...) e remarks o que cada passo
+    quis relatar.
+    """
+
+    def __init__(self, pipeline: Union[str, List[str]] = DEFAULT_PIPELINE,
+                 options: Optional[Dict[str, Any]] = None):
+        self.analyses: Dict[str, Tuple[AnalysisFunc, Change]] = dict(ANALYSES)
+        self.transforms: Dict[str, Tuple[TransformFunc, str]] = dict(TRANSFORMS)
+        self.pipeline = self.parse(pipeline)
+        self.options: Dict[str, Any] = dict(options or {})
+        self.cache: Dict[Function, Dict[str, Any]] = {}
+        self.stats: Dict[str, PassStats] = {}
+        self.remarks: List[Tuple[str, str]] = []
+        self._nested = 0.0      # Tempo de análises dentro da medição atual
+
+    def register_analysis(self, name: str, compute: AnalysisFunc, invalidated_by: Change = Change.ALL):
+        self.analyses[name] = (compute, invalidated_by)
+
+    def register_pass(self, name: str, run: TransformFunc, scope: str = 'function'):
+        if scope not in ('function', 'module'):
+            raise ValueError(f"Invalid pass scope: {scope}")
+        self.transforms[name] = (run, scope)
+
+    def parse(self, pipeline: Union[str, List[str]]) -> List[str]:
+        """'mem2reg,domtree' -> ['mem2reg', 'domtree']; nomes desconhecidos são erro"""
+        if isinstance(pipeline, str):
+            pipeline = [name.strip() for name in pipeline.split(',') if name.strip()]
+        for name in pipeline:
+            if name not in self.transforms and name not in self.analyses:
+                raise ValueError(f"Unknown pass: {name} "
+                                 f"(available: {', '.join(self.available())})")
+        return list(pipeline)
+
+    def available(self) -> List[str]:
+        return list(self.transforms) + list(self.analyses)
+
+    def add(self, name: str):
+        self.pipeline.extend(self.parse([name]))
+
+    def _stats(self, name: str, kind: str) -> PassStats:
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = PassStats(name, kind)
+        return stats
+
+    def get(self, name: str, func: Function) -> Any:
+        """Resultado da análise name para func, do cache ou calculado agora"""
+        cache = self.cache.setdefault(func, {})
+        stats = self._stats(name, 'analysis')
+        if name in cache:
+            stats.hits += 1
+            return cache[name]
+        compute, _ = self.analyses[name]
+        outer = self._nested
+        self._nested = 0.0
+        start = time.perf_counter()
+        result = compute(func, self)
+        elapsed = time.perf_counter() - start
+        stats.runs += 1
+        stats.seconds += elapsed - self._nested
+        self._nested = outer + elapsed
+        cache[name] = result
+        return result
+
+    def invalidate(self, func: Function, change: Change):
+        """Descarta as análises de func que dependem de change"""
+        if not change:
+            return
+        cache = self.cache.get(func)
+        if not cache:
+            return
+        for name in list(cache):
+            if self.analyses[name][1] & change:
+                del cache[name]
+
+    def run(self, module: Module) -> Change:
+        """Executa o pipeline; devolve a união das alterações"""
+        total = Change.NONE
+        for name in self.pipeline:
+            if name in self.analyses:
+                for func in self.functions(module):
+                    self.get(name, func)
+                continue
+            run, scope = self.transforms[name]
+            stats = self._stats(name, 'transform')
+            if scope == 'module':
+                functions = self.functions(module)
+                before = sum(count_instructions(func) for func in functions)
+                change = self._measure(stats, run, module)
+                if change:
+                    self.cache.clear()
+                stats.instructions_before += before
+                stats.instructions_after += sum(count_instructions(func) for func in self.functions(module))
+                total |= change
+                continue
+            for func in self.functions(module):
+                before = count_instructions(func)
+                change = self._measure(stats, run, func)
+                self.invalidate(func, change)
+                stats.instructions_before += before
+                stats.instructions_after += count_instructions(func)
+                total |= change
+        return total
+
+    def _measure(self, stats: PassStats, run: TransformFunc, target: Union[Function, Module]) -> Change:
+        self._nested = 0.0
+        start = time.perf_counter()
+        change = run(target, self)
+        elapsed = time.perf_counter() - start
+        stats.runs += 1
+        stats.seconds += elapsed - self._nested
+        self._nested = 0.0
+        if change:
+            stats.changed += 1
+        return change
+
+    def remark(self, name: str, message: str):
+        self.remarks.append((name, message))
+
+    def functions(self, module: Module) -> List[Function]:
+        return [func for func in module.functions if not func.is_external and func.blocks]
+
+    def report(self) -> str:
+        """Tabela de tempo e instruções por passo, na ordem de execução"""
+        total = sum(stats.seconds for stats in self.stats.values()) or 1e-12
+        lines = [f"=== Pass timing: {total * 1000:.2f} ms ===",
+                 f"{'pass':<12} {'kind':<9} {'runs':>5} {'changed':>7} {'hits':>5} "
+                 f"{'time ms':>9} {'%':>6}  instructions"]
+        for stats in self.stats.values():
+            if stats.kind == 'transform':
+                delta = stats.instructions_after - stats.instructions_before
+                instructions = f"{stats.instructions_before} -> {stats.instructions_after} ({delta:+d})"
+                changed = str(stats.changed)
+                hits = '-'
+            else:
+                instructions = ''
+                changed = '-'
+                hits = str(stats.hits)
+            lines.append(f"{stats.name:<12} {stats.kind:<9} {stats.runs:>5} {changed:>7} {hits:>5} "
+                         f"{stats.seconds * 1000:>9.2f} {100 * stats.seconds / total:>5.1f}%  "
+                         f"{instructions}".rstrip())
+        return "\n".join(lines)
+
+    def remarks_report(self) -> str:
+        """O que os passos relataram (laços desenrolados...), por passo"""
+        lines = [f"=== Pass statistics: {len(self.remarks)} remarks ==="]
+        lines.extend(f"{name:<12} {message}" for name, message in self.remarks)
+        return "\n".join(lines)
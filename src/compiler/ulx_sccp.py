@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+ULX SCCP - Propagação de constantes condicional e esparsa
+Wegman–Zadeck sobre a ULX-IR em SSA: dobra valores constantes, troca
+desvios com condição constante por saltos e remove blocos nunca executados
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from ulx_ir import Module, Function, BasicBlock, Instruction, Value, Constant, Type, TypeKind, Opcode, ICmpPredicate
+from ulx_analysis import live_instructions, remove_incoming
+from ulx_mem2reg import simplify_phis
+
+
+# Reticulado: ausente = indefinido (topo), int = constante, OVERDEFINED = base
+OVERDEFINED = object()
+
+INTEGER_BITS = {TypeKind.I8: 8, TypeKind.I16: 16, TypeKind.I32: 32, TypeKind.I64: 64}
+
+def wrap(value: int, type: Type) -> int:
+    """value truncado para a largura de type, com sinal (complemento de 2)"""
+    bits = INTEGER_BITS[type.kind]
+    value &= (1 << bits) - 1
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+
+def sdiv(a: int, b: int) -> int:
+    """Divisão com truncamento em direção a zero (como em C)"""
+    quotient = abs(a) // abs(b)
+    return quotient if (a < 0) == (b < 0) else -quotient
+
+
+def fold_binary(opcode: Opcode, a: int, b: int) -> Optional[int]:
+    """Resultado de a op b sem truncar, ou None se não for dobrável"""
+    if opcode is Opcode.ADD:
+        return a + b
+    if opcode is Opcode.SUB:
+        return a - b
+    if opcode is Opcode.MUL:
+        return a * b
+    if opcode is Opcode.SDIV:
+        return sdiv(a, b) if b != 0 else None
+    if opcode is Opcode.SREM:
+        return a - sdiv(a, b) * b if b != 0 else None
+    if opcode is Opcode.AND:
+        return a & b
+    if opcode is Opcode.OR:
+        return a | b
+    if opcode is Opcode.XOR:
+        return a ^ b
+    return None
+
+
+def fold_icmp(predicate: ICmpPredicate, a: int, b: int, bits: int) -> int:
+    if predicate is ICmpPredicate.EQ:
+        return int(a == b)
+    if predicate is ICmpPredicate.NE:
+        return int(a != b)
+    if predicate is ICmpPredicate.SLT:
+        return int(a < b)
+    if predicate is ICmpPredicate.SLE:
+        return int(a <= b)
+    if predicate is ICmpPredicate.SGT:
+        return int(a > b)
+    if predicate is ICmpPredicate.SGE:
+        return int(a >= b)
+    # Sem sinal: compara os padrões de bits
+    mask = (1 << bits) - 1
+    a &= mask
+    b &= mask
+    if predicate is ICmpPredicate.ULT:
+        return int(a < b)
+    if predicate is ICmpPredicate.ULE:
+        return int(a <= b)
+    if predicate is ICmpPredicate.UGT:
+        return int(a > b)
+    return int(a >= b)
+
+
+FOLDABLE = frozenset([Opcode.ADD, Opcode.SUB, Opcode.MUL, Opcode.SDIV, Opcode.SREM,
+                      Opcode.AND, Opcode.OR, Opcode.XOR])
+
+
+class SCCP:
+    """Estado da propagação numa função
+
+    Duas listas de trabalho: arestas do CFG que viraram executáveis e
+    valores SSA cujo estado desceu no reticulado. Um bloco é avaliado
+    inteiro na primeira aresta executável; nas seguintes, só os PHIs.
+    """
+
+    def __init__(self, func: Function):
+        self.function = func
+        self.state: Dict[Value, object] = {}
+        self.executable: Set[BasicBlock] = set()
+        self.edges: Set[Tuple[BasicBlock, BasicBlock]] = set()
+        self.users: Dict[Value, List[Tuple[Instruction, BasicBlock]]] = {}
+        self.flow: List[Tuple[Optional[BasicBlock], BasicBlock]] = []
+        self.ssa: List[Value] = []
+
+    def solve(self):
+        func = self.function
+        for param in func.params:
+            self.state[param] = OVERDEFINED
+        for block in func.blocks:
+            for inst in live_instructions(block):
+                for op in inst.operands:
+                    if isinstance(op, Value) and not isinstance(op, Constant):
+                        self.users.setdefault(op, []).append((inst, block))
+
+        self.flow.append((None, func.blocks[0]))
+        while self.flow or self.ssa:
+            while self.flow:
+                source, block = self.flow.pop()
+                if source is not None:
+                    if (source, block) in self.edges:
+                        continue
+                    self.edges.add((source, block))
+                if block in self.executable:
+                    for inst in block.instructions:
+                        if inst.opcode is not Opcode.PHI:
+                            break
+                        self.visit(inst, block)
+                    continue
+                self.executable.add(block)
+                for inst in live_instructions(block):
+                    self.visit(inst, block)
+            while self.ssa:
+                value = self.ssa.pop()
+                for inst, block in self.users.get(value, ()):
+                    if block in self.executable:
+                        self.visit(inst, block)
+
+    def value_of(self, operand: Value) -> object:
+        if isinstance(operand, Constant):
+            if isinstance(operand.value, int) and operand.type.kind in INTEGER_BITS:
+                return operand.value
+            return OVERDEFINED
+        return self.state.get(operand)
+
+    def update(self, result: Value, new: object):
+        """Desce result no reticulado (topo -> constante -> base)"""
+        if new is None:
+            return
+        old = self.state.get(result)
+        if old is OVERDEFINED or old == new:
+            return
+        if old is not None:
+            new = OVERDEFINED
+        self.state[result] = new
+        self.ssa.append(result)
+
+    def visit(self, inst: Instruction, block: BasicBlock):
+        opcode = inst.opcode
+        operands = inst.operands
+        if opcode is Opcode.PHI:
+            merged = None
+            for k in range(0, len(operands), 2):
+                if (operands[k + 1], block) not in self.edges:
+                    continue
+                value = self.value_of(operands[k])
+                if value is None:
+                    continue
+                if value is OVERDEFINED or merged is not None and merged != value:
+                    merged = OVERDEFINED
+                    break
+                merged = value
+            self.update(inst.result, merged)
+        elif opcode in FOLDABLE or opcode is Opcode.ICMP:
+            if inst.result.type.kind not in INTEGER_BITS:
+                self.update(inst.result, OVERDEFINED)
+                return
+            a = self.value_of(operands[0])
+            b = self.value_of(operands[1])
+            if a is OVERDEFINED or b is OVERDEFINED:
+                self.update(inst.result, OVERDEFINED)
+            elif a is None or b is None:
+                return
+            elif opcode is Opcode.ICMP:
+                bits = INTEGER_BITS.get(operands[0].type.kind, 64)
+                self.update(inst.result, fold_icmp(inst.predicate, a, b, bits))
+            else:
+                folded = fold_binary(opcode, a, b)
+                if folded is None:
+                    self.update(inst.result, OVERDEFINED)
+                    return
+                wrapped = wrap(folded, inst.result.type)
+                if wrapped != folded and opcode in (Opcode.SDIV, Opcode.SREM):
+                    # MIN / -1 estoura (idiv gera exceção): fica para a execução
+                    self.update(inst.result, OVERDEFINED)
+                    return
+                self.update(inst.result, wrapped)
+        elif opcode is Opcode.BR:
+            self.flow.append((block, operands[0]))
+        elif opcode is Opcode.COND_BR:
+            condition = self.value_of(operands[0])
+            if condition is OVERDEFINED:
+                self.flow.append((block, operands[1]))
+                self.flow.append((block, operands[2]))
+            elif condition is not None:
+                self.flow.append((block, operands[1] if condition else operands[2]))
+        elif inst.result is not None:
+            self.update(inst.result, OVERDEFINED)
+
+    def rewrite(self) -> Tuple[int, int, int]:
+        """Aplica o resultado; devolve (instruções dobradas, desvios
+        resolvidos, blocos removidos)"""
+        func = self.function
+        constants: Dict[Value, Constant] = {}
+        for value, state in self.state.items():
+            if state is not OVERDEFINED and state is not None and value not in func.params:
+                constants[value] = Constant(value.type, state)
+
+        folded = 0
+        for block in func.blocks:
+            if block not in self.executable:
+                continue
+            kept = []
+            for inst in block.instructions:
+                if inst.result is not None and inst.result in constants:
+                    folded += 1
+                    continue
+                if constants:
+                    inst.operands = [constants.get(op, op) if isinstance(op, Value) else op
+                                     for op in inst.operands]
+                kept.append(inst)
+            block.instructions = kept
+
+        # Desvios com condição constante viram saltos
+        branches = 0
+        for block in func.blocks:
+            if block not in self.executable:
+                continue
+            for inst in live_instructions(block):
+                if inst.opcode is Opcode.COND_BR and isinstance(inst.operands[0], Constant):
+                    if inst.operands[0].value:
+                        taken, dropped = inst.operands[1], inst.operands[2]
+                    else:
+                        taken, dropped = inst.operands[2], inst.operands[1]
+                    inst.opcode = Opcode.BR
+                    inst.operands = [taken]
+                    branches += 1
+                    block.successors.remove(dropped)
+                    remove_incoming(dropped, block)
+
+        removed = [block for block in func.blocks if block not in self.executable]
+        dead = set(removed)
+        for block in removed:
+            for succ in block.successors:
+                if succ not in dead:
+                    for _ in range(succ.predecessors.count(block)):
+                        remove_incoming(succ, block)
+        if removed:
+            func.blocks = [block for block in func.blocks if block not in dead]
+
+        phis = [inst for block in func.blocks for inst in block.instructions if inst.opcode is Opcode.PHI]
+        if phis and (folded or branches or removed):
+            simplify_phis(func, phis)
+        return folded, branches, len(removed)
+
+
+def propagate_constants(func: Function) -> Tuple[int, int, int]:
+    """SCCP em func; devolve (instruções dobradas, desvios resolvidos,
+    blocos removidos)"""
+    if func.is_external or not func.blocks:
+        return 0, 0, 0
+    sccp = SCCP(func)
+    sccp.solve()
+    return sccp.rewrite()
+
+
+def sccp(module: Module) -> Tuple[int, int, int]:
+    """propagate_constants em todas as funções; devolve os totais"""
+    totals = (0, 0, 0)
+    for func in module.functions:
+        totals = tuple(a + b for a, b in zip(totals, propagate_constants(func)))
+    return totals
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+ULX Scope - Tabela de símbolos com escopos léxicos
+Cada variável é resolvida para um slot inteiro do quadro da função
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ScopeTable:
+    """Escopos de função e de bloco com slots densos
+
+    declare dá à variável o primeiro slot livre do quadro; pop libera os
+    slots do escopo, então escopos disjuntos (ramos de um se, corpos de laços
+    irmãos) reaproveitam as mesmas posições. Os valores ficam numa lista
+    indexada pelo slot: depois de resolve, o acesso é por índice.
+
+    Declarações fora de qualquer função são globais e recebem slots
+    negativos (~índice na lista de globais).
+    """
+
+    def __init__(self):
+        self.bindings: Dict[str, int] = {}        # Nome -> slot visível
+        self.values: List[Any] = []               # Slot -> valor (tipo, ponteiro...)
+        self.globals: List[Any] = []              # ~slot -> valor das globais
+        # Por escopo: (primeiro slot, [(nome, slot sombreado ou None)])
+        self.scopes: List[Tuple[int, List[Tuple[str, Optional[int]]]]] = []
+        self.frame_size = 0                       # Máximo de slots vivos na função
+
+    def begin_function(self):
+        """Abre o escopo de uma função (parâmetros + corpo) com quadro vazio"""
+        self.frame_size = 0
+        self.push()
+
+    def push(self):
+        self.scopes.append((len(self.values), []))
+
+    def pop(self):
+        """Fecha o escopo atual: restaura nomes sombreados e libera slots"""
+        start, declared = self.scopes.pop()
+        bindings = self.bindings
+        for name, previous in reversed(declared):
+            if previous is None:
+                del bindings[name]
+            else:
+                bindings[name] = previous
+        del self.values[start:]
+
+    def declare(self, name: str, value: Any) -> int:
+        """Declara name no escopo atual e devolve o slot"""
+        if self.scopes:
+            slot = len(self.values)
+            self.values.append(value)
+            if slot >= self.frame_size:
+                self.frame_size = slot + 1
+            self.scopes[-1][1].append((name, self.bindings.get(name)))
+        else:
+            slot = ~len(self.globals)
+            self.globals.append(value)
+        self.bindings[name] = slot
+        return slot
+
+    def resolve(self, name: str) -> Optional[int]:
+        """Slot visível de name, ou None"""
+        return self.bindings.get(name)
+
+    def value(self, slot: int) -> Any:
+        return self.values[slot] if slot >= 0 else self.globals[~slot]
+
+    def lookup(self, name: str, default: Any = None) -> Any:
+        """Valor de name, ou default se não estiver declarado"""
+        slot = self.bindings.get(name)
+        if slot is None:
+            return default
+        return self.values[slot] if slot >= 0 else self.globals[~slot]
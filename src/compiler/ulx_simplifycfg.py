@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+ULX SimplifyCFG - Limpeza do grafo de controle da ULX-IR
+Remove código morto e blocos inalcançáveis, encadeia saltos através de
+blocos vazios e funde blocos em sequência, mantendo predecessors/successors
+"""
+
+from typing import Dict, List, Set
+
+from ulx_ir import Module, Function, BasicBlock, Instruction, Value, Constant, Opcode
+from ulx_analysis import reverse_postorder, retarget, remove_incoming, TERMINATORS
+from ulx_gvn import PURE
+from ulx_mem2reg import simplify_phis
+
+
+# Sem efeitos: removíveis quando o resultado não é usado
+REMOVABLE = PURE | {Opcode.PHI, Opcode.LOAD, Opcode.ALLOCA}
+
+
+def incoming_value(phi: Instruction, pred: BasicBlock) -> Value:
+    operands = phi.operands
+    for k in range(1, len(operands), 2):
+        if operands[k] is pred:
+            return operands[k - 1]
+    raise KeyError(pred.name)
+
+
+def phis(block: BasicBlock) -> List[Instruction]:
+    result = []
+    for inst in block.instructions:
+        if inst.opcode is not Opcode.PHI:
+            break
+        result.append(inst)
+    return result
+
+
+class CFGSimplifier:
+    """Aplica as simplificações de uma função até nada mais mudar"""
+
+    def __init__(self, func: Function):
+        self.function = func
+        self.replace: Dict[Value, Value] = {}
+        self.blocks_removed = 0
+        self.instructions_removed = 0
+        self.branches_folded = 0
+        self.threaded = 0
+        self.merged = 0
+
+    def run(self) -> bool:
+        func = self.function
+        before = (len(func.blocks), sum(len(block.instructions) for block in func.blocks))
+        self.truncate()
+        changed = True
+        while changed:
+            changed = self.fold_branches()
+            changed |= self.remove_unreachable()
+            changed |= self.thread_jumps()
+            changed |= self.remove_unreachable()
+            changed |= self.merge_blocks()
+            changed |= self.remove_dead_code()
+        after = (len(func.blocks), sum(len(block.instructions) for block in func.blocks))
+        self.blocks_removed = before[0] - after[0]
+        self.instructions_removed = before[1] - after[1]
+        return before != after or bool(self.branches_folded or self.threaded)
+
+    def truncate(self):
+        """Descarta instruções depois do primeiro terminador de cada bloco"""
+        for block in self.function.blocks:
+            for index, inst in enumerate(block.instructions):
+                if inst.opcode in TERMINATORS:
+                    del block.instructions[index + 1:]
+                    break
+
+    def fold_branches(self) -> bool:
+        """COND_BR com condição constante ou dois alvos iguais vira BR"""
+        changed = False
+        for block in self.function.blocks:
+            if not block.instructions:
+                continue
+            inst = block.instructions[-1]
+            if inst.opcode is not Opcode.COND_BR:
+                continue
+            condition, true_block, false_block = inst.operands
+            if true_block is false_block:
+                # As duas entradas dos PHIs precisam concordar
+                values_agree = all(
+                    len({id(phi.operands[k - 1]) for k in range(1, len(phi.operands), 2)
+                         if phi.operands[k] is block}) == 1
+                    for phi in phis(true_block))
+                if not values_agree:
+                    continue
+                taken = dropped = true_block
+            elif isinstance(condition, Constant) and isinstance(condition.value, int):
+                taken, dropped = (true_block, false_block) if condition.value else (false_block, true_block)
+            else:
+                continue
+            inst.opcode = Opcode.BR
+            inst.operands = [taken]
+            block.successors.remove(dropped)
+            remove_incoming(dropped, block)
+            self.branches_folded += 1
+            changed = True
+        return changed
+
+    def remove_unreachable(self) -> bool:
+        func = self.function
+        reachable = set(reverse_postorder(func))
+        if len(reachable) == len(func.blocks):
+            return False
+        for block in func.blocks:
+            if block in reachable:
+                continue
+            for succ in block.successors:
+                if succ in reachable:
+                    for _ in range(succ.predecessors.count(block)):
+                        remove_incoming(succ, block)
+        func.blocks = [block for block in func.blocks if block in reachable]
+        return True
+
+    def thread_jumps(self) -> bool:
+        """Predecessores de um bloco que só tem 'br C' saltam direto para C"""
+        changed = False
+        entry = self.function.blocks[0]
+        for block in self.function.blocks:
+            if block is entry or len(block.instructions) != 1:
+                continue
+            jump = block.instructions[0]
+            if jump.opcode is not Opcode.BR:
+                continue
+            target = jump.operands[0]
+            if target is block:
+                continue
+            target_phis = phis(target)
+            for pred in list(dict.fromkeys(block.predecessors)):
+                if pred is block:
+                    continue
+                values = [incoming_value(phi, block) for phi in target_phis]
+                if pred in target.predecessors and any(
+                        incoming_value(phi, pred) is not value for phi, value in zip(target_phis, values)):
+                    continue    # Os PHIs de target não distinguiriam as duas arestas
+                count = block.predecessors.count(pred)
+                retarget(pred, block, target)
+                block.predecessors = [p for p in block.predecessors if p is not pred]
+                for _ in range(count):
+                    target.predecessors.append(pred)
+                    for phi, value in zip(target_phis, values):
+                        phi.operands.extend((value, pred))
+                self.threaded += 1
+                changed = True
+        return changed
+
+    def merge_blocks(self) -> bool:
+        """Funde B no predecessor P quando P só salta para B e B só vem de P"""
+        func = self.function
+        removed: Set[BasicBlock] = set()
+        entry = func.blocks[0]
+        for pred in func.blocks:
+            if pred in removed:
+                continue
+            while True:
+                if len(pred.successors) != 1 or not pred.instructions \
+                        or pred.instructions[-1].opcode is not Opcode.BR:
+                    break
+                block = pred.successors[0]
+                if block is pred or block is entry or len(block.predecessors) != 1:
+                    break
+                for phi in phis(block):
+                    self.replace[phi.result] = phi.operands[0]
+                pred.instructions.pop()
+                pred.instructions.extend(inst for inst in block.instructions if inst.opcode is not Opcode.PHI)
+                pred.successors = block.successors
+                for succ in block.successors:
+                    succ.predecessors = [pred if p is block else p for p in succ.predecessors]
+                    for phi in phis(succ):
+                        phi.operands = [pred if op is block else op for op in phi.operands]
+                removed.add(block)
+                self.merged += 1
+        if not removed:
+            return False
+        func.blocks = [block for block in func.blocks if block not in removed]
+        self.apply_replacements()
+        return True
+
+    def apply_replacements(self):
+        replace = self.replace
+        if not replace:
+            return
+
+        def resolve(value):
+            while value in replace:
+                value = replace[value]
+            return value
+        for block in self.function.blocks:
+            for inst in block.instructions:
+                inst.operands = [resolve(op) if isinstance(op, Value) else op for op in inst.operands]
+        replace.clear()
+
+    def remove_dead_code(self) -> bool:
+        """Remove instruções sem efeito cujo resultado ninguém usa"""
+        func = self.function
+        uses: Dict[Value, int] = {}
+        definitions: Dict[Value, Instruction] = {}
+        for block in func.blocks:
+            for inst in block.instructions:
+                for op in inst.operands:
+                    if isinstance(op, Value):
+                        uses[op] = uses.get(op, 0) + 1
+                if inst.result is not None:
+                    definitions[inst.result] = inst
+        dead: Set[Instruction] = set()
+        worklist = [inst for inst in definitions.values()
+                    if inst.opcode in REMOVABLE and not uses.get(inst.result)]
+        while worklist:
+            inst = worklist.pop()
+            if inst in dead:
+                continue
+            dead.add(inst)
+            for op in inst.operands:
+                if not isinstance(op, Value) or op not in uses:
+                    continue
+                uses[op] -= 1
+                definition = definitions.get(op)
+                if not uses[op] and definition is not None and definition.opcode in REMOVABLE:
+                    worklist.append(definition)
+        # Ciclos de PHIs mortos (laços que só alimentam a si mesmos)
+        live_phis = [inst for block in func.blocks for inst in phis(block) if inst not in dead]
+        if dead:
+            for block in func.blocks:
+                block.instructions = [inst for inst in block.instructions if inst not in dead]
+            for inst in dead:
+                if inst.opcode is Opcode.ALLOCA:
+                    func.frame.pop(inst.result.name, None)
+            func.frame_size = max(func.frame.values()) + 1 if func.frame else 0
+        if live_phis:
+            before = sum(len(block.instructions) for block in func.blocks)
+            simplify_phis(func, live_phis)
+            if sum(len(block.instructions) for block in func.blocks) != before:
+                return True
+        return bool(dead)
+
+
+def simplify_function(func: Function) -> CFGSimplifier:
+    """Simplifica func; o resultado traz os contadores do que mudou"""
+    simplifier = CFGSimplifier(func)
+    if not func.is_external and func.blocks:
+        simplifier.run()
+    return simplifier
+
+
+def simplify_cfg(module: Module) -> int:
+    """simplify_function em todas as funções; devolve os blocos removidos"""
+    return sum(simplify_function(func).blocks_removed for func in module.functions)
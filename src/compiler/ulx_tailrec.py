@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+ULX TailRec - Eliminação de recursão de cauda
+Troca chamadas da função a si mesma em posição de cauda por um desvio
+para o início, com phis para os parâmetros; 'retorne n * f(n - 1)' ganha
+um acumulador, já que a multiplicação (ou soma) pode ser feita antes
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from ulx_ir import Module, Function, BasicBlock, Instruction, Value, Constant, Opcode
+from ulx_analysis import live_instructions, remove_incoming
+from ulx_sccp import INTEGER_BITS
+
+
+# Operações associativas e comutativas -> elemento neutro
+ACCUMULATORS = {Opcode.ADD: 0, Opcode.MUL: 1}
+
+
+class TailSite:
+    """Chamada de cauda: call [op acc] ret no fim de block"""
+
+    __slots__ = ('block', 'call', 'operation', 'operand')
+
+    def __init__(self, block: BasicBlock, call: Instruction,
+                 operation: Optional[Opcode] = None, operand: Optional[Value] = None):
+        self.block = block
+        self.call = call
+        self.operation = operation      # Opcode do acumulador, None se for cauda pura
+        self.operand = operand          # O outro operando de operation
+
+
+def find_tail_site(func: Function, block: BasicBlock) -> Optional[TailSite]:
+    """Reconhece 'call f; ret', '%r = call f; ret %r' e
+    '%r = call f; %m = op x, %r; ret %m' no fim de block"""
+    instructions = list(live_instructions(block))
+    if not instructions or instructions[-1].opcode is not Opcode.RET:
+        return None
+    ret = instructions[-1]
+    returned = ret.operands[0] if ret.operands else None
+    if len(instructions) >= 2 and instructions[-2].opcode is Opcode.CALL:
+        call = instructions[-2]
+        if call.operands[0] is func and (returned is None or returned is call.result):
+            return TailSite(block, call)
+    if len(instructions) < 3 or returned is None:
+        return None
+    call, combine = instructions[-3], instructions[-2]
+    if call.opcode is not Opcode.CALL or call.operands[0] is not func or call.result is None \
+            or combine.opcode not in ACCUMULATORS or combine.result is not returned \
+            or combine.result.type.kind not in INTEGER_BITS:
+        return None
+    first, second = combine.operands
+    if second is call.result and first is not call.result:
+        return TailSite(block, call, combine.opcode, first)
+    if first is call.result and second is not call.result:
+        return TailSite(block, call, combine.opcode, second)
+    return None
+
+
+def drop_dead_code(func: Function):
+    """Descarta o que vem depois do primeiro terminador de cada bloco (antes
+    do simplifycfg, 'retorne' no meio de um laço deixa 'ret; ...; br') e as
+    arestas que só o desvio morto criava"""
+    for block in func.blocks:
+        live = list(live_instructions(block))
+        if len(live) == len(block.instructions):
+            continue
+        del block.instructions[len(live):]
+        targets = [op for op in live[-1].operands if isinstance(op, BasicBlock)] if live else []
+        for succ in block.successors:
+            if succ not in targets and block in succ.predecessors:
+                remove_incoming(succ, block)
+        block.successors = [succ for succ in block.successors if succ in targets]
+
+
+def can_eliminate(func: Function) -> bool:
+    """Sem allocas (o quadro seria reaproveitado entre as iterações) e com
+    os parâmetros usados como valores, isto é, depois do mem2reg"""
+    if func.is_external or not func.blocks or func.blocks[0].predecessors:
+        return False
+    params = set(func.params)
+    for block in func.blocks:
+        for inst in block.instructions:
+            if inst.opcode is Opcode.ALLOCA:
+                return False
+            if inst.opcode in (Opcode.LOAD, Opcode.STORE) and inst.operands[-1] in params:
+                return False
+    return True
+
+
+def eliminate_tail_recursion(func: Function) -> Tuple[int, int]:
+    """Transforma a recursão de cauda de func em laço; devolve (chamadas
+    eliminadas, chamadas que precisaram de acumulador)"""
+    if not can_eliminate(func):
+        return 0, 0
+    sites = [site for site in (find_tail_site(func, block) for block in func.blocks) if site is not None]
+    sites = [site for site in sites if len(site.call.operands) - 1 == len(func.params)]
+    operations = {site.operation for site in sites if site.operation is not None}
+    if len(operations) > 1:
+        # Acumuladores diferentes não se combinam: só as caudas puras
+        sites = [site for site in sites if site.operation is None]
+        operations = set()
+    if not sites:
+        return 0, 0
+    # Os retornos reescritos abaixo são o último elemento de cada bloco
+    drop_dead_code(func)
+
+    names = {param.name for param in func.params}
+    names.update(inst.result.name for block in func.blocks for inst in block.instructions
+                 if inst.result is not None)
+    block_names = {block.name for block in func.blocks}
+
+    def new_name(base: str, used: Set[str]) -> str:
+        name, suffix = f"{base}.tr", 1
+        while name in used:
+            name = f"{base}.tr{suffix}"
+            suffix += 1
+        used.add(name)
+        return name
+
+    # Nova entrada vazia; a antiga vira o cabeçalho do laço
+    header = func.blocks[0]
+    entry = BasicBlock(header.name)
+    header.name, suffix = 'tailrec', 1
+    while header.name in block_names:
+        header.name = f"tailrec{suffix}"
+        suffix += 1
+    entry.instructions = [Instruction(Opcode.BR, None, [header])]
+    entry.successors = [header]
+    header.predecessors = [entry]
+    func.blocks.insert(0, entry)
+
+    replace: Dict[Value, Value] = {}
+    phis: List[Instruction] = []
+    for param in func.params:
+        value = Value(new_name(param.name, names), param.type)
+        replace[param] = value
+        phis.append(Instruction(Opcode.PHI, value, [param, entry]))
+    for block in func.blocks:
+        for inst in block.instructions:
+            inst.operands = [replace.get(op, op) if isinstance(op, Value) else op for op in inst.operands]
+
+    accumulator = None
+    if operations:
+        operation = operations.pop()
+        type = func.return_type
+        accumulator = Value(new_name('%acc', names), type)
+        phis.append(Instruction(Opcode.PHI, accumulator, [Constant(type, ACCUMULATORS[operation]), entry]))
+        # Os demais retornos combinam o valor com o acumulado
+        site_blocks = {site.block for site in sites}
+        for block in func.blocks:
+            ret = block.instructions[-1] if block.instructions else None
+            if block in site_blocks or ret is None or ret.opcode is not Opcode.RET or not ret.operands:
+                continue
+            result = Value(new_name('%acc.ret', names), type)
+            block.instructions.insert(-1, Instruction(operation, result, [accumulator, ret.operands[0]]))
+            ret.operands = [result]
+
+    for site in sites:
+        block = site.block
+        args = site.call.operands[1:]
+        del block.instructions[block.instructions.index(site.call):]
+        for phi, arg in zip(phis, args):
+            phi.operands.extend((arg, block))
+        if accumulator is not None:
+            value = accumulator
+            if site.operation is not None:
+                value = Value(new_name('%acc.next', names), accumulator.type)
+                operand = replace.get(site.operand, site.operand)
+                block.instructions.append(Instruction(site.operation, value, [accumulator, operand]))
+            phis[-1].operands.extend((value, block))
+        block.instructions.append(Instruction(Opcode.BR, None, [header]))
+        block.successors = [header]
+        header.predecessors.append(block)
+    header.instructions[0:0] = phis
+    accumulated = sum(1 for site in sites if site.operation is not None)
+    return len(sites), accumulated
+
+
+def tailrec(module: Module) -> Tuple[int, int]:
+    """eliminate_tail_recursion em todas as funções; devolve os totais"""
+    totals = (0, 0)
+    for func in module.functions:
+        totals = tuple(a + b for a, b in zip(totals, eliminate_tail_recursion(func)))
+    return totals
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+ULX Unroll - Desenrolamento de laços com contagem de iterações
+Laços internos com teste de saída 'icmp iv, limite' no cabeçalho: os de
+contagem constante pequena são desenrolados por inteiro; os demais ganham
+uma cópia com o corpo repetido e o laço original fica para o resto
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from ulx_ir import Module, Function, BasicBlock, Instruction, Value, Constant, Opcode, ICmpPredicate
+from ulx_analysis import LoopForest, Loop, TERMINATORS, retarget
+from ulx_gvn import SWAPPED
+from ulx_indvars import InductionVariable, find_induction_variables, is_loop_invariant
+from ulx_sccp import INTEGER_BITS, fold_icmp, wrap
+
+
+UNROLL_BUDGET = 128     # Instruções que um laço pode ocupar depois de desenrolado
+MAX_FACTOR = 8
+
+# Predicado que vale quando o original é falso
+INVERSE = {
+    ICmpPredicate.EQ: ICmpPredicate.NE, ICmpPredicate.NE: ICmpPredicate.EQ,
+    ICmpPredicate.SLT: ICmpPredicate.SGE, ICmpPredicate.SGE: ICmpPredicate.SLT,
+    ICmpPredicate.SGT: ICmpPredicate.SLE, ICmpPredicate.SLE: ICmpPredicate.SGT,
+    ICmpPredicate.ULT: ICmpPredicate.UGE, ICmpPredicate.UGE: ICmpPredicate.ULT,
+    ICmpPredicate.UGT: ICmpPredicate.ULE, ICmpPredicate.ULE: ICmpPredicate.UGT,
+}
+
+ASCENDING = {ICmpPredicate.SLT, ICmpPredicate.SLE}
+DESCENDING = {ICmpPredicate.SGT, ICmpPredicate.SGE}
+
+
+class UnrolledLoop:
+    """O que foi feito com um laço, para relatórios"""
+
+    __slots__ = ('function', 'header', 'trip_count', 'factor', 'full')
+
+    def __init__(self, function: str, header: str, trip_count: str, factor: int, full: bool):
+        self.function = function
+        self.header = header
+        self.trip_count = trip_count    # Número ou expressão simbólica
+        self.factor = factor
+        self.full = full
+
+    def __str__(self):
+        how = "fully unrolled" if self.full else f"unrolled x{self.factor} + remainder loop"
+        return f"{self.function}: loop {self.header}, trip count {self.trip_count}, {how}"
+
+
+class LoopShape:
+    """Laço contado: cabeçalho -> corpo -> latch -> cabeçalho, saída só no cabeçalho"""
+
+    __slots__ = ('loop', 'iv', 'step', 'predicate', 'limit', 'exit', 'body', 'latch', 'size')
+
+    def __init__(self, loop: Loop, iv: InductionVariable, step: int, predicate: ICmpPredicate,
+                 limit: Value, exit: BasicBlock, body: BasicBlock, latch: BasicBlock, size: int):
+        self.loop = loop
+        self.iv = iv
+        self.step = step
+        self.predicate = predicate      # Condição para continuar, com iv à esquerda
+        self.limit = limit
+        self.exit = exit
+        self.body = body                # Sucessor do cabeçalho dentro do laço
+        self.latch = latch
+        self.size = size                # Instruções repetidas por iteração
+
+
+def operand_name(value: Value) -> str:
+    if isinstance(value, Constant):
+        return str(value.value)
+    return value.name
+
+
+def analyze_counted_loop(loop: Loop, definitions: Dict[Value, BasicBlock]) -> Optional[LoopShape]:
+    """Forma do laço contado, ou None; definitions mapeia cada valor ao
+    bloco que o define"""
+    header = loop.header
+    preheader = loop.preheader
+    if len(loop.latches) != 1 or len(header.predecessors) != 2 or preheader not in header.predecessors:
+        return None
+    latch = loop.latches[0]
+    size = 0
+    for block in loop.blocks:
+        instructions = block.instructions
+        if not instructions or any(inst.opcode in TERMINATORS for inst in instructions[:-1]) \
+                or instructions[-1].opcode not in TERMINATORS:
+            return None
+        if any(inst.opcode is Opcode.ALLOCA for inst in instructions):
+            return None
+        if block is not header and any(succ not in loop.blocks for succ in block.successors):
+            return None     # Só o cabeçalho sai do laço
+        size += sum(1 for inst in instructions if inst.opcode is not Opcode.PHI)
+
+    branch = header.instructions[-1]
+    if branch.opcode is not Opcode.COND_BR:
+        return None
+    condition, true_block, false_block = branch.operands
+    if (true_block in loop.blocks) == (false_block in loop.blocks):
+        return None
+    test = next((inst for inst in header.instructions if inst.result is condition), None)
+    if test is None or test.opcode is not Opcode.ICMP:
+        return None
+
+    ivs = find_induction_variables(loop, definitions)
+    left, right = test.operands
+    if left in ivs and is_loop_invariant(right, loop, definitions):
+        iv, limit, predicate = ivs[left], right, test.predicate
+    elif right in ivs and is_loop_invariant(left, loop, definitions):
+        iv, limit, predicate = ivs[right], left, SWAPPED[test.predicate]
+    else:
+        return None
+    step = iv.constant_step()
+    if not step:
+        return None
+    if true_block in loop.blocks:
+        body, exit = true_block, false_block
+    else:
+        body, exit, predicate = false_block, true_block, INVERSE[predicate]
+    return LoopShape(loop, iv, step, predicate, limit, exit, body, latch, size)
+
+
+class LoopUnroller:
+    """Desenrola os laços internos contados de uma função"""
+
+    def __init__(self, func: Function, forest: LoopForest, budget: int = UNROLL_BUDGET):
+        self.function = func
+        self.forest = forest
+        self.budget = budget
+        self.definitions: Dict[Value, BasicBlock] = {}
+        self.used_names: Set[str] = {param.name for param in func.params}
+        for block in func.blocks:
+            for inst in block.instructions:
+                if inst.result is not None:
+                    self.definitions[inst.result] = block
+                    self.used_names.add(inst.result.name)
+        self.block_names: Set[str] = {block.name for block in func.blocks}
+
+    def run(self) -> List[UnrolledLoop]:
+        results = []
+        for loop in self.forest.loops():
+            if loop.children or loop.preheader is None:
+                continue
+            shape = analyze_counted_loop(loop, self.definitions)
+            if shape is None:
+                continue
+            trips = self.trip_count(shape)
+            if trips is not None and trips * shape.size <= self.budget:
+                self.unroll_fully(shape, trips)
+                results.append(UnrolledLoop(self.function.name, loop.header.name, str(trips), trips, True))
+                continue
+            factor = MAX_FACTOR
+            while factor > 1 and (factor * shape.size > self.budget or trips is not None and trips < factor):
+                factor //= 2
+            if factor > 1 and self.unroll_partially(shape, factor):
+                results.append(UnrolledLoop(self.function.name, loop.header.name,
+                                            self.symbolic_trip_count(shape), factor, False))
+        return results
+
+    def trip_count(self, shape: LoopShape) -> Optional[int]:
+        """Iterações do corpo, se início e limite forem constantes e a conta
+        terminar dentro do orçamento"""
+        init, limit = shape.iv.init, shape.limit
+        if not isinstance(init, Constant) or not isinstance(limit, Constant) \
+                or not isinstance(init.value, int) or not isinstance(limit.value, int):
+            return None
+        type = shape.iv.phi.result.type
+        bits = INTEGER_BITS[type.kind]
+        value = wrap(init.value, type)
+        for trips in range(self.budget // max(shape.size, 1) + 1):
+            if not fold_icmp(shape.predicate, value, limit.value, bits):
+                return trips
+            value = wrap(value + shape.step, type)
+        return None
+
+    def symbolic_trip_count(self, shape: LoopShape) -> str:
+        """Contagem para relatórios: número, se der para calcular, ou expressão"""
+        init, limit, step = shape.iv.init, shape.limit, shape.step
+        inclusive = shape.predicate in (ICmpPredicate.SLE, ICmpPredicate.SGE)
+        if shape.predicate in DESCENDING:
+            init, limit, step = limit, init, -step
+        if all(isinstance(value, Constant) and isinstance(value.value, int) for value in (init, limit)):
+            distance = limit.value - init.value + (1 if inclusive else 0)
+            return str(max(0, -(-distance // step)))
+        extra = " + 1" if inclusive else ""
+        distance = f"{operand_name(limit)} - {operand_name(init)}{extra}"
+        return f"({distance})" if step == 1 else f"ceil(({distance}) / {step})"
+
+    # --- Cópias do corpo ---
+
+    def new_name(self, base: str, names: Set[str]) -> str:
+        name, suffix = base, 1
+        while name in names:
+            name = f"{base}{suffix}"
+            suffix += 1
+        names.add(name)
+        return name
+
+    def new_block(self, base: str) -> BasicBlock:
+        return BasicBlock(self.new_name(base, self.block_names))
+
+    def clone(self, inst: Instruction, values: Dict[Value, Value], blocks: Dict[BasicBlock, BasicBlock],
+              copy: int) -> Instruction:
+        operands = [blocks.get(op, op) if isinstance(op, BasicBlock) else values.get(op, op)
+                    for op in inst.operands]
+        result = None
+        if inst.result is not None:
+            result = Value(self.new_name(f"{inst.result.name}.u{copy}", self.used_names), inst.result.type)
+            values[inst.result] = result
+        return Instruction(inst.opcode, result, operands, inst.predicate)
+
+    def clone_iteration(self, shape: LoopShape, copy: int, entry: BasicBlock, next_header: BasicBlock,
+                        phi_values: Dict[Value, Value]) -> Tuple[BasicBlock, Dict[Value, Value]]:
+        """Uma iteração: entry recebe o cabeçalho sem PHIs nem teste e salta
+        para a cópia do corpo; o latch copiado salta para next_header.
+        Devolve (latch copiado, valores copiados)"""
+        loop = shape.loop
+        header = loop.header
+        values = dict(phi_values)
+        blocks: Dict[BasicBlock, BasicBlock] = {header: next_header}
+        for block in loop.blocks:
+            if block is not header:
+                blocks[block] = self.new_block(f"{block.name}.u{copy}")
+
+        for inst in header.instructions[:-1]:
+            if inst.opcode is not Opcode.PHI:
+                entry.instructions.append(self.clone(inst, values, blocks, copy))
+        body = blocks[shape.body]
+        entry.instructions.append(Instruction(Opcode.BR, None, [body]))
+        entry.successors = [body]
+
+        # Blocos em pós-ordem reversa: definições antes dos usos
+        # Nos PHIs o cabeçalho como predecessor vira entry; nos saltos, next_header
+        incoming = dict(blocks)
+        incoming[header] = entry
+        for block in loop.blocks:
+            if block is header:
+                continue
+            new = blocks[block]
+            new.instructions = [self.clone(inst, values, incoming if inst.opcode is Opcode.PHI else blocks, copy)
+                                for inst in block.instructions]
+            new.successors = [blocks[succ] for succ in block.successors]
+            new.predecessors = [incoming[pred] for pred in block.predecessors]
+        self.insert_blocks([entry] + [blocks[block] for block in loop.blocks if block is not header], header)
+        return blocks[shape.latch], values
+
+    def insert_blocks(self, new: List[BasicBlock], before: BasicBlock):
+        blocks = self.function.blocks
+        position = blocks.index(before)
+        blocks[position:position] = new
+
+    def next_values(self, shape: LoopShape, values: Dict[Value, Value]) -> Dict[Value, Value]:
+        """Valores dos PHIs do cabeçalho na próxima iteração"""
+        result = {}
+        for phi in self.header_phis(shape):
+            incoming = self.incoming(phi, shape.latch)
+            result[phi.result] = values.get(incoming, incoming)
+        return result
+
+    def header_phis(self, shape: LoopShape) -> List[Instruction]:
+        phis = []
+        for inst in shape.loop.header.instructions:
+            if inst.opcode is not Opcode.PHI:
+                break
+            phis.append(inst)
+        return phis
+
+    @staticmethod
+    def incoming(phi: Instruction, pred: BasicBlock) -> Value:
+        for k in range(1, len(phi.operands), 2):
+            if phi.operands[k] is pred:
+                return phi.operands[k - 1]
+        raise KeyError(pred.name)
+
+    # --- Transformações ---
+
+    def unroll_fully(self, shape: LoopShape, trips: int):
+        """trips cópias em sequência e um último cabeçalho que sai do laço"""
+        loop = shape.loop
+        header = loop.header
+        preheader = loop.preheader
+        phis = self.header_phis(shape)
+        values = {phi.result: self.incoming(phi, preheader) for phi in phis}
+        entries = [self.new_block(f"{header.name}.u{copy}") for copy in range(1, trips + 1)]
+        final = self.new_block(f"{header.name}.last")
+        entries.append(final)
+
+        retarget(preheader, header, entries[0])
+        entries[0].predecessors = [preheader]
+        for copy in range(1, trips + 1):
+            latch, cloned = self.clone_iteration(shape, copy, entries[copy - 1], entries[copy], values)
+            entries[copy].predecessors = [latch]
+            values = self.next_values(shape, cloned)
+
+        # Último teste (falso): só as instruções do cabeçalho, e a saída
+        final_values = dict(values)
+        for inst in header.instructions[:-1]:
+            if inst.opcode is not Opcode.PHI:
+                final.instructions.append(self.clone(inst, final_values, {}, trips + 1))
+        final.instructions.append(Instruction(Opcode.BR, None, [shape.exit]))
+        final.successors = [shape.exit]
+        self.insert_blocks([final], header)
+
+        # Saída e usos fora do laço passam a ver o último cabeçalho
+        exit = shape.exit
+        exit.predecessors = [final if pred is header else pred for pred in exit.predecessors]
+        removed = set(loop.blocks)
+        self.function.blocks = [block for block in self.function.blocks if block not in removed]
+        for block in self.function.blocks:
+            for inst in block.instructions:
+                inst.operands = [final if op is header else final_values.get(op, op)
+                                 for op in inst.operands]
+
+    def adjusted_limit(self, shape: LoopShape, factor: int, suffix: str = 'unroll') -> Optional[Tuple[Value, Optional[Value]]]:
+        """(limite, guarda) para testar 'restam factor iterações' com o
+        predicado do laço: o limite recua (factor - 1) passos e a guarda,
+        se houver, diz que o recuo não estourou. Limites não constantes são
+        calculados no pré-cabeçalho; None se o laço não for monotônico ou o
+        limite constante estourar"""
+        type = shape.iv.phi.result.type
+        bits = INTEGER_BITS[type.kind]
+        distance = (factor - 1) * shape.step
+        if shape.predicate in ASCENDING and shape.step > 0:
+            # iv < limite - distância  (sem estourar: limite >= MIN + distância)
+            adjust, safe, guard_predicate = Opcode.SUB, -(1 << (bits - 1)) + distance, ICmpPredicate.SGE
+        elif shape.predicate in DESCENDING and shape.step < 0:
+            adjust, safe, guard_predicate = Opcode.ADD, (1 << (bits - 1)) - 1 + distance, ICmpPredicate.SLE
+            distance = -distance
+        else:
+            return None
+
+        limit = shape.limit
+        if isinstance(limit, Constant) and isinstance(limit.value, int):
+            if not fold_icmp(guard_predicate, limit.value, safe, bits):
+                return None
+            value = limit.value - distance if adjust is Opcode.SUB else limit.value + distance
+            return Constant(type, value), None
+        adjusted = Value(self.new_name(f"{limit.name}.{suffix}", self.used_names), type)
+        guard = Value(self.new_name(f"{limit.name}.guard", self.used_names), self.test_type(shape))
+        self.insert_in_preheader(shape.loop, [
+            Instruction(adjust, adjusted, [limit, Constant(type, distance)]),
+            Instruction(Opcode.ICMP, guard, [limit, Constant(type, safe)], guard_predicate),
+        ])
+        return adjusted, guard
+
+    @staticmethod
+    def insert_in_preheader(loop: Loop, instructions: List[Instruction]):
+        preheader = loop.preheader
+        position = next(index for index, inst in enumerate(preheader.instructions)
+                        if inst.opcode in TERMINATORS)
+        preheader.instructions[position:position] = instructions
+
+    def unroll_partially(self, shape: LoopShape, factor: int) -> bool:
+        """Novo laço com factor cópias do corpo, que roda enquanto restam
+        factor iterações; o laço original termina as que sobrarem"""
+        loop = shape.loop
+        header = loop.header
+        preheader = loop.preheader
+        limits = self.adjusted_limit(shape, factor)
+        if limits is None:
+            return False
+        adjusted, guard = limits
+
+        # Cabeçalho do laço desenrolado: os mesmos PHIs e o teste ajustado
+        unrolled = self.new_block(f"{header.name}.unroll")
+        entries = [self.new_block(f"{header.name}.u{copy}") for copy in range(1, factor + 1)]
+        phis = self.header_phis(shape)
+        new_phis = {phi.result: Value(self.new_name(f"{phi.result.name}.unroll", self.used_names),
+                                      phi.result.type) for phi in phis}
+        test_type = self.test_type(shape)
+        condition = Value(self.new_name('%unroll.test', self.used_names), test_type)
+        unrolled.instructions.append(Instruction(
+            Opcode.ICMP, condition, [new_phis[shape.iv.phi.result], adjusted], shape.predicate))
+        if guard is not None:
+            guarded = Value(self.new_name('%unroll.guarded', self.used_names), test_type)
+            unrolled.instructions.append(Instruction(Opcode.AND, guarded, [condition, guard]))
+            condition = guarded
+        unrolled.instructions.append(Instruction(Opcode.COND_BR, None, [condition, entries[0], header]))
+        unrolled.successors = [entries[0], header]
+        self.insert_blocks([unrolled], header)
+
+        values = dict(new_phis)
+        entries.append(unrolled)
+        entries[0].predecessors = [unrolled]
+        latch = None
+        for copy in range(1, factor + 1):
+            latch, cloned = self.clone_iteration(shape, copy, entries[copy - 1], entries[copy], values)
+            if copy < factor:
+                entries[copy].predecessors = [latch]
+            values = self.next_values(shape, cloned)
+
+        phi_instructions = [Instruction(Opcode.PHI, new_phis[phi.result],
+                                        [self.incoming(phi, preheader), preheader, values[phi.result], latch])
+                            for phi in phis]
+        unrolled.instructions[0:0] = phi_instructions
+        unrolled.predecessors = [preheader, latch]
+
+        # O laço original continua de onde o desenrolado parou
+        retarget(preheader, header, unrolled)
+        header.predecessors = [unrolled if pred is preheader else pred for pred in header.predecessors]
+        for phi in phis:
+            operands = phi.operands
+            for k in range(1, len(operands), 2):
+                if operands[k] is preheader:
+                    operands[k - 1] = new_phis[phi.result]
+                    operands[k] = unrolled
+        loop.preheader = None
+        return True
+
+    @staticmethod
+    def test_type(shape: LoopShape):
+        """Tipo do resultado do icmp de saída"""
+        return shape.loop.header.instructions[-1].operands[0].type
+
+
+def unroll_loops(func: Function, forest: Optional[LoopForest] = None,
+                 budget: int = UNROLL_BUDGET) -> Tuple[int, List[UnrolledLoop]]:
+    """Desenrola os laços internos de func; devolve (pré-cabeçalhos
+    criados, laços desenrolados)"""
+    if func.is_external or not func.blocks:
+        return 0, []
+    if forest is None:
+        forest = LoopForest(func)
+    if not forest.roots:
+        return 0, []
+    created = forest.insert_preheaders()
+    return created, LoopUnroller(func, forest, budget).run()
+
+
+def unroll(module: Module, budget: int = UNROLL_BUDGET) -> List[UnrolledLoop]:
+    """unroll_loops em todas as funções; devolve os laços desenrolados"""
+    results = []
+    for func in module.functions:
+        results.extend(unroll_loops(func, budget=budget)[1])
+    return results
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+ULX Vectorize - Vetorização de laços elemento a elemento sobre f32
+Laços contados de passo 1 que só leem, operam e escrevem a[i + c] ganham
+uma versão com VLOAD/VADDPS.../VSTORE de 8 floats (um registrador ymm); o
+laço escalar original fica como epílogo para as iterações que sobrarem
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from ulx_ir import (Module, Function, BasicBlock, Instruction, Value, Constant, Opcode, ICmpPredicate,
+                    ArrayType, TypeF32, TypeI64)
+from ulx_analysis import LoopForest, retarget
+from ulx_indvars import is_loop_invariant
+from ulx_unroll import LoopShape, LoopUnroller, analyze_counted_loop, ASCENDING
+
+
+VECTOR_WIDTH = 8
+VECTOR_TYPE = ArrayType(TypeF32, VECTOR_WIDTH)     # 256 bits
+ELEMENT_SIZE = 4
+
+VECTOR_OPCODES = {
+    Opcode.FADD: Opcode.VADDPS,
+    Opcode.FSUB: Opcode.VSUBPS,
+    Opcode.FMUL: Opcode.VMULPS,
+    Opcode.FDIV: Opcode.VDIVPS,
+}
+
+
+class Access:
+    """Load ou store de base[iv + offset]"""
+
+    __slots__ = ('inst', 'base', 'offset', 'is_store')
+
+    def __init__(self, inst: Instruction, base: Value, offset: int, is_store: bool):
+        self.inst = inst
+        self.base = base
+        self.offset = offset
+        self.is_store = is_store
+
+
+class VectorizedLoop:
+    """O que foi feito com um laço, para relatórios"""
+
+    __slots__ = ('function', 'header', 'trip_count', 'loads', 'stores', 'operations', 'checks')
+
+    def __init__(self, function: str, header: str, trip_count: str, loads: int, stores: int,
+                 operations: int, checks: int):
+        self.function = function
+        self.header = header
+        self.trip_count = trip_count
+        self.loads = loads
+        self.stores = stores
+        self.operations = operations
+        self.checks = checks            # Pares de ponteiros testados em tempo de execução
+
+    def __str__(self):
+        return (f"{self.function}: loop {self.header}, trip count {self.trip_count}, vectorized "
+                f"x{VECTOR_WIDTH} ({self.loads} loads, {self.stores} stores, {self.operations} ops) "
+                f"+ scalar epilogue, {self.checks} runtime alias checks")
+
+
+class LoopPlan:
+    """Corpo de um laço vetorizável: instruções em ordem e acessos à memória"""
+
+    __slots__ = ('shape', 'instructions', 'offsets', 'accesses', 'checks')
+
+    def __init__(self, shape: LoopShape, instructions: List[Instruction], offsets: Dict[Value, int],
+                 accesses: List[Access], checks: List[Tuple[Access, Access]]):
+        self.shape = shape
+        self.instructions = instructions
+        self.offsets = offsets          # Índice iv + c -> c
+        self.accesses = accesses
+        self.checks = checks            # (anterior, posterior) com bases que podem se sobrepor
+
+
+class LoopVectorizer(LoopUnroller):
+    """Vetoriza os laços internos contados de uma função
+
+    Reaproveita do unroll a análise do laço, a criação de nomes e blocos e
+    o limite recuado (restam VECTOR_WIDTH iterações).
+    """
+
+    def __init__(self, func: Function, forest: LoopForest):
+        super().__init__(func, forest)
+        # Allocas são objetos distintos: bases diferentes nunca se sobrepõem
+        self.objects: Set[Value] = {inst.result for block in func.blocks for inst in block.instructions
+                                    if inst.opcode is Opcode.ALLOCA}
+
+    def run(self) -> List[VectorizedLoop]:
+        results = []
+        for loop in self.forest.loops():
+            if loop.children or loop.preheader is None:
+                continue
+            shape = analyze_counted_loop(loop, self.definitions)
+            if shape is None or shape.step != 1 or shape.predicate not in ASCENDING:
+                continue
+            trips = self.trip_count(shape)
+            if trips is not None and trips < VECTOR_WIDTH:
+                continue
+            plan = self.plan(shape)
+            if plan is None or not self.vectorize(plan):
+                continue
+            results.append(VectorizedLoop(
+                self.function.name, loop.header.name, self.symbolic_trip_count(shape),
+                sum(1 for access in plan.accesses if not access.is_store),
+                sum(1 for access in plan.accesses if access.is_store),
+                sum(1 for inst in plan.instructions if inst.opcode in VECTOR_OPCODES), len(plan.checks)))
+        return results
+
+    # --- Legalidade ---
+
+    def plan(self, shape: LoopShape) -> Optional[LoopPlan]:
+        """Classifica o corpo: índices iv + c, endereços base[índice] com base
+        invariante, loads/operações/stores f32 sobre eles. Qualquer outra
+        instrução (ou um PHI além da iv, como uma redução) impede a vetorização"""
+        loop = shape.loop
+        header = loop.header
+        iv = shape.iv.phi.result
+        if self.header_phis(shape) != [shape.iv.phi] or len(header.instructions) != 3:
+            return None     # PHI da iv, o teste e o desvio
+
+        blocks: List[BasicBlock] = []
+        block = shape.body
+        while block is not header:
+            if block in blocks or block.instructions[-1].opcode is not Opcode.BR:
+                return None
+            blocks.append(block)
+            block = block.successors[0]
+        if len(blocks) + 1 != len(loop.blocks):
+            return None
+
+        offsets: Dict[Value, int] = {iv: 0}
+        addresses: Dict[Value, Tuple[Value, int]] = {}
+        vectors: Set[Value] = set()
+        instructions: List[Instruction] = []
+        accesses: List[Access] = []
+
+        def scalar(value: object) -> bool:
+            return isinstance(value, Value) and value.type is TypeF32 \
+                and is_loop_invariant(value, loop, self.definitions)
+        for block in blocks:
+            for inst in block.instructions[:-1]:
+                opcode, operands = inst.opcode, inst.operands
+                if opcode is Opcode.ADD:
+                    constants = [op for op in operands if isinstance(op, Constant) and isinstance(op.value, int)]
+                    if iv not in operands or len(constants) != 1:
+                        return None
+                    offsets[inst.result] = constants[0].value
+                elif opcode is Opcode.GEP:
+                    base, index = operands
+                    if index not in offsets or not is_loop_invariant(base, loop, self.definitions) \
+                            or inst.result.type.element_type is not TypeF32:
+                        return None
+                    addresses[inst.result] = (base, offsets[index])
+                elif opcode is Opcode.LOAD:
+                    if operands[0] not in addresses or inst.result.type is not TypeF32:
+                        return None
+                    vectors.add(inst.result)
+                    accesses.append(Access(inst, *addresses[operands[0]], False))
+                elif opcode in VECTOR_OPCODES:
+                    if inst.result.type is not TypeF32 or not any(op in vectors for op in operands) \
+                            or not all(op in vectors or scalar(op) for op in operands):
+                        return None
+                    vectors.add(inst.result)
+                elif opcode is Opcode.STORE:
+                    value, pointer = operands
+                    if pointer not in addresses or not (value in vectors or scalar(value)):
+                        return None
+                    accesses.append(Access(inst, *addresses[pointer], True))
+                else:
+                    return None
+                instructions.append(inst)
+        if not any(access.is_store for access in accesses):
+            return None
+        checks = self.dependences(accesses)
+        if checks is None:
+            return None
+        return LoopPlan(shape, instructions, offsets, accesses, checks)
+
+    def dependences(self, accesses: List[Access]) -> Optional[List[Tuple[Access, Access]]]:
+        """Pares que precisam de teste em tempo de execução, ou None se
+        houver dependência que impede a vetorização
+
+        Para A antes de B no corpo, a iteração t de A e a s de B tocam o
+        mesmo float quando t - s = D / 4, com D = (base B + 4 offset B) -
+        (base A + 4 offset A). O vetor executa A para as 8 iterações do bloco
+        e só depois B: a ordem só se inverte se t > s no mesmo bloco, ou
+        seja, 0 < D < 4 * VECTOR_WIDTH. Com a mesma base D é constante.
+        """
+        checks = []
+        seen = set()
+        for position, first in enumerate(accesses):
+            for second in accesses[position + 1:]:
+                if not (first.is_store or second.is_store):
+                    continue
+                if first.base is second.base:
+                    distance = ELEMENT_SIZE * (second.offset - first.offset)
+                    if 0 < distance < ELEMENT_SIZE * VECTOR_WIDTH:
+                        return None
+                elif first.base in self.objects and second.base in self.objects:
+                    continue
+                else:
+                    key = (first.base, first.offset, second.base, second.offset)
+                    if key not in seen:
+                        seen.add(key)
+                        checks.append((first, second))
+        return checks
+
+    # --- Transformação ---
+
+    def vectorize(self, plan: LoopPlan) -> bool:
+        """Laço vetorial antes do original: roda enquanto restam 8 iterações
+        (e os testes de alias passam); o original termina o resto"""
+        shape = plan.shape
+        loop = shape.loop
+        header = loop.header
+        preheader = loop.preheader
+        limits = self.adjusted_limit(shape, VECTOR_WIDTH, 'vec')
+        if limits is None:
+            return False
+        adjusted, guard = limits
+        test_type = self.test_type(shape)
+        conditions = [guard] if guard is not None else []
+        if plan.checks:
+            conditions.append(self.alias_checks(plan, test_type))
+
+        vector_header = self.new_block(f"{header.name}.vec")
+        body = self.new_block(f"{shape.body.name}.vec")
+        iv = shape.iv.phi.result
+        index = Value(self.new_name(f"{iv.name}.vec", self.used_names), iv.type)
+        next_index = Value(self.new_name(f"{iv.name}.vec.next", self.used_names), iv.type)
+
+        condition = Value(self.new_name('%vec.test', self.used_names), test_type)
+        vector_header.instructions = [
+            Instruction(Opcode.PHI, index, [shape.iv.init, preheader, next_index, body]),
+            Instruction(Opcode.ICMP, condition, [index, adjusted], shape.predicate),
+        ]
+        for extra in conditions:
+            combined = Value(self.new_name('%vec.guarded', self.used_names), test_type)
+            vector_header.instructions.append(Instruction(Opcode.AND, combined, [condition, extra]))
+            condition = combined
+        vector_header.instructions.append(Instruction(Opcode.COND_BR, None, [condition, body, header]))
+        vector_header.predecessors = [preheader, body]
+        vector_header.successors = [body, header]
+
+        values: Dict[Value, Value] = {iv: index}
+        for inst in plan.instructions:
+            body.instructions.append(self.widen(inst, values))
+        body.instructions.append(Instruction(Opcode.ADD, next_index, [index, Constant(iv.type, VECTOR_WIDTH)]))
+        body.instructions.append(Instruction(Opcode.BR, None, [vector_header]))
+        body.predecessors = [vector_header]
+        body.successors = [vector_header]
+        self.insert_blocks([vector_header, body], header)
+
+        # O laço original continua de onde o vetorial parou
+        retarget(preheader, header, vector_header)
+        header.predecessors = [vector_header if pred is preheader else pred for pred in header.predecessors]
+        operands = shape.iv.phi.operands
+        for k in range(1, len(operands), 2):
+            if operands[k] is preheader:
+                operands[k - 1] = index
+                operands[k] = vector_header
+        loop.preheader = None
+        return True
+
+    def widen(self, inst: Instruction, values: Dict[Value, Value]) -> Instruction:
+        """Versão de 8 elementos de uma instrução do corpo: índices e
+        endereços continuam escalares (o do primeiro elemento)"""
+        operands = [values.get(op, op) if isinstance(op, Value) else op for op in inst.operands]
+        opcode = inst.opcode
+        if opcode is Opcode.LOAD:
+            opcode, type = Opcode.VLOAD, VECTOR_TYPE
+        elif opcode is Opcode.STORE:
+            return Instruction(Opcode.VSTORE, None, operands)
+        elif opcode in VECTOR_OPCODES:
+            opcode, type = VECTOR_OPCODES[opcode], VECTOR_TYPE
+        else:
+            type = inst.result.type
+        result = Value(self.new_name(f"{inst.result.name}.vec", self.used_names), type)
+        values[inst.result] = result
+        return Instruction(opcode, result, operands)
+
+    def alias_checks(self, plan: LoopPlan, test_type) -> Value:
+        """No pré-cabeçalho: D <= 0 ou D >= 4 * VECTOR_WIDTH para cada par
+        (ver dependences); devolve a conjunção"""
+        setup: List[Instruction] = []
+        addresses: Dict[Value, Value] = {}
+
+        def new(base: str, type) -> Value:
+            return Value(self.new_name(base, self.used_names), type)
+
+        def address(base: Value) -> Value:
+            if base not in addresses:
+                addresses[base] = new(f"{base.name}.addr", TypeI64)
+                setup.append(Instruction(Opcode.PTRTOINT, addresses[base], [base]))
+            return addresses[base]
+        result = None
+        for first, second in plan.checks:
+            difference = new('%vec.distance', TypeI64)
+            setup.append(Instruction(Opcode.SUB, difference, [address(second.base), address(first.base)]))
+            offset = ELEMENT_SIZE * (second.offset - first.offset)
+            if offset:
+                distance = new('%vec.distance', TypeI64)
+                setup.append(Instruction(Opcode.ADD, distance, [difference, Constant(TypeI64, offset)]))
+                difference = distance
+            before = new('%vec.before', test_type)
+            after = new('%vec.after', test_type)
+            safe = new('%vec.noalias', test_type)
+            setup.append(Instruction(Opcode.ICMP, before, [difference, Constant(TypeI64, 0)], ICmpPredicate.SLE))
+            setup.append(Instruction(Opcode.ICMP, after, [difference, Constant(TypeI64, ELEMENT_SIZE * VECTOR_WIDTH)],
+                                     ICmpPredicate.SGE))
+            setup.append(Instruction(Opcode.OR, safe, [before, after]))
+            if result is not None:
+                combined = new('%vec.noalias', test_type)
+                setup.append(Instruction(Opcode.AND, combined, [result, safe]))
+                safe = combined
+            result = safe
+        self.insert_in_preheader(plan.shape.loop, setup)
+        return result
+
+
+def vectorize_loops(func: Function, forest: Optional[LoopForest] = None) -> Tuple[int, List[VectorizedLoop]]:
+    """Vetoriza os laços internos de func; devolve (pré-cabeçalhos criados,
+    laços vetorizados)"""
+    if func.is_external or not func.blocks:
+        return 0, []
+    if forest is None:
+        forest = LoopForest(func)
+    if not forest.roots:
+        return 0, []
+    created = forest.insert_preheaders()
+    return created, LoopVectorizer(func, forest).run()
+
+
+def vectorize(module: Module) -> List[VectorizedLoop]:
+    """vectorize_loops em todas as funções; devolve os laços vetorizados"""
+    results = []
+    for func in module.functions:
+        results.extend(vectorize_loops(func)[1])
+    return results
@@ -10,32 +10,54 @@ import subprocess
 import tempfile
 import argparse
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
 
 # Importar módulos do compilador
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from ulx_parser import parse_source, TokenType
+    from ulx_parser import parse_source, map_source, InternTable, TokenType
+    from ulx_parser import (
+        FunctionDecl, VarDecl, IfStmt, WhileStmt, ForStmt, ReturnStmt, WriteStmt,
+        ExprStmt, BinaryExpr, UnaryExpr, LiteralExpr, IdentifierExpr,
+        CallExpr, AssignmentExpr
+    )
+    from ulx_cache import ParseCache
+    from ulx_scope import ScopeTable
+    from ulx_passes import PassManager, DEFAULT_PIPELINE
+    from ulx_vectorize import VECTOR_TYPE
     from ulx_ir import (
         Module, Function, BasicBlock, Instruction, Value, Constant,
         Type, TypeKind, TypeI8, TypeI16, TypeI32, TypeI64, TypeF32, 
         TypeF64, TypePtr, TypeVoid, Opcode, ICmpPredicate, IRBuilder,
-        ArrayType, FunctionType
+        ArrayType, FunctionType, TYPES
     )
 except ImportError as e:
     print(f"Error importing compiler modules: {e}")
     sys.exit(1)
 
 
+# Nomes de tipo da linguagem (os nomes IR, 'i32' etc., já vêm do ulx_ir)
+TYPES.define('inteiro', TypeI32)
+TYPES.define('real', TypeF64)
+TYPES.define('texto', TypePtr)
+TYPES.define('booleano', TypeI8)
+
+ARITHMETIC_OPERATORS = frozenset(['+', '-', '*', '/', '%'])
+COMPARISON_OPERATORS = frozenset(['==', '!=', '<', '>', '<=', '>='])
+LOGICAL_OPERATORS = frozenset(['&&', '||'])
+
+
 class TypeChecker:
     """Verificador de tipos"""
     
     def __init__(self):
-        self.symbol_table = {}
+        self.scopes = ScopeTable()  # Tipos das variáveis visíveis
         self.function_table = {}
     
     def check_program(self, ast):
         """Verifica tipos do programa completo"""
+        self.scopes = ScopeTable()
         for decl in ast.declarations:
             self.check_declaration(decl)
     
@@ -55,9 +77,15 @@ class TypeChecker:
         ret_type = self.string_to_type(func.return_type)
         self.function_table[func.name] = FunctionType(ret_type, param_types)
         
+        # Registrar parâmetros
+        self.scopes.begin_function()
+        for (param_name, _), param_type in zip(func.params, param_types):
+            self.scopes.declare(param_name, param_type)
+        
         # Verificar corpo
         for stmt in func.body:
             self.check_statement(stmt)
+        self.scopes.pop()
     
     def check_var_decl(self, var):
         """Verifica declaração de variável"""
@@ -67,39 +95,46 @@ class TypeChecker:
             init_type = self.check_expression(var.initializer)
             if var_type is None:
                 var_type = init_type
-            elif var_type != init_type:
+            elif var_type is not init_type:
                 raise TypeError(f"Type mismatch in variable declaration: {var.name}")
         
-        self.symbol_table[var.name] = var_type
+        # Visível só depois do inicializador
+        self.scopes.declare(var.name, var_type)
+    
+    def check_block(self, statements):
+        """Verifica statements num escopo próprio"""
+        self.scopes.push()
+        for stmt in statements:
+            self.check_statement(stmt)
+        self.scopes.pop()
     
     def check_statement(self, stmt):
         """Verifica statement"""
         from ulx_parser import (
             IfStmt, WhileStmt, ForStmt, ReturnStmt, WriteStmt,
-            ReadStmt, ExprStmt, AssignmentExpr
+            ReadStmt, ExprStmt, AssignmentExpr, VarDecl
         )
         
         if isinstance(stmt, IfStmt):
             cond_type = self.check_expression(stmt.condition)
-            for s in stmt.then_branch:
-                self.check_statement(s)
-            for s in stmt.else_branch:
-                self.check_statement(s)
+            self.check_block(stmt.then_branch)
+            self.check_block(stmt.else_branch)
         
         elif isinstance(stmt, WhileStmt):
             cond_type = self.check_expression(stmt.condition)
-            for s in stmt.body:
-                self.check_statement(s)
+            self.check_block(stmt.body)
         
         elif isinstance(stmt, ForStmt):
+            # A inicialização vale para condição, incremento e corpo
+            self.scopes.push()
             if stmt.init:
                 self.check_statement(stmt.init)
             if stmt.condition:
                 self.check_expression(stmt.condition)
             if stmt.increment:
                 self.check_expression(stmt.increment)
-            for s in stmt.body:
-                self.check_statement(s)
+            self.check_block(stmt.body)
+            self.scopes.pop()
         
         elif isinstance(stmt, ReturnStmt):
             if stmt.value:
@@ -113,72 +148,83 @@ class TypeChecker:
         
         elif isinstance(stmt, ExprStmt):
             self.check_expression(stmt.expression)
+        
+        elif isinstance(stmt, VarDecl):
+            self.check_var_decl(stmt)
     
     def check_expression(self, expr):
-        """Verifica expressão e retorna tipo"""
+        """Verifica expressão e retorna tipo
+        
+        Percorre a árvore em pós-ordem com uma pilha explícita (sem recursão),
+        então cadeias e aninhamentos profundos não esbarram no limite do Python.
+        """
         from ulx_parser import (
             BinaryExpr, UnaryExpr, LiteralExpr, IdentifierExpr,
             CallExpr, AssignmentExpr
         )
         
-        if isinstance(expr, LiteralExpr):
-            return self.string_to_type(expr.literal_type)
-        
-        elif isinstance(expr, IdentifierExpr):
-            if expr.name in self.symbol_table:
-                return self.symbol_table[expr.name]
-            raise NameError(f"Undefined variable: {expr.name}")
-        
-        elif isinstance(expr, BinaryExpr):
-            left_type = self.check_expression(expr.left)
-            right_type = self.check_expression(expr.right)
+        types = []                 # Tipos das subexpressões já verificadas
+        stack = [(expr, False)]    # (nó, filhos já verificados)
+        while stack:
+            node, ready = stack.pop()
             
-            if expr.operator in ['+', '-', '*', '/', '%']:
-                if left_type != right_type:
-                    raise TypeError(f"Type mismatch in binary operation")
-                return left_type
+            if isinstance(node, LiteralExpr):
+                types.append(self.string_to_type(node.literal_type))
             
-            elif expr.operator in ['==', '!=', '<', '>', '<=', '>=']:
-                return TypeI8  # Boolean
+            elif isinstance(node, IdentifierExpr):
+                slot = self.scopes.resolve(node.name)
+                if slot is None:
+                    raise NameError(f"Undefined variable: {node.name}")
+                types.append(self.scopes.value(slot))
             
-            elif expr.operator in ['&&', '||']:
-                return TypeI8  # Boolean
-        
-        elif isinstance(expr, UnaryExpr):
-            operand_type = self.check_expression(expr.operand)
-            return operand_type
-        
-        elif isinstance(expr, CallExpr):
-            if expr.callee in self.function_table:
-                func_type = self.function_table[expr.callee]
-                return func_type.ret_type
-            raise NameError(f"Undefined function: {expr.callee}")
-        
-        elif isinstance(expr, AssignmentExpr):
-            target_type = self.symbol_table.get(expr.target)
-            value_type = self.check_expression(expr.value)
-            if target_type != value_type:
-                raise TypeError(f"Type mismatch in assignment")
-            return target_type
+            elif isinstance(node, BinaryExpr):
+                if not ready:
+                    stack.append((node, True))
+                    stack.append((node.right, False))
+                    stack.append((node.left, False))
+                    continue
+                right_type = types.pop()
+                left_type = types.pop()
+                if node.operator in ARITHMETIC_OPERATORS:
+                    if left_type is not right_type:
+                        raise TypeError(f"Type mismatch in binary operation")
+                    types.append(left_type)
+                elif node.operator in COMPARISON_OPERATORS:
+                    types.append(TypeI8)  # Boolean
+                elif node.operator in LOGICAL_OPERATORS:
+                    types.append(TypeI8)  # Boolean
+                else:
+                    types.append(TypeI32)  # Default
+            
+            elif isinstance(node, UnaryExpr):
+                if not ready:
+                    stack.append((node, True))
+                    stack.append((node.operand, False))
+                # O tipo do operando já é o tipo do resultado
+            
+            elif isinstance(node, CallExpr):
+                if node.callee not in self.function_table:
+                    raise NameError(f"Undefined function: {node.callee}")
+                types.append(self.function_table[node.callee].ret_type)
+            
+            elif isinstance(node, AssignmentExpr):
+                if not ready:
+                    stack.append((node, True))
+                    stack.append((node.value, False))
+                    continue
+                target_type = self.scopes.lookup(node.target)
+                if target_type is not types.pop():
+                    raise TypeError(f"Type mismatch in assignment")
+                types.append(target_type)
+            
+            else:
+                types.append(TypeI32)  # Default
         
-        return TypeI32  # Default
+        return types.pop()
     
     def string_to_type(self, type_str: str) -> Type:
         """Converte string de tipo para Type"""
-        type_map = {
-            'inteiro': TypeI32,
-            'real': TypeF64,
-            'texto': TypePtr,
-            'booleano': TypeI8,
-            'void': TypeVoid,
-            'i8': TypeI8,
-            'i16': TypeI16,
-            'i32': TypeI32,
-            'i64': TypeI64,
-            'f32': TypeF32,
-            'f64': TypeF64,
-        }
-        return type_map.get(type_str, TypeI32)
+        return TYPES.resolve(type_str, TypeI32)
 
 
 class ASTtoIR:
@@ -187,13 +233,22 @@ class ASTtoIR:
     def __init__(self):
         self.module = None
         self.builder = None
-        self.symbol_table = {}
+        self.scopes = ScopeTable()  # Ponteiros das variáveis visíveis
+        self.frame = []             # Slot -> {tipo: alloca} da função atual
         self.function_table = {}
         self.temp_counter = 0
+        self.names = InternTable()
     
-    def convert(self, ast) -> Module:
-        """Converte AST para módulo IR"""
+    def convert(self, ast, names: Optional[InternTable] = None) -> Module:
+        """Converte AST para módulo IR
+        
+        names é a tabela de identificadores usada pelo lexer; os nomes IR
+        ('%x') saem dela, um objeto por variável.
+        """
         self.module = Module("main")
+        self.scopes = ScopeTable()
+        if names is not None:
+            self.names = names
         
         # Primeira passa: registrar funções
         for decl in ast.declarations:
@@ -214,7 +269,7 @@ class ASTtoIR:
             params = []
             for param_name, param_type in func.params:
                 ptype = self.string_to_type(param_type)
-                params.append(Value(f"%{param_name}", ptype))
+                params.append(Value(self.names.ir_name(param_name), ptype))
             
             ret_type = self.string_to_type(func.return_type)
             
@@ -240,26 +295,64 @@ class ASTtoIR:
         self.builder = IRBuilder(self.module)
         self.builder.set_function(ir_func)
         
-        # Registrar parâmetros
-        for param in ir_func.params:
-            self.symbol_table[param.name[1:]] = param
+        # Registrar parâmetros (primeiros slots do quadro)
+        self.begin_frame(ir_func)
+        for (param_name, _), param in zip(func.params, ir_func.params):
+            ir_func.frame[param.name] = self.scopes.declare(param_name, param)
         
         # Converter corpo
         for stmt in func.body:
             self.convert_statement(stmt)
+        self.end_frame(ir_func)
+    
+    def begin_frame(self, ir_func):
+        self.scopes.begin_function()
+        self.frame = []
+    
+    def end_frame(self, ir_func):
+        self.scopes.pop()
+        ir_func.frame_size = self.scopes.frame_size
+    
+    def frame_alloca(self, slot: int, var_type: Type, name: str) -> Value:
+        """alloca do slot para var_type, reaproveitada entre escopos disjuntos"""
+        while len(self.frame) <= slot:
+            self.frame.append({})
+        ptr = self.frame[slot].get(var_type)
+        if ptr is None:
+            frame = self.builder.current_function.frame
+            ir_name = self.names.ir_name(name)
+            if ir_name in frame:
+                # Nome já usado por outro slot (sombreamento): sufixo numérico
+                count = 1
+                while f"{ir_name}.{count}" in frame:
+                    count += 1
+                ir_name = f"{ir_name}.{count}"
+            ptr = self.builder.entry_alloca(var_type, ir_name)
+            frame[ir_name] = slot
+            self.frame[slot][var_type] = ptr
+        return ptr
     
     def convert_var_decl(self, var):
         """Converte declaração de variável"""
         var_type = self.string_to_type(var.var_type) if var.var_type else TypeI32
         
-        # Alocar espaço
-        ptr = self.builder.alloca(var_type, f"%{var.name}")
-        self.symbol_table[var.name] = ptr
+        # Inicializador antes da declaração: o nome ainda não é visível nele
+        value = self.convert_expression(var.initializer) if var.initializer else None
         
-        # Inicializar se houver valor
-        if var.initializer:
-            value = self.convert_expression(var.initializer)
-            self.builder.store(value, ptr)
+        # Alocar espaço no slot da variável
+        slot = self.scopes.declare(var.name, None)
+        ptr = self.frame_alloca(slot, var_type, var.name)
+        self.scopes.values[slot] = ptr
+        
+        # Sem inicializador começa em zero: o slot pode ter sido de outra variável
+        self.builder.store(value if value is not None else Constant(var_type, 0), ptr)
+    
+    def convert_block(self, statements):
+        """Converte statements num escopo próprio"""
+        self.scopes.push()
+        for stmt in statements:
+            self.convert_statement(stmt)
+        self.scopes.pop()
     
     def convert_statement(self, stmt):
         """Converte statement"""
@@ -298,6 +391,16 @@ class ASTtoIR:
         elif isinstance(stmt, VarDecl):
             self.convert_var_decl(stmt)
     
+    def close_block(self, target):
+        """Fecha o bloco atual com br target, se ele ainda não terminou
+        
+        O bloco atual pode não ser o de início do corpo: um if ou laço
+        aninhado deixa o builder no seu bloco end.
+        """
+        block = self.builder.current_block
+        if not block.instructions or block.instructions[-1].opcode not in (Opcode.RET, Opcode.BR, Opcode.COND_BR):
+            self.builder.br(target)
+    
     def convert_if(self, stmt):
         """Converte if statement"""
         from ulx_parser import IfStmt
@@ -315,17 +418,13 @@ class ASTtoIR:
         
         # Bloco then
         self.builder.set_block(then_block)
-        for s in stmt.then_branch:
-            self.convert_statement(s)
-        if not then_block.instructions or then_block.instructions[-1].opcode not in [Opcode.RET, Opcode.BR]:
-            self.builder.br(end_block)
+        self.convert_block(stmt.then_branch)
+        self.close_block(end_block)
         
         # Bloco else
         self.builder.set_block(else_block)
-        for s in stmt.else_branch:
-            self.convert_statement(s)
-        if not else_block.instructions or else_block.instructions[-1].opcode not in [Opcode.RET, Opcode.BR]:
-            self.builder.br(end_block)
+        self.convert_block(stmt.else_branch)
+        self.close_block(end_block)
         
         # Bloco end
         self.builder.set_block(end_block)
@@ -347,17 +446,16 @@ class ASTtoIR:
         
         # Bloco do corpo
         self.builder.set_block(body_block)
-        for s in stmt.body:
-            self.convert_statement(s)
-        if not body_block.instructions or body_block.instructions[-1].opcode not in [Opcode.RET, Opcode.BR]:
-            self.builder.br(cond_block)
+        self.convert_block(stmt.body)
+        self.close_block(cond_block)
         
         # Bloco end
         self.builder.set_block(end_block)
     
     def convert_for(self, stmt):
         """Converte for statement"""
-        # Inicialização
+        # Inicialização (escopo que cobre condição, incremento e corpo)
+        self.scopes.push()
         if stmt.init:
             self.convert_statement(stmt.init)
         
@@ -380,10 +478,8 @@ class ASTtoIR:
         
         # Bloco do corpo
         self.builder.set_block(body_block)
-        for s in stmt.body:
-            self.convert_statement(s)
-        if not body_block.instructions or body_block.instructions[-1].opcode not in [Opcode.RET, Opcode.BR]:
-            self.builder.br(inc_block)
+        self.convert_block(stmt.body)
+        self.close_block(inc_block)
         
         # Bloco de incremento
         self.builder.set_block(inc_block)
@@ -393,48 +489,84 @@ class ASTtoIR:
         
         # Bloco end
         self.builder.set_block(end_block)
+        self.scopes.pop()
     
     def convert_expression(self, expr) -> Value:
-        """Converte expressão para valor IR"""
+        """Converte expressão para valor IR
+        
+        Pós-ordem com pilha explícita (sem recursão): as instruções saem na
+        mesma ordem da versão recursiva, filhos da esquerda para a direita.
+        """
         from ulx_parser import (
             BinaryExpr, UnaryExpr, LiteralExpr, IdentifierExpr,
             CallExpr, AssignmentExpr
         )
         
-        if isinstance(expr, LiteralExpr):
-            return self.convert_literal(expr)
-        
-        elif isinstance(expr, IdentifierExpr):
-            ptr = self.symbol_table.get(expr.name)
-            if ptr:
-                return self.builder.load(ptr)
-            raise NameError(f"Undefined variable: {expr.name}")
-        
-        elif isinstance(expr, BinaryExpr):
-            return self.convert_binary(expr)
-        
-        elif isinstance(expr, UnaryExpr):
-            operand = self.convert_expression(expr.operand)
-            if expr.operator == '-':
-                zero = Constant(operand.type, 0)
-                return self.builder.sub(zero, operand)
-            elif expr.operator == '!':
-                zero = Constant(operand.type, 0)
-                return self.builder.icmp(ICmpPredicate.EQ, operand, zero)
-            return operand
-        
-        elif isinstance(expr, CallExpr):
-            return self.convert_call(expr)
-        
-        elif isinstance(expr, AssignmentExpr):
-            ptr = self.symbol_table.get(expr.target)
-            if ptr:
-                value = self.convert_expression(expr.value)
-                self.builder.store(value, ptr)
-                return value
-            raise NameError(f"Undefined variable: {expr.target}")
+        values = []                # Valores das subexpressões já convertidas
+        stack = [(expr, False)]    # (nó, filhos já convertidos)
+        while stack:
+            node, ready = stack.pop()
+            
+            if isinstance(node, LiteralExpr):
+                values.append(self.convert_literal(node))
+            
+            elif isinstance(node, IdentifierExpr):
+                ptr = self.scopes.lookup(node.name)
+                if not ptr:
+                    raise NameError(f"Undefined variable: {node.name}")
+                values.append(self.builder.load(ptr))
+            
+            elif isinstance(node, BinaryExpr):
+                if not ready:
+                    stack.append((node, True))
+                    stack.append((node.right, False))
+                    stack.append((node.left, False))
+                    continue
+                right = values.pop()
+                values.append(self.convert_binary(node, values.pop(), right))
+            
+            elif isinstance(node, UnaryExpr):
+                if not ready:
+                    stack.append((node, True))
+                    stack.append((node.operand, False))
+                    continue
+                operand = values.pop()
+                if node.operator == '-':
+                    zero = Constant(operand.type, 0)
+                    operand = self.builder.sub(zero, operand)
+                elif node.operator == '!':
+                    zero = Constant(operand.type, 0)
+                    operand = self.builder.icmp(ICmpPredicate.EQ, operand, zero)
+                values.append(operand)
+            
+            elif isinstance(node, CallExpr):
+                func = self.function_table.get(node.callee)
+                if not func:
+                    raise NameError(f"Undefined function: {node.callee}")
+                if not ready:
+                    stack.append((node, True))
+                    for arg in reversed(node.arguments):
+                        stack.append((arg, False))
+                    continue
+                count = len(node.arguments)
+                args = values[len(values) - count:]
+                del values[len(values) - count:]
+                values.append(self.builder.call(func, args))
+            
+            elif isinstance(node, AssignmentExpr):
+                ptr = self.scopes.lookup(node.target)
+                if not ptr:
+                    raise NameError(f"Undefined variable: {node.target}")
+                if not ready:
+                    stack.append((node, True))
+                    stack.append((node.value, False))
+                    continue
+                self.builder.store(values[-1], ptr)
+            
+            else:
+                values.append(Constant(TypeI32, 0))
         
-        return Constant(TypeI32, 0)
+        return values.pop()
     
     def convert_literal(self, expr) -> Constant:
         """Converte literal"""
@@ -449,10 +581,8 @@ class ASTtoIR:
             return Constant(TypeI8, 1 if expr.value else 0)
         return Constant(TypeI32, 0)
     
-    def convert_binary(self, expr) -> Value:
-        """Converte expressão binária"""
-        left = self.convert_expression(expr.left)
-        right = self.convert_expression(expr.right)
+    def convert_binary(self, expr, left: Value, right: Value) -> Value:
+        """Converte expressão binária com os operandos já convertidos"""
         
         if expr.operator == '+':
             return self.builder.add(left, right)
@@ -480,69 +610,300 @@ class ASTtoIR:
         
         return left
     
-    def convert_call(self, expr) -> Optional[Value]:
-        """Converte chamada de função"""
-        func = self.function_table.get(expr.callee)
-        if not func:
-            raise NameError(f"Undefined function: {expr.callee}")
-        
-        args = [self.convert_expression(arg) for arg in expr.arguments]
-        return self.builder.call(func, args)
-    
     def string_to_type(self, type_str: str) -> Type:
         """Converte string de tipo para Type"""
-        type_map = {
-            'inteiro': TypeI32,
-            'real': TypeF64,
-            'texto': TypePtr,
-            'booleano': TypeI8,
-            'void': TypeVoid,
-            'i8': TypeI8,
-            'i16': TypeI16,
-            'i32': TypeI32,
-            'i64': TypeI64,
-            'f32': TypeF32,
-            'f64': TypeF64,
+        return TYPES.resolve(type_str, TypeI32)
+
+
+class FusedLowering(ASTtoIR):
+    """Verificação de tipos e geração de IR numa única passada
+    
+    Mesmas regras do TypeChecker e mesmo IR do ASTtoIR, mas cada nó é visitado
+    uma vez: o percurso de expressões calcula (tipo, valor) juntos. O tipo do
+    nó escolhe o tratador numa tabela montada no construtor, sem cadeias de
+    isinstance nem imports por chamada.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        # Nos escopos, cada slot guarda (tipo, ponteiro)
+        self.function_types = {}  # Funções já verificadas, na ordem do fonte
+        self.unchecked = 0        # > 0 dentro de argumentos (o TypeChecker não os verifica)
+        
+        self.declarations = {
+            FunctionDecl: self.convert_function,
+            VarDecl: self.convert_var_decl,
+        }
+        self.statements = {
+            IfStmt: self.convert_if,
+            WhileStmt: self.convert_while,
+            ForStmt: self.convert_for,
+            ReturnStmt: self.convert_return,
+            WriteStmt: self.convert_write,
+            ExprStmt: self.convert_expr_stmt,
+            VarDecl: self.convert_var_decl,
         }
-        return type_map.get(type_str, TypeI32)
+        # Expressões: enter visita o nó (folhas produzem o resultado, nós
+        # internos empilham os filhos); leave combina os resultados dos filhos
+        self.enter = {
+            LiteralExpr: self.enter_literal,
+            IdentifierExpr: self.enter_identifier,
+            BinaryExpr: self.enter_binary,
+            UnaryExpr: self.enter_unary,
+            CallExpr: self.enter_call,
+            AssignmentExpr: self.enter_assignment,
+        }
+        self.leave = {
+            BinaryExpr: self.leave_binary,
+            UnaryExpr: self.leave_unary,
+            CallExpr: self.leave_call,
+            AssignmentExpr: self.leave_assignment,
+        }
+    
+    def convert_declaration(self, decl):
+        handler = self.declarations.get(type(decl))
+        if handler:
+            handler(decl)
+    
+    def convert_function(self, func):
+        """Registra o tipo da função e dos parâmetros e converte o corpo"""
+        param_types = [self.string_to_type(p[1]) for p in func.params]
+        ret_type = self.string_to_type(func.return_type)
+        self.function_types[func.name] = FunctionType(ret_type, param_types)
+        
+        ir_func = self.function_table.get(func.name)
+        if not ir_func:
+            return
+        self.builder = IRBuilder(self.module)
+        self.builder.set_function(ir_func)
+        
+        self.begin_frame(ir_func)
+        for (param_name, _), param_type, param in zip(func.params, param_types, ir_func.params):
+            ir_func.frame[param.name] = self.scopes.declare(param_name, (param_type, param))
+        
+        convert_statement = self.convert_statement
+        for stmt in func.body:
+            convert_statement(stmt)
+        self.end_frame(ir_func)
+    
+    def convert_var_decl(self, var):
+        """Verifica, aloca e inicializa a variável"""
+        var_type = self.string_to_type(var.var_type) if var.var_type else None
+        declared = var_type
+        
+        value = None
+        if var.initializer:
+            init_type, value = self.lower_expression(var.initializer)
+            if declared is None:
+                declared = init_type
+            elif declared is not init_type:
+                raise TypeError(f"Type mismatch in variable declaration: {var.name}")
+        
+        slot = self.scopes.declare(var.name, None)
+        ptr = self.frame_alloca(slot, var_type or TypeI32, var.name)
+        self.scopes.values[slot] = (declared, ptr)
+        
+        # Sem inicializador começa em zero: o slot pode ter sido de outra variável
+        self.builder.store(value if value is not None else Constant(var_type or TypeI32, 0), ptr)
+    
+    def convert_statement(self, stmt):
+        handler = self.statements.get(type(stmt))
+        if handler:
+            handler(stmt)
+    
+    def convert_return(self, stmt):
+        if stmt.value:
+            self.builder.ret(self.convert_expression(stmt.value))
+        else:
+            self.builder.ret()
+    
+    def convert_write(self, stmt):
+        # Chamar função de escrita (simplificado)
+        self.convert_expression(stmt.expression)
+    
+    def convert_expr_stmt(self, stmt):
+        self.convert_expression(stmt.expression)
+    
+    def convert_expression(self, expr) -> Value:
+        return self.lower_expression(expr)[1]
+    
+    def lower_expression(self, expr) -> tuple:
+        """(tipo, valor IR) de expr, em pós-ordem com pilha explícita"""
+        enter = self.enter
+        leave = self.leave
+        results = []
+        stack = [(expr, False)]
+        while stack:
+            node, ready = stack.pop()
+            if ready:
+                leave[type(node)](node, results)
+            else:
+                handler = enter.get(type(node))
+                if handler:
+                    handler(node, stack, results)
+                else:
+                    results.append((TypeI32, Constant(TypeI32, 0)))  # Default
+        return results.pop()
+    
+    def enter_literal(self, node, stack, results):
+        results.append((self.string_to_type(node.literal_type), self.convert_literal(node)))
+    
+    def enter_identifier(self, node, stack, results):
+        entry = self.scopes.lookup(node.name)
+        if entry is None:
+            raise NameError(f"Undefined variable: {node.name}")
+        results.append((entry[0], self.builder.load(entry[1])))
+    
+    def enter_binary(self, node, stack, results):
+        stack.append((node, True))
+        stack.append((node.right, False))
+        stack.append((node.left, False))
+    
+    def leave_binary(self, node, results):
+        right_type, right = results.pop()
+        left_type, left = results.pop()
+        op = node.operator
+        if op in ARITHMETIC_OPERATORS:
+            if left_type is not right_type and not self.unchecked:
+                raise TypeError(f"Type mismatch in binary operation")
+            result_type = left_type
+        elif op in COMPARISON_OPERATORS or op in LOGICAL_OPERATORS:
+            result_type = TypeI8  # Boolean
+        else:
+            result_type = TypeI32
+        results.append((result_type, self.convert_binary(node, left, right)))
+    
+    def enter_unary(self, node, stack, results):
+        stack.append((node, True))
+        stack.append((node.operand, False))
+    
+    def leave_unary(self, node, results):
+        operand_type, operand = results.pop()
+        if node.operator == '-':
+            operand = self.builder.sub(Constant(operand.type, 0), operand)
+        elif node.operator == '!':
+            operand = self.builder.icmp(ICmpPredicate.EQ, operand, Constant(operand.type, 0))
+        results.append((operand_type, operand))
+    
+    def enter_call(self, node, stack, results):
+        func = self.function_table.get(node.callee)
+        if not func or (node.callee not in self.function_types and not self.unchecked):
+            raise NameError(f"Undefined function: {node.callee}")
+        self.unchecked += 1
+        stack.append((node, True))
+        for arg in reversed(node.arguments):
+            stack.append((arg, False))
+    
+    def leave_call(self, node, results):
+        self.unchecked -= 1
+        count = len(node.arguments)
+        args = [value for _, value in results[len(results) - count:]]
+        del results[len(results) - count:]
+        func = self.function_table[node.callee]
+        results.append((func.return_type, self.builder.call(func, args)))
+    
+    def enter_assignment(self, node, stack, results):
+        stack.append((node, True))
+        stack.append((node.value, False))
+    
+    def leave_assignment(self, node, results):
+        value_type, value = results.pop()
+        entry = self.scopes.lookup(node.target)
+        target_type = entry[0] if entry else None
+        if target_type is not value_type and not self.unchecked:
+            raise TypeError(f"Type mismatch in assignment")
+        if not entry:
+            raise NameError(f"Undefined variable: {node.target}")
+        self.builder.store(value, entry[1])
+        results.append((target_type, value))
 
 
 class ULXCompiler:
     """Compilador ULX completo"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[ParseCache] = None, two_pass: bool = False,
+                 passes: str = DEFAULT_PIPELINE, time_passes: bool = False,
+                 stats: bool = False, pass_options: Optional[Dict[str, Any]] = None):
         self.type_checker = TypeChecker()
         self.ast_to_ir = ASTtoIR()
+        self.fused = FusedLowering()
+        self.cache = cache
+        self.two_pass = two_pass  # Depuração: verificação e geração de IR separadas
+        self.passes = passes      # Pipeline de otimização: 'mem2reg,...'
+        self.time_passes = time_passes
+        self.stats = stats        # Relatório dos passos (laços desenrolados...)
+        self.pass_options = pass_options or {}
+        self.pass_manager: Optional[PassManager] = None
+        self.c_function: Optional[Function] = None  # Função sendo convertida para C
     
-    def compile(self, source: str, output_file: str = None, emit_ir: bool = False) -> str:
+    def compile(self, source: Union[str, bytes], output_file: str = None, emit_ir: bool = False) -> str:
         """
         Compila código fonte ULX
         
         Args:
-            source: Código fonte ULX
+            source: Código fonte ULX (str, ou bytes/mmap em UTF-8)
             output_file: Arquivo de saída (opcional)
             emit_ir: Se True, retorna IR em vez de binário
         
         Returns:
             Caminho do arquivo gerado ou IR como string
         """
+        if self.two_pass:
+            return self.compile_two_pass(source, output_file, emit_ir)
+        
         # 1. Parsing
         print("[1/4] Parsing...")
-        ast = parse_source(source)
+        names = InternTable()
+        ast = parse_source(source, cache=self.cache, names=names)
+        
+        # 2. Type checking + IR generation (uma passada)
+        print("[2/4] Type checking + IR generation...")
+        ir_module = self.fused.convert(ast, names)
+        
+        # 3. Otimização
+        print("[3/4] Optimizing...")
+        self.optimize(ir_module)
+        
+        if emit_ir:
+            return str(ir_module)
+        
+        # 4. Code generation (via GCC por enquanto)
+        print("[4/4] Generating code...")
+        return self.generate_code(ir_module, output_file)
+    
+    def optimize(self, ir_module: Module):
+        """Executa o pipeline de passes sobre o IR gerado"""
+        self.pass_manager = PassManager(self.passes, self.pass_options)
+        self.pass_manager.run(ir_module)
+        if self.time_passes:
+            print(self.pass_manager.report(), file=sys.stderr)
+        if self.stats:
+            print(self.pass_manager.remarks_report(), file=sys.stderr)
+    
+    def compile_two_pass(self, source: Union[str, bytes], output_file: str = None, emit_ir: bool = False) -> str:
+        """Como compile, mas verifica tipos e gera IR em passadas separadas"""
+        # 1. Parsing
+        print("[1/5] Parsing...")
+        names = InternTable()
+        ast = parse_source(source, cache=self.cache, names=names)
         
         # 2. Type checking
-        print("[2/4] Type checking...")
+        print("[2/5] Type checking...")
         self.type_checker.check_program(ast)
         
         # 3. IR generation
-        print("[3/4] Generating IR...")
-        ir_module = self.ast_to_ir.convert(ast)
+        print("[3/5] Generating IR...")
+        ir_module = self.ast_to_ir.convert(ast, names)
+        
+        # 4. Otimização
+        print("[4/5] Optimizing...")
+        self.optimize(ir_module)
         
         if emit_ir:
             return str(ir_module)
         
-        # 4. Code generation (via GCC por enquanto)
-        print("[4/4] Generating code...")
+        # 5. Code generation (via GCC por enquanto)
+        print("[5/5] Generating code...")
         return self.generate_code(ir_module, output_file)
     
     def generate_code(self, ir_module: Module, output_file: str = None) -> str:
@@ -582,6 +943,17 @@ class ULXCompiler:
             '#include <string.h>',
             '',
         ]
+        vector_opcodes = (Opcode.VLOAD, Opcode.VSTORE)
+        if any(inst.opcode in vector_opcodes for func in ir_module.functions
+               for block in func.blocks for inst in block.instructions):
+            # Extensão de vetores do GCC; alinhamento de float: o vload não exige 32 bytes
+            lines.extend([f'typedef float {C_TYPES[VECTOR_TYPE]} '
+                          f'__attribute__((vector_size({4 * VECTOR_TYPE.size}), aligned(4)));', ''])
+        
+        # Protótipos: chamadas podem vir antes da definição (ou ser recursivas)
+        for func in ir_module.functions:
+            lines.append(self.signature_to_c(func) + ';')
+        lines.append('')
         
         for func in ir_module.functions:
             lines.extend(self.function_to_c(func))
@@ -589,64 +961,183 @@ class ULXCompiler:
         
         return '\n'.join(lines)
     
+    def signature_to_c(self, func: Function) -> str:
+        if func.name == 'main':
+            ret_type = 'int'  # main sem tipo em ULX ainda devolve o status
+        else:
+            ret_type = self.type_to_c(func.return_type)
+        params = ', '.join(f'{self.type_to_c(p.type)} {self.c_name(p)}' for p in func.params)
+        return f'{ret_type} {func.name}({params or "void"})'
+    
     def function_to_c(self, func: Function) -> List[str]:
-        """Converte função IR para C"""
-        lines = []
+        """Converte função IR para C
         
-        # Assinatura
-        ret_type = self.type_to_c(func.return_type)
-        params = ', '.join(f'{self.type_to_c(p.type)} {p.name[1:]}' for p in func.params)
-        lines.append(f'{ret_type} {func.name}({params}) {{')
+        Todo valor vira uma variável local declarada no topo (em C um rótulo
+        não pode preceder uma declaração). PHIs viram cópias na aresta de
+        entrada: antes do goto de cada predecessor.
+        """
+        if func.is_external:
+            return []
+        lines = [self.signature_to_c(func) + ' {']
+        self.c_function = func
+        
+        # Declarações
+        # Parâmetros e allocas escalares são variáveis C: load/store as acessam
+        # diretamente; os demais ponteiros (getelementptr...) são desreferenciados
+        params = {id(p) for p in func.params}
+        self.c_slots = set(func.params)
+        for block in func.blocks:
+            for inst in block.instructions:
+                if inst.result is None or id(inst.result) in params:
+                    continue
+                value_type = inst.operands[0] if inst.opcode == Opcode.ALLOCA else inst.result.type
+                name = self.c_name(inst.result)
+                if inst.opcode == Opcode.ALLOCA and value_type.kind == TypeKind.ARRAY:
+                    element = self.type_to_c(value_type.element_type)
+                    lines.append(f'    {element} {name}[{value_type.size}] = {{0}};')
+                    continue
+                if inst.opcode == Opcode.ALLOCA:
+                    self.c_slots.add(inst.result)
+                initializer = '{0}' if value_type is VECTOR_TYPE else '0'
+                lines.append(f'    {self.type_to_c(value_type)} {name} = {initializer};')
         
         # Corpo
         for block in func.blocks:
-            if block.name != 'entry':
-                lines.append(f'{block.name}:')
+            if block is not func.entry_block():
+                lines.append(f'{self.c_label(block)}: ;')
             for inst in block.instructions:
-                line = self.instruction_to_c(inst)
-                if line:
-                    lines.append(f'    {line}')
+                if inst.opcode == Opcode.BR:
+                    lines.extend(self.edge_to_c(block, inst.operands[0], '    '))
+                elif inst.opcode == Opcode.COND_BR:
+                    cond, true_block, false_block = inst.operands
+                    lines.append(f'    if ({self.c_operand(cond)}) {{')
+                    lines.extend(self.edge_to_c(block, true_block, '        '))
+                    lines.append('    } else {')
+                    lines.extend(self.edge_to_c(block, false_block, '        '))
+                    lines.append('    }')
+                else:
+                    line = self.instruction_to_c(inst)
+                    if line:
+                        lines.append(f'    {line}')
+                if inst.opcode in (Opcode.BR, Opcode.COND_BR, Opcode.RET):
+                    break  # O resto do bloco é inalcançável
         
         lines.append('}')
         return lines
     
+    def edge_to_c(self, source: BasicBlock, target: BasicBlock, indent: str) -> List[str]:
+        """Cópias dos PHIs de target para a aresta source -> target, e o goto"""
+        copies = []
+        for inst in target.instructions:
+            if inst.opcode != Opcode.PHI:
+                break
+            for i in range(1, len(inst.operands), 2):
+                if inst.operands[i] is source:
+                    copies.append((inst.result, inst.operands[i - 1]))
+                    break
+        lines = []
+        if len(copies) == 1:
+            result, value = copies[0]
+            lines.append(f'{indent}{self.c_name(result)} = {self.c_operand(value)};')
+        elif copies:
+            # Cópia paralela: um PHI pode ler o valor anterior de outro
+            lines.append(f'{indent}{{')
+            for i, (result, value) in enumerate(copies):
+                lines.append(f'{indent}    {self.type_to_c(result.type)} phi_{i} = {self.c_operand(value)};')
+            for i, (result, _) in enumerate(copies):
+                lines.append(f'{indent}    {self.c_name(result)} = phi_{i};')
+            lines.append(f'{indent}}}')
+        lines.append(f'{indent}goto {self.c_label(target)};')
+        return lines
+    
+    def c_name(self, value: Value) -> str:
+        """Nome C de um valor IR: '%x.1' -> 'v_x_1', '%3' -> 'v_3'"""
+        return 'v_' + value.name[1:].replace('.', '_')
+    
+    def c_operand(self, value: Value) -> str:
+        if isinstance(value, Constant):
+            if isinstance(value.value, float) and value.type is TypeF32:
+                return repr(value.value) + 'f'
+            if isinstance(value.value, (int, float)):
+                return repr(value.value)
+            return '0'  # Strings ainda não são suportadas
+        return self.c_name(value)
+    
+    def c_label(self, block: BasicBlock) -> str:
+        return 'L_' + block.name.replace('.', '_')
+    
     def instruction_to_c(self, inst: Instruction) -> str:
         """Converte instrução IR para C"""
-        if inst.opcode == Opcode.ALLOCA:
-            return None  # Alocação implícita em C
+        binary_ops = {
+            Opcode.ADD: '+',
+            Opcode.SUB: '-',
+            Opcode.MUL: '*',
+            Opcode.SDIV: '/',
+            Opcode.SREM: '%',
+            Opcode.AND: '&',
+            Opcode.OR: '|',
+            Opcode.XOR: '^',
+            Opcode.FADD: '+',
+            Opcode.FSUB: '-',
+            Opcode.FMUL: '*',
+            Opcode.FDIV: '/',
+            # Vetores (extensão do GCC): um operando escalar vale para os 8 elementos
+            Opcode.VADDPS: '+',
+            Opcode.VSUBPS: '-',
+            Opcode.VMULPS: '*',
+            Opcode.VDIVPS: '/',
+        }
+        casts = (Opcode.TRUNC, Opcode.SEXT, Opcode.FPTRUNC, Opcode.FPEXT, Opcode.FPTOSI, Opcode.SITOFP,
+                 Opcode.PTRTOINT, Opcode.INTTOPTR)
+        
+        if inst.opcode in (Opcode.ALLOCA, Opcode.PHI):
+            return None  # Variável local / cópias nas arestas
         
         elif inst.opcode == Opcode.LOAD:
             ptr = inst.operands[0]
-            return f'{inst.result.type} {inst.result.name[1:]} = {ptr.name[1:]};'
+            if ptr in self.c_slots:
+                return f'{self.c_name(inst.result)} = {self.c_name(ptr)};'
+            return f'{self.c_name(inst.result)} = *({self.type_to_c(inst.result.type)} *){self.c_name(ptr)};'
         
         elif inst.opcode == Opcode.STORE:
             value = inst.operands[0]
             ptr = inst.operands[1]
-            return f'{ptr.name[1:]} = {value.name};'
-        
-        elif inst.opcode == Opcode.ADD:
-            lhs = inst.operands[0]
-            rhs = inst.operands[1]
-            return f'{inst.result.type} {inst.result.name[1:]} = {lhs.name} + {rhs.name};'
-        
-        elif inst.opcode == Opcode.SUB:
-            lhs = inst.operands[0]
-            rhs = inst.operands[1]
-            return f'{inst.result.type} {inst.result.name[1:]} = {lhs.name} - {rhs.name};'
-        
-        elif inst.opcode == Opcode.MUL:
-            lhs = inst.operands[0]
-            rhs = inst.operands[1]
-            return f'{inst.result.type} {inst.result.name[1:]} = {lhs.name} * {rhs.name};'
-        
-        elif inst.opcode == Opcode.SDIV:
-            lhs = inst.operands[0]
-            rhs = inst.operands[1]
-            return f'{inst.result.type} {inst.result.name[1:]} = {lhs.name} / {rhs.name};'
+            if ptr in self.c_slots:
+                return f'{self.c_name(ptr)} = {self.c_operand(value)};'
+            return f'*({self.type_to_c(value.type)} *){self.c_name(ptr)} = {self.c_operand(value)};'
+        
+        elif inst.opcode == Opcode.GEP:
+            ptr, index = inst.operands
+            element = self.type_to_c(inst.result.type.element_type or TypeI8)
+            return (f'{self.c_name(inst.result)} = (void *)(({element} *){self.c_operand(ptr)} '
+                    f'+ {self.c_operand(index)});')
+        
+        elif inst.opcode in casts:
+            value = self.c_operand(inst.operands[0])
+            if inst.opcode == Opcode.PTRTOINT:
+                value = f'(intptr_t){value}'
+            return f'{self.c_name(inst.result)} = ({self.type_to_c(inst.result.type)}){value};'
+        
+        elif inst.opcode == Opcode.VLOAD:
+            vector = C_TYPES[VECTOR_TYPE]
+            return f'{self.c_name(inst.result)} = *({vector} *){self.c_name(inst.operands[0])};'
+        
+        elif inst.opcode == Opcode.VSTORE:
+            value, ptr = inst.operands
+            vector = C_TYPES[VECTOR_TYPE]
+            operand = self.c_operand(value)
+            if value.type is not VECTOR_TYPE:
+                operand = f'({vector}){{{", ".join([operand] * VECTOR_TYPE.size)}}}'
+            return f'*({vector} *){self.c_name(ptr)} = {operand};'
+        
+        elif inst.opcode in binary_ops:
+            lhs = self.c_operand(inst.operands[0])
+            rhs = self.c_operand(inst.operands[1])
+            return f'{self.c_name(inst.result)} = {lhs} {binary_ops[inst.opcode]} {rhs};'
         
         elif inst.opcode == Opcode.ICMP:
-            lhs = inst.operands[0]
-            rhs = inst.operands[1]
+            lhs = self.c_operand(inst.operands[0])
+            rhs = self.c_operand(inst.operands[1])
             pred = inst.predicate
             op_map = {
                 ICmpPredicate.EQ: '==',
@@ -657,45 +1148,44 @@ class ULXCompiler:
                 ICmpPredicate.SGE: '>=',
             }
             op = op_map.get(pred, '==')
-            return f'int {inst.result.name[1:]} = {lhs.name} {op} {rhs.name};'
-        
-        elif inst.opcode == Opcode.BR:
-            target = inst.operands[0]
-            return f'goto {target.name};'
-        
-        elif inst.opcode == Opcode.COND_BR:
-            cond = inst.operands[0]
-            true_block = inst.operands[1]
-            false_block = inst.operands[2]
-            return f'if ({cond.name}) goto {true_block.name}; else goto {false_block.name};'
+            return f'{self.c_name(inst.result)} = {lhs} {op} {rhs};'
         
         elif inst.opcode == Opcode.RET:
+            func = self.c_function
+            if func.return_type is TypeVoid:
+                return 'return 0;' if func.name == 'main' else 'return;'
             if inst.operands:
-                return f'return {inst.operands[0].name};'
-            return 'return;'
+                return f'return {self.c_operand(inst.operands[0])};'
+            return 'return 0;'
         
         elif inst.opcode == Opcode.CALL:
             func = inst.operands[0]
-            args = ', '.join(op.name for op in inst.operands[1:])
+            args = ', '.join(self.c_operand(op) for op in inst.operands[1:])
             if inst.result:
-                return f'{inst.result.type} {inst.result.name[1:]} = {func.name}({args});'
+                return f'{self.c_name(inst.result)} = {func.name}({args});'
             return f'{func.name}({args});'
         
-        return f'// TODO: {inst.opcode}'
+        return f'/* TODO: {inst.opcode.value} */'
     
     def type_to_c(self, type: Type) -> str:
         """Converte tipo IR para C"""
-        type_map = {
-            TypeKind.VOID: 'void',
-            TypeKind.I8: 'int8_t',
-            TypeKind.I16: 'int16_t',
-            TypeKind.I32: 'int32_t',
-            TypeKind.I64: 'int64_t',
-            TypeKind.F32: 'float',
-            TypeKind.F64: 'double',
-            TypeKind.PTR: 'void*',
-        }
-        return type_map.get(type.kind, 'int32_t')
+        if type.kind == TypeKind.PTR:
+            return 'void*'
+        return C_TYPES.get(type, 'int32_t')
+
+
+# Tipos canônicos -> tipos C (busca por identidade)
+C_TYPES = {
+    TypeVoid: 'void',
+    TypeI8: 'int8_t',
+    TypeI16: 'int16_t',
+    TypeI32: 'int32_t',
+    TypeI64: 'int64_t',
+    TypeF32: 'float',
+    TypeF64: 'double',
+    TypePtr: 'void*',
+    VECTOR_TYPE: 'ulx_v8sf',
+}
 
 
 def main():
@@ -704,18 +1194,45 @@ def main():
     parser.add_argument('-o', '--output', help='Output file')
     parser.add_argument('--emit-ir', action='store_true', help='Emit IR only')
     parser.add_argument('--run', action='store_true', help='Run after compile')
+    parser.add_argument('--no-cache', action='store_true', help='Do not use the parse cache (~/.cache/ulx)')
+    parser.add_argument('--cache-stats', action='store_true', help='Print parse cache hits/misses')
+    parser.add_argument('--two-pass', action='store_true', help='Type check and generate IR in separate passes (debug)')
+    parser.add_argument('--passes', default=DEFAULT_PIPELINE,
+                        help=f"Comma-separated optimization pipeline (default: {DEFAULT_PIPELINE}; "
+                             f"empty for none; available: {', '.join(PassManager([]).available())})")
+    parser.add_argument('--time-passes', action='store_true', help='Print time and instruction deltas per pass')
+    parser.add_argument('--stats', action='store_true', help='Print what each pass did (e.g. unrolled loops)')
+    parser.add_argument('--unroll-budget', type=int, default=None,
+                        help='Maximum instructions of an unrolled loop (unroll pass)')
+    parser.add_argument('--inline-threshold', type=int, default=None,
+                        help='Maximum instructions of a function copied into its callers (inline pass)')
     
     args = parser.parse_args()
+    try:
+        PassManager(args.passes)
+    except ValueError as e:
+        parser.error(str(e))
     
-    # Ler arquivo de entrada
-    with open(args.input, 'r') as f:
-        source = f.read()
+    # Mapear arquivo de entrada (decodificado sob demanda pelo lexer)
+    source = map_source(args.input)
     
     # Compilar
-    compiler = ULXCompiler()
+    cache = None if args.no_cache else ParseCache()
+    pass_options = {}
+    if args.unroll_budget is not None:
+        pass_options['unroll-budget'] = args.unroll_budget
+    if args.inline_threshold is not None:
+        pass_options['inline-threshold'] = args.inline_threshold
+    compiler = ULXCompiler(cache, args.two_pass, args.passes, args.time_passes, args.stats, pass_options)
     
     try:
-        result = compiler.compile(source, args.output, args.emit_ir)
+        try:
+            result = compiler.compile(source, args.output, args.emit_ir)
+        finally:
+            if hasattr(source, 'close'):
+                source.close()
+            if cache is not None and args.cache_stats:
+                print(cache.stats())
         
         if args.emit_ir:
             print(result)